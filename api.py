@@ -1,137 +1,768 @@
-from typing import Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import quote, urlencode
 
+import requests
 from github import Github
-from github.GithubException import UnknownObjectException
-from github.Issue import Issue
-from github.PaginatedList import PaginatedList
-from github.PullRequest import PullRequest
+from github.GithubException import BadCredentialsException, GithubException, RateLimitExceededException, \
+    UnknownObjectException
 from github.Repository import Repository
 
+from cache import TTLCache
+from http_cache import CachedResponse, ResponseCache
+from scheduler import BULK, INTERACTIVE, RateLimitScheduler
+
+REPO_DETAILS_QUERY = '''
+query($name: String!, $first: Int!) {
+  viewer {
+    repository(name: $name) {
+      name
+      nameWithOwner
+      url
+      stargazerCount
+      forkCount
+      isPrivate
+      isArchived
+      createdAt
+      updatedAt
+      primaryLanguage { name }
+      defaultBranchRef { name }
+      issues(states: OPEN, first: $first, orderBy: {field: CREATED_AT, direction: DESC}) {
+        totalCount
+        nodes { number title url }
+      }
+      pullRequests(states: OPEN, first: $first, orderBy: {field: CREATED_AT, direction: DESC}) {
+        totalCount
+        nodes { number title url }
+      }
+    }
+  }
+}
+'''
+
+
+class IssueRecord(NamedTuple):
+    """
+    Fields of issue or pull request that the bot shows, all of them are in the search payload
+    """
+    number: int
+    title: str
+    html_url: str
+    repository: str
+    author: str
+    created_at: datetime
+    state: str
+    pull_request: Optional[dict]
+
+
+class ItemRecord(NamedTuple):
+    """
+    Fields of open issue or pull request in the repository details
+    """
+    number: int
+    title: str
+    html_url: str
+    pull_request: bool
+
+
+class RepoRecord(NamedTuple):
+    """
+    Fields of repository that the bot shows or needs to start a flow
+    """
+    name: str
+    full_name: str
+    html_url: str
+    default_branch: Optional[str]
+    private: bool
+    archived: bool
+    stargazers_count: int
+    forks_count: int
+    open_issues_count: int
+    language: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+class Notifications(NamedTuple):
+    """
+    Unread notifications of the user and when to ask for them again
+    """
+    items: List[dict]
+    last_modified: str
+    poll_interval: int
+
 
 class Api:
     """
     Class for manipulating with GitHub API
     """
 
-    def __init__(self, token: str):
+    def __init__(self, token: str, base_url: str = 'https://api.github.com', timeout: int = 15,
+                 use_graphql: bool = True, cache: ResponseCache = None, scheduler: RateLimitScheduler = None):
         """
         Create the authenticated user as object
         :param token: token for GitHub API
+        :param base_url: address of GitHub API
+        :param timeout: number of seconds to wait for one HTTP response
+        :param use_graphql: fetch repository details with one GraphQL query instead of several REST calls
+        :param cache: storage of responses for conditional requests, shared between users
+        :param scheduler: rate limit scheduler of the token, a new one if None
         """
-        self.g = Github(token)
-        self.user = self.g.get_user()
-        self.url = 'https://api.github.com/repos/'
+        self.g = Github(token, base_url=base_url, timeout=timeout, per_page=100)
+        # PyGithub reuses one connection object per Github instance, so it must not be used by two threads at once
+        self.lock = threading.RLock()
+        self.url = f'{base_url}/repos/'
+        self.login = None
+        self.base_url = base_url
+        # GitHub Enterprise serves GraphQL at /api/graphql next to /api/v3
+        self.graphql_url = base_url[:-len('v3')] + 'graphql' if base_url.endswith('/v3') else base_url + '/graphql'
+        self.timeout = timeout
+        self.use_graphql = use_graphql
+        self.cache = cache
+        self.scheduler = scheduler or RateLimitScheduler()
+        # Responses depend on the token, but the token itself is never stored in the cache
+        self.cache_prefix = hashlib.sha256(token.encode()).hexdigest()[:16]
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'token {token}',
+            'Accept': 'application/vnd.github.v3+json',
+            'User-Agent': 'github-helper',
+        })
+
+    def close(self) -> None:
+        """
+        Method for closing HTTP connections of the object
+        :return: nothing to return
+        """
+        self.session.close()
+
+    def request(self, method: str, url: str, priority: int = INTERACTIVE, **kwargs) -> requests.Response:
+        """
+        Method for calling GitHub API directly, bypassing PyGithub objects
+        :param method: HTTP method
+        :param url: full url or path relative to base url
+        :param priority: INTERACTIVE for button presses or BULK for listings
+        :param kwargs: arguments for requests, e.g. params, json, headers
+        :return: response with successful status
+        :raise GithubException: the same exceptions as PyGithub raises, status 0 if GitHub hasn't answered
+        """
+        if not url.startswith('http'):
+            url = self.base_url + url
+        if url == self.graphql_url:
+            resource = 'graphql'
+        elif url.startswith(self.base_url + '/search/'):
+            resource = 'search'
+        else:
+            resource = 'core'
+        try:
+            response = self.scheduler.execute(
+                lambda: self.session.request(method, url, timeout=self.timeout, **kwargs), priority, resource)
+        except requests.RequestException as e:
+            # Callers handle one kind of errors, whether GitHub has answered or not
+            raise GithubException(0, {'message': f'{type(e).__name__}: {e}'}, None) from e
+        if response.status_code >= 400:
+            try:
+                data = response.json()
+            except ValueError:
+                data = {'message': response.text}
+            if response.status_code == 401:
+                raise BadCredentialsException(response.status_code, data, response.headers)
+            if response.status_code == 404:
+                raise UnknownObjectException(response.status_code, data, response.headers)
+            if response.status_code in (403, 429) and 'rate limit' in str(data.get('message', '')).lower():
+                raise RateLimitExceededException(response.status_code, data, response.headers)
+            raise GithubException(response.status_code, data, response.headers)
+        return response
+
+    def get_json(self, url: str, params: dict = None, priority: int = INTERACTIVE) -> Tuple[Any, Optional[str]]:
+        """
+        Method for GET request that revalidates the cached response with ETag or Last-Modified,
+        304 Not Modified responses don't count against the rate limit
+        :param url: full url or path relative to base url
+        :param params: query parameters
+        :param priority: INTERACTIVE for button presses or BULK for listings
+        :return: decoded JSON and url of the next page if any
+        """
+        if not url.startswith('http'):
+            url = self.base_url + url
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        if self.cache is None:
+            response = self.request('GET', url, priority)
+            return response.json(), response.links.get('next', {}).get('url')
+        key = f'{self.cache_prefix}:{url}'
+        cached = self.cache.get(key)
+        headers = {}
+        if cached and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached and cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        response = self.request('GET', url, priority, headers=headers)
+        if response.status_code == 304 and cached:
+            self.cache.record_hit()
+            return json.loads(cached.body), cached.next_url or None
+        self.cache.record_miss()
+        next_url = response.links.get('next', {}).get('url')
+        etag = response.headers.get('ETag', '')
+        last_modified = response.headers.get('Last-Modified', '')
+        if etag or last_modified:
+            self.cache.set(key, CachedResponse(etag, last_modified, next_url or '', response.content))
+        return response.json(), next_url
+
+    def get_pages(self, url: str, params: dict = None) -> list:
+        """
+        Method for getting items from all pages of the listing with bulk priority
+        :param url: full url or path relative to base url
+        :param params: query parameters of the first page
+        :return: list of decoded items
+        """
+        items, next_url = self.get_json(url, params, BULK)
+        while next_url:
+            page, next_url = self.get_json(next_url, priority=BULK)
+            items.extend(page)
+        return items
+
+    def graphql(self, query: str, variables: dict) -> dict:
+        """
+        Method for running GraphQL query
+        :param query: text of the query
+        :param variables: values of query variables
+        :return: data of the response
+        :raise GithubException: the response contains errors
+        """
+        payload = self.request('POST', self.graphql_url, json={'query': query, 'variables': variables}).json()
+        if payload.get('errors'):
+            raise GithubException(200, payload, None)
+        return payload['data']
+
+    def get_login(self) -> str:
+        """
+        Method for getting login of the authenticated user, it is requested only once
+        :return: login
+        """
+        if self.login is None:
+            user, _ = self.get_json('/user')
+            self.login = user['login']
+        return self.login
 
     def get_user_info(self) -> Tuple[str, str]:
         """
         Method that returns string with information about user
         :return: avatar url and string with information
         """
-        return self.user.avatar_url, f'You have been authenticated with login *{self.user.login}* ' \
-                                     f'as *{self.user.name}*.\n' \
-                                     f'[Link]({self.user.html_url}) to the profile.'
+        user, _ = self.get_json('/user')
+        return user['avatar_url'], f'You have been authenticated with login *{user["login"]}* ' \
+                                   f'as *{user["name"]}*.\n' \
+                                   f'[Link]({user["html_url"]}) to the profile.'
 
-    def get_repos(self) -> PaginatedList:
+    def get_all_repos(self) -> list:
         """
-        Method for getting all user repositories
-        :return: list of repositories
+        Method for getting all user repositories as GitHub returns them, it costs one request per page of the listing
+        :return: list of decoded repositories
         """
-        repos = self.user.get_repos()
-        return repos
+        return self.get_pages('/user/repos', {'per_page': 100})
 
-    def get_repo(self, repo_name: str) -> Repository:
+    def get_notifications(self, last_modified: str = '') -> Notifications:
+        """
+        Method for getting unread notifications of the user, 304 Not Modified responses don't count against the rate limit
+        :param last_modified: Last-Modified header of the previous response, empty string for the first poll
+        :return: newest notifications first, empty list if nothing has changed since last_modified
+        """
+        headers = {'If-Modified-Since': last_modified} if last_modified else {}
+        response = self.request('GET', '/notifications', BULK, headers=headers, params={'per_page': 50})
+        poll_interval = int(response.headers.get('X-Poll-Interval', 60))
+        if response.status_code == 304:
+            return Notifications([], last_modified, poll_interval)
+        return Notifications(response.json(), response.headers.get('Last-Modified', last_modified), poll_interval)
+
+    def get_repo(self, repo_name: str) -> Optional[RepoRecord]:
         """
         Method for getting one repository
         :param repo_name: short name of the repository
-        :return:
+        :return: record of the repository, None if repository doesn't exist
+        """
+        try:
+            repo, _ = self.get_json(f'/repos/{self.get_login()}/{repo_name}')
+            return get_repo_record(repo)
+        except UnknownObjectException:
+            return None
+
+    def get_lazy_repo(self, full_name: str) -> Repository:
+        """
+        Method for getting Repository object without a request, e.g. for creating issues in it
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :return: Repository object that is completed on the first read of a missing attribute
+        """
+        return self.g.get_repo(full_name, lazy=True)
+
+    def has_branch(self, full_name: str, branch: str) -> bool:
+        """
+        Method for checking that the branch exists in the repository
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :param branch: name of the branch
+        :return: status of existence
+        """
+        try:
+            self.get_json(f'/repos/{full_name}/branches/{quote(branch)}')
+            return True
+        except UnknownObjectException:
+            return False
+
+    def get_names(self, url: str, field: str, max_pages: int) -> Tuple[List[str], bool]:
+        """
+        Method for getting one field of every item in the listing, the pages are requested with interactive priority
+        :param url: path of the listing relative to base url
+        :param field: key of the item, e.g. name or login
+        :param max_pages: maximum number of pages with 100 items
+        :return: values of the field and whether the listing is complete
+        """
+        items, next_url = self.get_json(url, {'per_page': 100})
+        names = [item[field] for item in items]
+        pages = 1
+        while next_url and pages < max_pages:
+            items, next_url = self.get_json(next_url)
+            names.extend(item[field] for item in items)
+            pages += 1
+        return names, next_url is None
+
+    def get_branches(self, full_name: str, max_pages: int = 10) -> Tuple[List[str], bool]:
+        """
+        Method for getting names of branches of the repository
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :param max_pages: maximum number of pages with 100 branches
+        :return: names of branches and whether the list is complete
+        """
+        return self.get_names(f'/repos/{full_name}/branches', 'name', max_pages)
+
+    def get_assignees(self, full_name: str, max_pages: int = 10) -> Tuple[List[str], bool]:
+        """
+        Method for getting logins of users that can be assigned to issues and pull requests of the repository
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :param max_pages: maximum number of pages with 100 users
+        :return: logins and whether the list is complete
+        """
+        return self.get_names(f'/repos/{full_name}/assignees', 'login', max_pages)
+
+    def can_assign(self, full_name: str, login: str) -> bool:
+        """
+        Method for checking that the user can be assigned to issues and pull requests of the repository
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :param login: login of the user
+        :return: status of checking
         """
         try:
-            repo = self.user.get_repo(repo_name)
-            return repo
+            self.request('GET', f'/repos/{full_name}/assignees/{quote(login)}')
+            return True
         except UnknownObjectException:
+            return False
+
+    def create_hook(self, full_name: str, url: str, secret: str, events: Sequence[str]) -> bool:
+        """
+        Method for subscribing the bot to events of the repository with a webhook
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :param url: url that receives the deliveries
+        :param secret: key of the HMAC signature of the deliveries
+        :param events: names of the events
+        :return: True if the webhook exists now, False if the user can't manage webhooks of the repository
+        """
+        config = {'url': url, 'content_type': 'json', 'secret': secret, 'insecure_ssl': '0'}
+        try:
+            self.request('POST', f'/repos/{full_name}/hooks',
+                         json={'name': 'web', 'active': True, 'events': list(events), 'config': config})
+            return True
+        except UnknownObjectException:
+            # GitHub answers 404 instead of 403 when the token has no admin rights
+            return False
+        except RateLimitExceededException:
+            raise
+        except GithubException as e:
+            # Another user of the bot has already added the webhook
+            return e.status == 422 and 'already exists' in str(e.data)
+
+    def get_repo_details(self, repo_name: str, first: int = 20) -> Optional[Tuple[RepoRecord, List[ItemRecord]]]:
+        """
+        Method for getting repository with its newest open issues and pull requests
+        :param repo_name: short name of the repository
+        :param first: maximum number of issues and pull requests
+        :return: record of the repository and records of items, None if repository doesn't exist
+        """
+        if not self.use_graphql:
+            return self.get_repo_details_rest(repo_name, first)
+        try:
+            data = self.graphql(REPO_DETAILS_QUERY, {'name': repo_name, 'first': first})
+        except GithubException as e:
+            if any(error.get('type') == 'NOT_FOUND' for error in e.data.get('errors', [])):
+                return None
+            raise
+        repo = data['viewer']['repository']
+        if repo is None:
+            return None
+        items = [ItemRecord(node['number'], node['title'], node['url'], False) for node in repo['issues']['nodes']]
+        items += [ItemRecord(node['number'], node['title'], node['url'], True) for node in repo['pullRequests']['nodes']]
+        items.sort(key=lambda item: item.number, reverse=True)
+        record = RepoRecord(
+            name=repo['name'],
+            full_name=repo['nameWithOwner'],
+            html_url=repo['url'],
+            default_branch=repo['defaultBranchRef']['name'] if repo['defaultBranchRef'] else None,
+            private=repo['isPrivate'],
+            archived=repo['isArchived'],
+            stargazers_count=repo['stargazerCount'],
+            forks_count=repo['forkCount'],
+            open_issues_count=repo['issues']['totalCount'] + repo['pullRequests']['totalCount'],
+            language=repo['primaryLanguage']['name'] if repo['primaryLanguage'] else None,
+            created_at=parse_date(repo['createdAt']),
+            updated_at=parse_date(repo['updatedAt']),
+        )
+        return record, items[:first]
+
+    def get_repo_details_rest(self, repo_name: str, first: int = 20) -> Optional[Tuple[RepoRecord, List[ItemRecord]]]:
+        """
+        Method for getting the same data as get_repo_details with REST API
+        :param repo_name: short name of the repository
+        :param first: maximum number of issues and pull requests
+        :return: record of the repository and records of items, None if repository doesn't exist
+        """
+        repo = self.get_repo(repo_name)
+        if repo is None:
             return None
+        issues = self.request('GET', f'/repos/{repo.full_name}/issues', params={'per_page': first}).json()
+        return repo, [get_item_record(issue) for issue in issues]
+
+    def get_repo_items(self, full_name: str, page: int = 1, per_page: int = 10) -> Tuple[List[ItemRecord], bool]:
+        """
+        Method for getting one page of open issues and pull requests of the repository with one request
+        :param full_name: full name of the repository, e.g. mezgoodle/github-helper
+        :param page: number of the page, starting from 1
+        :param per_page: number of items on the page
+        :return: records of items and whether the next page exists
+        """
+        issues, next_url = self.get_json(f'/repos/{full_name}/issues', {'per_page': per_page, 'page': page})
+        return [get_item_record(issue) for issue in issues], next_url is not None
+
+    def get_search_query(self, option: bool, filters: dict) -> str:
+        """
+        Method for building query of the search API, without the repo filter only repositories of one owner are searched,
+        the user or the owner from the filter: the search can't ask for every repository the user has access to,
+        as /user/issues?filter=all does, so issues of organizations and collaborations need the owner or repo filter
+        :param option: issues - True, pull requests - False
+        :param filters: dictionary with optional repo, owner, label, author and state (open, closed or all)
+        :return: query with qualifiers
+        """
+        qualifiers = ['is:issue' if option else 'is:pr']
+        state = filters.get('state', 'open')
+        if state != 'all':
+            qualifiers.append(f'is:{state}')
+        repo = filters.get('repo')
+        if repo:
+            qualifiers.append(f'repo:{repo}' if '/' in repo else f'repo:{self.get_login()}/{repo}')
+        else:
+            qualifiers.append(f'user:{filters.get("owner") or self.get_login()}')
+        if filters.get('label'):
+            qualifiers.append(f'label:"{filters["label"]}"')
+        if filters.get('author'):
+            qualifiers.append(f'author:{filters["author"]}')
+        return ' '.join(qualifiers)
 
-    def get_issues_or_prs(self, option: bool) -> list:
+    def get_issues_or_prs_page(self, option: bool, page: int = 1, per_page: int = 10,
+                               filters: dict = None) -> Tuple[list, bool]:
         """
-        Method for getting oll issues or pull requests
+        Method for getting one page of issues or pull requests, GitHub filters them by kind,
+        so other kind and other pages are not downloaded
         :param option: issues - True, pull requests - False
-        :return: list of items
+        :param page: number of the page, starting from 1
+        :param per_page: number of items on the page
+        :param filters: dictionary with optional repo, owner, label, author and state (open, closed or all)
+        :return: records of the items and whether the next page exists
         """
-        items = self.user.get_issues(filter='all')
-        result = []
-        for item in items:
-            if (item.pull_request is None) == option:
-                result.append(item)
-        return result
+        query = self.get_search_query(option, filters or {})
+        result, next_url = self.get_json('/search/issues', {'q': query, 'per_page': per_page, 'page': page}, BULK)
+        return [get_issue_record(item) for item in result['items']], next_url is not None
 
     def close_issues_or_prs(self, part_of_url: str) -> bool:
         """
-        Method for closing issues or pull requests
-        :param part_of_url: part of api url for closing
+        Method for closing issues or pull requests with one request
+        :param part_of_url: part of api url for closing, e.g. owner/repo/issues/1
         :return: status of closing
         """
         try:
-            full_url = self.url + part_of_url
-            items = self.user.get_issues(filter='all')
-            for item in items:
-                if item.url == full_url:
-                    item.edit(state='closed')
-                    return True
+            full_name, number = parse_item_url(part_of_url)
+            self.request('PATCH', f'/repos/{full_name}/issues/{number}', json={'state': 'closed'})
+            return True
+        except RateLimitExceededException:
+            raise
         except Exception:
             return False
 
     def merge_prs(self, part_of_url: str) -> bool:
         """
-        Method for merging pull requests
-        :param part_of_url: part of api url for merging
+        Method for merging pull requests with one request
+        :param part_of_url: part of api url for merging, e.g. owner/repo/issues/1
         :return: status of merging
         """
         try:
-            full_url = self.url + part_of_url
-            items = self.user.get_issues(filter='all')
-            for item in items:
-                if item.url == full_url:
-                    repo = self.user.get_repo(item.repository.name)
-                    pr_number = full_url.split('/')[-1]
-                    pr = repo.get_pull(int(pr_number))
-                    pr.merge()
-                    return True
+            full_name, number = parse_item_url(part_of_url)
+            self.request('PUT', f'/repos/{full_name}/pulls/{number}/merge')
+            return True
+        except RateLimitExceededException:
+            raise
         except Exception:
             return False
 
-    def create_issue(self, data: dict) -> Issue:
+    def create_issue(self, data: dict) -> Optional[IssueRecord]:
         """
-        Method for creating issue
+        Method for creating issue with one request
         :param data: meta-data for issue
-        :return: Issue object
+        :return: record of the issue
         """
-        repo = self.get_repo(data['RepoName'])
         try:
-            issue = repo.create_issue(
-                title=data['Title'],
-                body=data['Body'],
-                assignee=data['Assignee']
-            )
-            return issue
+            repo = self.get_lazy_repo(data.get('FullName') or f'{self.get_login()}/{data["RepoName"]}')
+            with self.lock:
+                issue = repo.create_issue(
+                    title=data['Title'],
+                    body=data['Body'],
+                    assignee=data['Assignee']
+                )
+            return get_issue_record(issue.raw_data)
+        except RateLimitExceededException:
+            raise
         except Exception:
             return None
 
-    def create_pr(self, data: dict) -> PullRequest:
+    def create_pr(self, data: dict) -> Optional[IssueRecord]:
         """
-        Method for creating pull request
+        Method for creating pull request with one request, the assignee costs one more
         :param data: meta-data for pull request
-        :return: PullRequest object
+        :return: record of the pull request
         """
-        repo = self.get_repo(data['RepoName'])
+        full_name = data.get('FullName') or f'{self.get_login()}/{data["RepoName"]}'
         try:
-            pr = repo.create_pull(
-                title=data['Title'],
-                body=data['Body'],
-                base=data['Base'],
-                head=data['Head'],
-                draft=data['Draft']
-            )
-            pr.add_to_assignees(data['Assignee'])
-            return pr
+            pull = self.request('POST', f'/repos/{full_name}/pulls', json={
+                'title': data['Title'],
+                'body': data['Body'],
+                'base': data['Base'],
+                'head': data['Head'],
+                'draft': data['Draft'],
+            }).json()
+        except RateLimitExceededException:
+            raise
         except Exception:
             return None
+        if data['Assignee']:
+            # The pulls API doesn't take assignees, they are set on the issue of the pull request
+            try:
+                self.request('POST', f'/repos/{full_name}/issues/{pull["number"]}/assignees',
+                             json={'assignees': [data['Assignee']]})
+            except GithubException as e:
+                logging.warning('Couldn\'t assign %s to %s#%s: %s', data['Assignee'], full_name, pull['number'], e)
+        return get_pull_record(pull)
+
+
+def parse_item_url(part_of_url: str) -> Tuple[str, int]:
+    """
+    Function for parsing the part of issue api url sent in callback data
+    :param part_of_url: string in format owner/repo/issues/number
+    :return: full name of the repository and number of the item
+    :raise ValueError: the string has another format
+    """
+    owner, repo, kind, number = part_of_url.split('/')
+    if kind not in ('issues', 'pulls'):
+        raise ValueError(f'Unknown kind of item: {kind}')
+    return f'{owner}/{repo}', int(number)
+
+
+def get_html_url(api_url: str) -> str:
+    """
+    Function for converting api url of issue or pull request to the url of its page
+    :param api_url: e.g. https://api.github.com/repos/owner/repo/pulls/1
+    :return: e.g. https://github.com/owner/repo/pull/1
+    """
+    owner, repo, kind, number = api_url.split('/repos/', 1)[1].split('/')[:4]
+    return f'https://github.com/{owner}/{repo}/{"pull" if kind == "pulls" else kind}/{number}'
+
+
+def get_issue_record(item: dict) -> IssueRecord:
+    """
+    Function for taking the shown fields of issue or pull request, the author is a login,
+    because the name of the user isn't in the payload and costs a request per user
+    :param item: issue as GitHub returns it
+    :return: record of the issue
+    """
+    return IssueRecord(item['number'], item['title'], item['html_url'], item['repository_url'].split('/repos/', 1)[1],
+                       item['user']['login'], parse_date(item['created_at']), item['state'], item.get('pull_request'))
+
+
+def get_pull_record(item: dict) -> IssueRecord:
+    """
+    Function for taking the shown fields of pull request as the pulls API returns it
+    :param item: pull request as GitHub returns it
+    :return: record of the pull request
+    """
+    return IssueRecord(item['number'], item['title'], item['html_url'], item['base']['repo']['full_name'],
+                       item['user']['login'], parse_date(item['created_at']), item['state'], {'url': item['url']})
+
+
+def get_item_record(item: dict) -> ItemRecord:
+    """
+    Function for taking the fields of repository details from issue or pull request
+    :param item: issue as GitHub returns it
+    :return: record of the item
+    """
+    return ItemRecord(item['number'], item['title'], item['html_url'], 'pull_request' in item)
+
+
+def get_repo_record(repo: dict) -> RepoRecord:
+    """
+    Function for taking the fields of get_repo_details from the repository as REST API returns it,
+    e.g. from the listing of /repos or from a webhook delivery
+    :param repo: decoded repository
+    :return: record of the repository
+    """
+    return RepoRecord(
+        name=repo['name'],
+        full_name=repo['full_name'],
+        html_url=repo['html_url'],
+        default_branch=repo['default_branch'],
+        private=repo['private'],
+        archived=repo['archived'],
+        stargazers_count=repo['stargazers_count'],
+        forks_count=repo['forks_count'],
+        open_issues_count=repo['open_issues_count'],
+        language=repo['language'],
+        created_at=parse_date(repo['created_at']),
+        updated_at=parse_date(repo['updated_at']),
+    )
+
+
+def parse_date(value: str) -> datetime:
+    """
+    Function for parsing GitHub timestamp
+    :param value: timestamp in ISO 8601 format
+    :return: datetime object
+    """
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+
+
+class ApiRegistry:
+    """
+    Class for reusing Api objects, their sessions and connection pools between updates of the same user
+    """
+
+    def __init__(self, factory: Callable[[str], Api], maxsize: int = 1000, idle_ttl: float = 600,
+                 timer: Callable[[], float] = time.monotonic):
+        """
+        Create the empty registry
+        :param factory: function that creates Api object for the token
+        :param maxsize: maximum number of stored objects, the least recently used one is closed
+        :param idle_ttl: number of seconds after the last use when the object is closed
+        :param timer: function that returns current time in seconds
+        """
+        self.factory = factory
+        self.clients = TTLCache(maxsize, idle_ttl, timer, sliding=True, on_evict=lambda key, api: api.close())
+        self.task: Optional[asyncio.Task] = None
+
+    def get(self, token: str) -> Api:
+        """
+        Method for getting Api object of the token
+        :param token: decrypted GitHub token
+        :return: new or reused Api object
+        """
+        key = hashlib.sha256(token.encode()).hexdigest()
+        api = self.clients.get(key)
+        if api is None:
+            api = self.factory(token)
+            self.clients.set(key, api)
+        return api
+
+    def expire(self) -> int:
+        """
+        Method for closing objects of users that haven't come back during idle_ttl
+        :return: number of closed objects
+        """
+        return self.clients.expire()
+
+    async def run(self, interval: float) -> None:
+        """
+        Method for closing idle objects periodically, it runs until the task is cancelled
+        :param interval: number of seconds between sweeps
+        :return: nothing to return
+        """
+        while True:
+            await asyncio.sleep(interval)
+            closed = self.expire()
+            if closed:
+                logging.info('Closed %s idle GitHub clients', closed)
+
+    def start(self, interval: float) -> None:
+        """
+        Method for starting the periodic sweep in the background, it must be called from the running event loop,
+        e.g. from the startup hook of the bot
+        :param interval: number of seconds between sweeps, objects live up to idle_ttl plus interval without use
+        :return: nothing to return
+        """
+        self.task = asyncio.ensure_future(self.run(interval))
+
+    async def stop(self) -> None:
+        """
+        Method for stopping the periodic sweep
+        :return: nothing to return
+        """
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def close(self) -> None:
+        """
+        Method for closing all stored objects
+        :return: nothing to return
+        """
+        for api in self.clients.values():
+            api.close()
+        self.clients.clear()
+
+
+class AsyncApi:
+    """
+    Class for calling Api methods from coroutines without blocking the event loop
+    """
+
+    def __init__(self, api: Api, executor: ThreadPoolExecutor = None, timeout: float = 30):
+        """
+        Create the wrapper around synchronous Api
+        :param api: synchronous Api object
+        :param executor: bounded thread pool for GitHub calls, the default loop executor if None
+        :param timeout: number of seconds to wait for one call
+        """
+        self.api = api
+        self.executor = executor
+        self.timeout = timeout
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Method for running any blocking function in the thread pool
+        :param func: blocking function, e.g. lazy PyGithub attribute access
+        :return: result of the function
+        :raise asyncio.TimeoutError: the call took longer than timeout
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, self.timeout)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.api, name)
+        if not callable(attribute):
+            return attribute
+
+        async def method(*args, **kwargs) -> Any:
+            return await self.run(attribute, *args, **kwargs)
+
+        return method
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Tuple
+
+
+class BatchResult(NamedTuple):
+    """
+    Status of one item of the batch
+    """
+    target: str
+    ok: bool
+    error: str = ''
+
+
+class Selection(NamedTuple):
+    """
+    Items selected in the select mode of /issues or /prs and the pages as the user saw them,
+    so buttons of the page point to the shown items even if the listing has changed since
+    """
+    items: Dict[str, None]
+    pages: Dict[int, Tuple[list, bool]]
+
+
+async def run_batch(targets: List[str], action: Callable[[str], Awaitable[bool]],
+                    concurrency: int = 4) -> List[BatchResult]:
+    """
+    Function for running the action for every target with bounded concurrency, one failure doesn't stop the others
+    :param targets: arguments of the action, e.g. parts of api urls of issues
+    :param action: coroutine function that returns the status of the action
+    :param concurrency: maximum number of actions running at once
+    :return: results in the order of targets
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(target: str) -> BatchResult:
+        async with semaphore:
+            try:
+                return BatchResult(target, bool(await action(target)))
+            except Exception as e:
+                logging.warning('Batch action for %s failed: %r', target, e)
+                return BatchResult(target, False, type(e).__name__)
+
+    return list(await asyncio.gather(*(run(target) for target in targets)))
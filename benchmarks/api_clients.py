@@ -0,0 +1,59 @@
+"""
+Handler latency with a new Api object per update (cold) versus a reused one from ApiRegistry (warm),
+measured against a local fake GitHub server:
+    python -m benchmarks.api_clients --updates 200
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from api import Api, ApiRegistry
+from fake_github import FakeGitHub
+
+
+def measure(get_api: Callable[[], Api], updates: int) -> List[float]:
+    """
+    Function for measuring latency of simulated /issues updates
+    :param get_api: function that returns Api object for the update
+    :param updates: number of simulated updates
+    :return: latencies in milliseconds
+    """
+    latencies = []
+    for _ in range(updates):
+        start = time.perf_counter()
+        get_api().get_issues_or_prs_page(True)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(title: str, latencies: List[float]) -> None:
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f'{title}: mean {statistics.mean(latencies):.2f} ms, '
+          f'p50 {statistics.median(latencies):.2f} ms, p99 {p99:.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--updates', type=int, default=200)
+    args = parser.parse_args()
+
+    with FakeGitHub() as github:
+        github.add_repo('portfolio')
+        for index in range(30):
+            github.add_issue('portfolio', f'Issue {index}')
+
+        def create_api(token: str = 'token') -> Api:
+            return Api(token, base_url=github.base_url)
+
+        registry = ApiRegistry(create_api)
+        report('Cold: new Api per update', measure(create_api, args.updates))
+        github.reset_requests()
+        report('Warm: Api from registry', measure(lambda: registry.get('token'), args.updates))
+        print(f'Requests to /user with registry: {github.count_requests(path="/user")}')
+        registry.close()
+
+
+if __name__ == '__main__':
+    main()
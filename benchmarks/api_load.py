@@ -0,0 +1,62 @@
+"""
+Throughput of GitHub calls made by N concurrent simulated users against a fake GitHub server.
+
+Compares calling the synchronous Api directly from coroutines (blocks the event loop)
+with AsyncApi running the calls in a bounded thread pool:
+    python -m benchmarks.api_load --users 50 --delay 0.05
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api import Api, AsyncApi
+from fake_github import FakeGitHub
+
+
+async def blocking_user(base_url: str, calls: int) -> None:
+    api = Api('token', base_url=base_url)
+    for _ in range(calls):
+        api.get_repo('portfolio')
+
+
+async def async_user(base_url: str, calls: int, executor: ThreadPoolExecutor) -> None:
+    api = AsyncApi(Api('token', base_url=base_url), executor)
+    for _ in range(calls):
+        await api.get_repo('portfolio')
+
+
+def report(title: str, users: int, calls: int, elapsed: float) -> None:
+    total = users * calls
+    print(f'{title}: {total} calls in {elapsed:.2f} s, {total / elapsed:.1f} calls/s')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--calls', type=int, default=3)
+    parser.add_argument('--delay', type=float, default=0.05, help='latency of the fake GitHub server')
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    with FakeGitHub(delay=args.delay) as github:
+        github.add_repo('portfolio')
+
+        async def run_blocking():
+            await asyncio.gather(*(blocking_user(github.base_url, args.calls) for _ in range(args.users)))
+
+        start = time.perf_counter()
+        asyncio.run(run_blocking())
+        report('Blocking Api', args.users, args.calls, time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            async def run_async():
+                await asyncio.gather(*(async_user(github.base_url, args.calls, executor) for _ in range(args.users)))
+
+            start = time.perf_counter()
+            asyncio.run(run_async())
+            report('AsyncApi', args.users, args.calls, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
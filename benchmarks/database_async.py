@@ -0,0 +1,73 @@
+"""
+Simultaneous token lookups from coroutines: blocking Client calls versus AsyncClient.
+A ticker coroutine measures how long the event loop is stalled while the lookups run.
+
+Run against a local mongod stand-in:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.database_async --lookups 500
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Tuple
+
+from config import MONGO_URI, MONGO_POOL_SIZE
+from database import AsyncClient, Client
+
+DB_NAME = 'githubhelper_benchmark'
+COLLECTION_NAME = 'tokens'
+
+
+async def measure(lookup: Callable[[int], Awaitable[dict]], lookups: int) -> Tuple[float, float]:
+    """
+    Function for running all lookups at once like simultaneous updates do
+    :param lookup: coroutine function that finds the token of one user
+    :param lookups: number of simultaneous lookups
+    :return: total time and the longest stall of the event loop in milliseconds
+    """
+    stall = 0.0
+    done = False
+
+    async def tick() -> None:
+        nonlocal stall
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, (time.perf_counter() - start) * 1000 - 1)
+
+    ticker = asyncio.ensure_future(tick())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(lookup(index % 100) for index in range(lookups)))
+    total = (time.perf_counter() - start) * 1000
+    done = True
+    await ticker
+    return total, stall
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--uri', default=MONGO_URI or 'mongodb://localhost:27017')
+    parser.add_argument('--lookups', type=int, default=500)
+    args = parser.parse_args()
+
+    db = Client('', DB_NAME, COLLECTION_NAME, args.uri, MONGO_POOL_SIZE)
+    db.collection.drop()
+    db.collection.insert_many([{'telegram_id': user_id, 'token': b'token'} for user_id in range(100)])
+    async_db = AsyncClient('', DB_NAME, COLLECTION_NAME, args.uri, MONGO_POOL_SIZE)
+
+    async def blocking_lookup(user_id: int) -> dict:
+        return db.get({'telegram_id': user_id})
+
+    async def async_lookup(user_id: int) -> dict:
+        return await async_db.get({'telegram_id': user_id})
+
+    for title, lookup in (('Blocking Client', blocking_lookup), ('AsyncClient', async_lookup)):
+        total, stall = asyncio.run(measure(lookup, args.lookups))
+        print(f'{title}: {args.lookups} lookups in {total:.1f} ms, longest event loop stall {stall:.1f} ms')
+    db.collection.drop()
+    AsyncClient.shutdown()
+    Client.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-update token lookup latency: a new MongoClient per update versus the shared pool.
+
+Run against a local mongod stand-in:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.database_pool --updates 500
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from pymongo import MongoClient
+
+from config import MONGO_URI, MONGO_POOL_SIZE
+from database import Client
+
+DB_NAME = 'githubhelper_benchmark'
+COLLECTION_NAME = 'tokens'
+
+
+def measure(lookup: Callable[[int], dict], updates: int) -> List[float]:
+    """
+    Function for measuring the latency of every simulated update
+    :param lookup: function that finds the token of one user
+    :param updates: number of simulated updates
+    :return: latencies in milliseconds
+    """
+    latencies = []
+    for index in range(updates):
+        start = time.perf_counter()
+        lookup(index % 100)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(title: str, latencies: List[float]) -> None:
+    """
+    Function for printing latency statistics
+    :param title: name of the measured approach
+    :param latencies: latencies in milliseconds
+    :return: nothing to return
+    """
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f'{title}: mean {statistics.mean(latencies):.2f} ms, '
+          f'p50 {statistics.median(latencies):.2f} ms, p99 {p99:.2f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--uri', default=MONGO_URI or 'mongodb://localhost:27017')
+    parser.add_argument('--updates', type=int, default=500)
+    args = parser.parse_args()
+
+    db = Client('', DB_NAME, COLLECTION_NAME, args.uri, MONGO_POOL_SIZE)
+    db.collection.drop()
+    db.collection.insert_many([{'telegram_id': user_id, 'token': b'token'} for user_id in range(100)])
+
+    def lookup_with_new_client(user_id: int) -> dict:
+        cluster = MongoClient(args.uri)
+        try:
+            return cluster[DB_NAME][COLLECTION_NAME].find_one({'telegram_id': user_id})
+        finally:
+            cluster.close()
+
+    def lookup_with_shared_pool(user_id: int) -> dict:
+        return Client('', DB_NAME, COLLECTION_NAME, args.uri, MONGO_POOL_SIZE).get({'telegram_id': user_id})
+
+    report('New MongoClient per update', measure(lookup_with_new_client, args.updates))
+    report('Shared connection pool', measure(lookup_with_shared_pool, args.updates))
+    db.collection.drop()
+    Client.close_all()
+
+
+if __name__ == '__main__':
+    main()
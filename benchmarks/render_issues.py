@@ -0,0 +1,109 @@
+"""
+Rendering 1,000 synthetic issues in pages of /issues: PyGithub objects with lazy user.name,
+string concatenation and a coroutine per date, versus plain records and templates.
+GitHub is imitated by FakeGitHub, so request counts are exact:
+    python -m benchmarks.render_issues --issues 1000 --page-size 10
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from aiogram import types
+from github.Issue import Issue
+
+from api import Api, AsyncApi, get_issue_record
+from fake_github import FakeGitHub
+from render import render_issues_page
+
+QUERY = 'is:issue is:open user:octocat'
+
+
+async def prepare_date(date: datetime):
+    return date.strftime('%d/%m/%Y')
+
+
+async def render_legacy(api_worker: AsyncApi, items: List[Issue], option: bool, page: int,
+                        page_size: int) -> Tuple[str, types.InlineKeyboardMarkup]:
+    """
+    Function with the rendering of /issues as it was before the records
+    """
+    authors = await api_worker.run(lambda: [item.user.name for item in items])
+    final_text = ''
+    index = (page - 1) * page_size + 1
+    buttons = []
+    length_of_url = len(api_worker.url)
+    inline_keyboard = types.InlineKeyboardMarkup(row_width=4)
+    for item, author in zip(items, authors):
+        repository_url = item.html_url.rsplit('/', 2)[0]
+        final_text += f'*{index}*. _{item.title}_ [#{item.number}]({item.html_url}), ' \
+                      f'[link to repository]({repository_url}).\n' \
+                      f'Created: _{await prepare_date(item.created_at)}_. ' \
+                      f'Author: _{author}_\n'
+        short_url = item.url[length_of_url:]
+        buttons.append(types.InlineKeyboardButton(f'Close {index}', callback_data=f'c{short_url}'))
+        index += 1
+    inline_keyboard.add(*buttons)
+    return final_text, inline_keyboard
+
+
+async def render_records(api_worker: AsyncApi, items: list, option: bool, page: int,
+                         page_size: int) -> Tuple[str, types.InlineKeyboardMarkup]:
+    return render_issues_page(items, option, page, False, page_size)
+
+
+def measure(github: FakeGitHub, api: Api, convert: Callable, render: Callable, pages: int,
+            page_size: int) -> Tuple[int, int, float]:
+    """
+    Function for fetching and rendering all pages
+    :return: search requests, other requests and CPU milliseconds per rendered page
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    api_worker = AsyncApi(api, executor, timeout=600)
+    github.requests.clear()
+    cpu = 0.0
+
+    async def run() -> None:
+        nonlocal cpu
+        for page in range(1, pages + 1):
+            result, _ = api.get_json('/search/issues', {'q': QUERY, 'per_page': page_size, 'page': page})
+            start = time.process_time()
+            items = [convert(item) for item in result['items']]
+            await render(api_worker, items, True, page, page_size)
+            cpu += time.process_time() - start
+
+    asyncio.run(run())
+    executor.shutdown()
+    search = github.count_requests(path='/search/issues')
+    return search, github.count_requests() - search, cpu * 1000 / pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--issues', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--authors', type=int, default=50)
+    args = parser.parse_args()
+
+    github = FakeGitHub().start()
+    github.add_repo('portfolio')
+    for index in range(args.issues):
+        github.add_issue('portfolio', f'Issue {index}', user=github.user_payload(f'user{index % args.authors}'))
+    api = Api('token', base_url=github.base_url)
+    pages = -(-args.issues // args.page_size)
+    cases = (
+        ('PyGithub objects, user.name', lambda item: api.g.create_from_raw_data(Issue, item), render_legacy),
+        ('Records, login', get_issue_record, render_records),
+    )
+    for title, convert, render in cases:
+        search, other, cpu = measure(github, api, convert, render, pages, args.page_size)
+        # CPU time of PyGithub objects includes sending the user requests and parsing their responses
+        print(f'{title}: {search} search requests, {other} other requests, {cpu:.2f} ms CPU per page')
+    api.close()
+    github.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Throughput and latency of webhook updates routed by user id to 1, 2 and 4 worker processes.
+A synthetic stream of updates is replayed through UpdateRouter, every worker spends CPU time and waits for I/O
+like a handler does and checks that updates of every user come in order:
+    python -m benchmarks.webhook_shards --users 200 --updates 2000 --cpu-ms 2 --io-ms 20
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import statistics
+import time
+from typing import List
+
+from aiohttp import ClientError, ClientSession, web
+
+from router import UpdateRouter, get_shard_key
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_worker(port: int, cpu_ms: float, io_ms: float) -> None:
+    """
+    Function for running one worker process that imitates handlers of the bot
+    :param port: port of the worker
+    :param cpu_ms: milliseconds of CPU work per update
+    :param io_ms: milliseconds of waiting for GitHub or database per update
+    :return: nothing to return
+    """
+    last_update = {}
+    stats = {'updates': 0, 'out_of_order': 0}
+
+    async def handle(request: web.Request) -> web.Response:
+        update = await request.json()
+        user = get_shard_key(update)
+        if last_update.get(user, -1) > update['update_id']:
+            stats['out_of_order'] += 1
+        last_update[user] = update['update_id']
+        deadline = time.perf_counter() + cpu_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        await asyncio.sleep(io_ms / 1000)
+        stats['updates'] += 1
+        return web.json_response({})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post('/webhook', handle)
+    app.router.add_get('/stats', get_stats)
+    web.run_app(app, host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def generate_updates(users: int, updates: int) -> List[dict]:
+    random.seed(0)
+    return [{'update_id': index, 'message': {'from': {'id': random.randrange(users)}, 'text': '/repos'}}
+            for index in range(updates)]
+
+
+async def wait_ready(urls: List[str]) -> None:
+    async with ClientSession() as session:
+        for url in urls:
+            while True:
+                try:
+                    async with session.get(f'{url}/stats'):
+                        break
+                except ClientError:
+                    await asyncio.sleep(0.05)
+
+
+async def get_worker_stats(urls: List[str]) -> List[dict]:
+    async with ClientSession() as session:
+        stats = []
+        for url in urls:
+            async with session.get(f'{url}/stats') as response:
+                stats.append(await response.json())
+        return stats
+
+
+async def replay(urls: List[str], updates: List[dict], connections: int) -> List[float]:
+    """
+    Function for sending updates in order with limited number of parallel connections like Telegram does
+    :param urls: base urls of the workers
+    :param updates: synthetic updates
+    :param connections: maximum number of updates in flight
+    :return: latencies in milliseconds
+    """
+    router = UpdateRouter(urls)
+    await router.start()
+    semaphore = asyncio.Semaphore(connections)
+    latencies = []
+
+    async def send(update: dict) -> None:
+        start = time.perf_counter()
+        status, _, _ = await router.forward(get_shard_key(update), '/webhook', json.dumps(update).encode())
+        latencies.append((time.perf_counter() - start) * 1000)
+        semaphore.release()
+        if status != 200:
+            raise RuntimeError(f'Worker answered {status}')
+
+    tasks = []
+    for update in updates:
+        await semaphore.acquire()
+        tasks.append(asyncio.ensure_future(send(update)))
+    await asyncio.gather(*tasks)
+    await router.close()
+    return latencies
+
+
+def measure(workers: int, updates: List[dict], connections: int, cpu_ms: float, io_ms: float) -> None:
+    ports = [get_free_port() for _ in range(workers)]
+    urls = [f'http://127.0.0.1:{port}' for port in ports]
+    processes = [multiprocessing.Process(target=run_worker, args=(port, cpu_ms, io_ms), daemon=True)
+                 for port in ports]
+    for process in processes:
+        process.start()
+    try:
+        asyncio.run(wait_ready(urls))
+        start = time.perf_counter()
+        latencies = sorted(asyncio.run(replay(urls, updates, connections)))
+        elapsed = time.perf_counter() - start
+        stats = asyncio.run(get_worker_stats(urls))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.join()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f'{workers} worker(s): {len(updates) / elapsed:.0f} updates/s, p50 {statistics.median(latencies):.1f} ms, '
+          f'p99 {p99:.1f} ms, updates by worker {[item["updates"] for item in stats]}, '
+          f'out of order {sum(item["out_of_order"] for item in stats)}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--updates', type=int, default=2000)
+    parser.add_argument('--connections', type=int, default=40, help='max_connections of the Telegram webhook')
+    parser.add_argument('--cpu-ms', type=float, default=2)
+    parser.add_argument('--io-ms', type=float, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    updates = generate_updates(args.users, args.updates)
+    for workers in args.workers:
+        measure(workers, updates, args.connections, args.cpu_ms, args.io_ms)
+
+
+if __name__ == '__main__':
+    main()
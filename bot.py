@@ -1,29 +1,54 @@
+import asyncio
 import logging
-import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Tuple, Any
-
-from github.Repository import Repository
-from github.GithubException import BadCredentialsException, GithubException
-
-from api import Api
-from database import Client
+from typing import Any, Optional, Tuple
+from urllib.parse import urlparse
+
+from github.GithubException import BadCredentialsException, GithubException, RateLimitExceededException
+from pymongo.errors import PyMongoError
+
+from api import Api, ApiRegistry, AsyncApi, parse_item_url
+from batch import Selection, run_batch
+from cache import TTLCache
+from database import AsyncClient, Client
+from github_webhook import EVENTS, GitHubWebhook
+from http_cache import create_response_cache
 from hashing import Hasher
-from config import API_TOKEN, DB_PASSWORD, HASH_KEY
-
-from aiogram import Bot, Dispatcher, executor, types
+from notifier import NotificationPoller
+from pr_prefetch import PullRequestPrefetch
+from render import CLOSE, MERGE, CREATE_ISSUE, CREATE_PR, PAGE, REPO, REPO_PAGE, SELECT, TOGGLE, BATCH, BRANCH, \
+    get_short_url, render_batch_summary, render_branches, render_issues_page, render_repo, render_repos
+from repo_index import RepoIndex
+from repo_snapshot import RepoSnapshots
+from send_queue import QueuedBot, SendQueue
+from storage import LocalStorage, MongoStorage
+from config import API_TOKEN, DB_PASSWORD, HASH_KEY, HASH_OLD_KEYS, MONGO_URI, MONGO_POOL_SIZE, \
+    TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, PAGE_SIZE, PAGE_CACHE_SIZE, PAGE_CACHE_TTL, SELECTION_TTL, BATCH_CONCURRENCY, \
+    API_CLIENTS_SIZE, API_CLIENTS_TTL, API_CLIENTS_SWEEP, \
+    GITHUB_WORKERS, GITHUB_TIMEOUT, GITHUB_GRAPHQL, GITHUB_CACHE, GITHUB_CACHE_PATH, GITHUB_CACHE_SIZE, \
+    FSM_STORAGE, FSM_REDIS_URL, FSM_STATE_TTL, REPO_INDEX_SIZE, REPO_INDEX_TTL, \
+    REPO_PAGE_SIZE, REPO_SNAPSHOT_SIZE, REPO_SNAPSHOT_TTL, PR_PREFETCH_SIZE, PR_PREFETCH_TTL, BRANCH_BUTTONS, \
+    NOTIFICATIONS_CONCURRENCY, NOTIFICATIONS_INTERVAL, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST, \
+    GITHUB_WEBHOOK_SECRET, GITHUB_WEBHOOK_PATH, GITHUB_WEBHOOK_URL, \
+    WEBHOOK_PATH, WEBHOOK_URL, WEBHOOK_WORKER, WORKER_INDEX, WORKER_COUNT, WEBAPP_HOST, WEBAPP_PORT
+
+from aiogram import Dispatcher, executor, types
 from aiogram.dispatcher.filters.state import StatesGroup, State
 from aiogram.contrib.middlewares.logging import LoggingMiddleware
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Text
 from aiogram.contrib.fsm_storage.memory import MemoryStorage
-from aiogram.utils.executor import start_webhook
+from aiogram.dispatcher.storage import BaseStorage
+from aiogram.utils.exceptions import BotBlocked, ChatNotFound, RetryAfter, UserDeactivated
+from aiogram.utils.executor import set_webhook
+from aiohttp import web
 
 # Constants
-CLOSE = 'c'
-MERGE = 'm'
-CREATE_ISSUE = 'i'
-CREATE_PR = 'p'
+FILTERS = ('repo', 'owner', 'label', 'author', 'state')
+STATES = ('open', 'closed', 'all')
+# Keys of the FSM bucket with filters of the last /issues and /prs, finishing a flow doesn't reset the bucket
+LISTING_FILTERS = {True: 'IssueFilters', False: 'PullFilters'}
 
 
 class Issue(StatesGroup):
@@ -54,11 +79,101 @@ class PullRequest(StatesGroup):
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+
+def create_storage(backend: str) -> BaseStorage:
+    """
+    Function for creating storage of conversation states by name of the backend
+    :param backend: 'mongo', 'redis', 'local' or 'memory'
+    :return: storage object
+    """
+    if backend == 'mongo':
+        return MongoStorage(lambda: Client(DB_PASSWORD, 'githubhelper', 'states', MONGO_URI, MONGO_POOL_SIZE).collection,
+                            FSM_STATE_TTL)
+    if backend == 'redis':
+        # Needs aioredis, it isn't installed with the bot by default
+        from aiogram.contrib.fsm_storage.redis import RedisStorage2
+        url = urlparse(FSM_REDIS_URL)
+        return RedisStorage2(url.hostname or 'localhost', url.port or 6379, db=int(url.path.strip('/') or 0),
+                             password=url.password, ssl=url.scheme == 'rediss', state_ttl=FSM_STATE_TTL,
+                             data_ttl=FSM_STATE_TTL, bucket_ttl=FSM_STATE_TTL)
+    if backend == 'local':
+        return LocalStorage()
+    if backend == 'memory':
+        return MemoryStorage()
+    raise ValueError(f'Unknown storage backend: {backend}')
+
+
 # Init bot and dispatcher
-bot = Bot(token=API_TOKEN)
-dp = Dispatcher(bot, storage=MemoryStorage())
+# Everything sent to chats goes through the queue that keeps Telegram flood limits
+send_queue = SendQueue(TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST)
+bot = QueuedBot(API_TOKEN, send_queue)
+dp = Dispatcher(bot, storage=create_storage(FSM_STORAGE))
 dp.middleware.setup(LoggingMiddleware())
 
+# Decrypted GitHub tokens by Telegram user id
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+# Pages of /issues and /prs by Telegram user id
+page_cache = TTLCache(PAGE_CACHE_SIZE, PAGE_CACHE_TTL)
+
+# Selected issues and pull requests and the pages they were selected on by Telegram user id and option,
+# while the select mode is on,
+# every press of a button prolongs the selection
+selections = TTLCache(PAGE_CACHE_SIZE, SELECTION_TTL, sliding=True)
+
+# Names of repositories by Telegram user id, refreshed by /repos
+repo_indexes = TTLCache(REPO_INDEX_SIZE, REPO_INDEX_TTL)
+
+# Repositories from /repos and pages of their issues by Telegram user id, for the detail view
+repo_snapshots = RepoSnapshots(REPO_SNAPSHOT_SIZE, REPO_SNAPSHOT_TTL, REPO_PAGE_SIZE)
+
+# Branches and assignees of the repository by Telegram user id, while /create_pr goes on
+pr_prefetch = PullRequestPrefetch(PR_PREFETCH_SIZE, PR_PREFETCH_TTL)
+
+# Bounded thread pool for blocking GitHub calls
+github_executor = ThreadPoolExecutor(max_workers=GITHUB_WORKERS, thread_name_prefix='github')
+
+# GitHub responses for conditional requests, shared between users
+response_cache = create_response_cache(GITHUB_CACHE, GITHUB_CACHE_PATH, GITHUB_CACHE_SIZE)
+
+
+def create_api(token: str) -> Api:
+    """
+    Function for creating Api object with settings of the bot
+    :param token: decrypted GitHub token
+    :return: Api object
+    """
+    return Api(token, timeout=GITHUB_TIMEOUT, use_graphql=GITHUB_GRAPHQL, cache=response_cache)
+
+
+# Authenticated GitHub clients by token, reused between updates
+api_registry = ApiRegistry(create_api, API_CLIENTS_SIZE, API_CLIENTS_TTL)
+
+
+def get_api(token: str) -> AsyncApi:
+    """
+    Function for getting the GitHub worker that does not block the event loop
+    :param token: decrypted GitHub token
+    :return: asynchronous Api object
+    """
+    return AsyncApi(api_registry.get(token), github_executor, GITHUB_TIMEOUT)
+
+
+def get_tokens_db() -> AsyncClient:
+    """
+    Function for getting the tokens collection, all calls share one connection pool
+    :return: asynchronous database client
+    """
+    return AsyncClient(DB_PASSWORD, 'githubhelper', 'tokens', MONGO_URI, MONGO_POOL_SIZE)
+
+
+def get_watches_db() -> AsyncClient:
+    """
+    Function for getting the collection of watched repositories, one document per user and repository
+    :return: asynchronous database client
+    """
+    return AsyncClient(DB_PASSWORD, 'githubhelper', 'watches', MONGO_URI, MONGO_POOL_SIZE)
+
 
 async def decrypt_token(user_id: int) -> str:
     """
@@ -66,120 +181,402 @@ async def decrypt_token(user_id: int) -> str:
     :param user_id: user id in Telegram
     :return: decrypted token
     """
-    db = Client(DB_PASSWORD, 'githubhelper', 'tokens')
-    data = db.get({'telegram_id': user_id})
-    hasher = Hasher(HASH_KEY)
+    decrypted_token = token_cache.get(user_id)
+    if decrypted_token:
+        return decrypted_token
+    db = get_tokens_db()
+    data = await db.get({'telegram_id': user_id}, {'token': True, '_id': False})
+    hasher = Hasher(HASH_KEY, HASH_OLD_KEYS)
     try:
         encrypted_token = data.get('token')
         decrypted_token = hasher.decrypt_message(encrypted_token)
-        return decrypted_token
     except Exception:
         return ''
+    if decrypted_token:
+        token_cache.set(user_id, decrypted_token)
+    return decrypted_token
 
 
-async def get_full_repo(repo: Repository) -> Tuple[str, types.InlineKeyboardMarkup]:
+async def get_poll_api(user_id: int) -> Optional[AsyncApi]:
     """
-    Function for returning pretty information about repository
-    :param repo: object with data about Repository
-    :return: text and keyboard with buttons
+    Function for getting the GitHub worker of the subscribed user
+    :param user_id: user id in Telegram
+    :return: asynchronous Api object or None if the token was removed
     """
-    inline_keyboard = types.InlineKeyboardMarkup(row_width=2)
-    inline_keyboard.add(types.InlineKeyboardButton('Create issue', callback_data=f'i{repo.name}'))
-    inline_keyboard.add(types.InlineKeyboardButton('Create pull request', callback_data=f'p{repo.name}'))
-    for issue in repo.get_issues():
-        if not issue.pull_request:
-            button = types.InlineKeyboardButton(f'Issue #{issue.number} - {issue.title}', url=issue.html_url)
-        else:
-            button = types.InlineKeyboardButton(f'Pull request #{issue.number} - {issue.title}',
-                                                url=issue.html_url)
-        inline_keyboard.add(button)
-    final_text = f'Name: *{repo.name}*, link: [click here]({repo.html_url})\n' \
-                 f'Total stars: _{repo.stargazers_count}_\n' \
-                 f'Total issues and prs: _{repo.get_issues().totalCount}_\n' \
-                 f'Total forks: _{repo.forks_count}_\n' \
-                 f'Main language: _{repo.language}_\n' \
-                 f'Created at: _{await prepare_date(repo.created_at)}_\n' \
-                 f'Updated at: _{await prepare_date(repo.updated_at)}_\n' \
-                 f'Type: _{"Private" if repo.private else "Public"}_\n'
-    return final_text, inline_keyboard
-
-
-async def prepare_issues_or_prs(token: str, option: bool) -> Tuple[str, types.InlineKeyboardMarkup]:
-    """
-    Function for returning pretty information about issues or pull requests
+    decrypted_token = await decrypt_token(user_id)
+    return get_api(decrypted_token) if decrypted_token else None
+
+
+async def send_notification(user_id: int, text: str) -> None:
+    """
+    Function for sending the GitHub notification, users that have blocked the bot are unsubscribed
+    :param user_id: user id in Telegram
+    :param text: HTML text of the notification
+    :return: nothing to return
+    """
+    try:
+        await bot.send_message(user_id, text, parse_mode='HTML', disable_web_page_preview=True)
+    except (BotBlocked, ChatNotFound, UserDeactivated):
+        notification_poller.unsubscribe(user_id)
+        await get_tokens_db().update({'telegram_id': user_id}, {'notifications': False})
+
+
+async def get_watchers(full_name: str) -> list:
+    """
+    Function for getting users that watch the repository, behind the router only users of this worker
+    :param full_name: full name of the repository
+    :return: documents with telegram_id and login
+    """
+    watchers = await get_watches_db().find({'repo': full_name.lower()}, {'telegram_id': True, 'login': True, '_id': False})
+    return [item for item in watchers if item['telegram_id'] % WORKER_COUNT == WORKER_INDEX]
+
+
+def invalidate_repo(full_name: str, repo: dict) -> None:
+    """
+    Function for dropping cached data of the repository after GitHub has sent its event
+    :param full_name: full name of the repository
+    :param repo: repository fields from the event
+    :return: nothing to return
+    """
+    full_name = full_name.lower()
+    for pages in page_cache.values():
+        # Items of the listing shift, so all pages of the listing with the repository are stale
+        stale = {key[0] for key, page in pages.items() if any(item.repository.lower() == full_name for item in page[0])}
+        for key in [key for key in pages if key[0] in stale]:
+            del pages[key]
+    repo_snapshots.forget_repo(full_name)
+    for index in repo_indexes.values():
+        entry = index.get(repo['name'])
+        if entry and entry.full_name.lower() == full_name.lower():
+            index.add(repo)
+
+
+# Polls GitHub notifications of users that typed /subscribe
+notification_poller = NotificationPoller(get_poll_api, send_notification, NOTIFICATIONS_CONCURRENCY,
+                                         NOTIFICATIONS_INTERVAL)
+# Receives events of repositories that users watch with /watch
+github_webhook = GitHubWebhook(GITHUB_WEBHOOK_SECRET, get_watchers, send_notification, invalidate_repo)
+
+
+async def get_repo_index(user_id: int, api_worker: AsyncApi, repos: list = None) -> RepoIndex:
+    """
+    Function for getting the index of user repositories, it is built from the listing once per TTL
+    :param user_id: id of the Telegram user
+    :param api_worker: GitHub worker of the user
+    :param repos: repositories that were just listed, they replace the stored index
+    :return: index of repository names
+    """
+    index = repo_indexes.get(user_id) if repos is None else None
+    if index is None:
+        if repos is None:
+            repos = await api_worker.get_all_repos()
+        index = RepoIndex(await api_worker.get_login(), repos)
+        repo_indexes.set(user_id, index)
+    return index
+
+
+def get_not_found_text(text: str, index: RepoIndex, name: str) -> str:
+    """
+    Function for adding names that the user probably meant to the error text
+    :param text: error text
+    :param index: index of user repositories
+    :param name: name that the user has typed
+    :return: error text with suggestions
+    """
+    suggestions = index.suggest(name)
+    if suggestions:
+        text += f'\nDid you mean: {", ".join(suggestions)}?'
+    return text
+
+
+def parse_filters(text: str) -> dict:
+    """
+    Function for parsing filters of /issues and /prs commands
+    :param text: arguments of the command, e.g. repo:portfolio owner:acme label:bug author:mezgoodle state:closed
+    :return: dictionary with filters
+    """
+    filters = {}
+    for argument in text.split():
+        key, _, value = argument.partition(':')
+        if key in FILTERS and value and (key != 'state' or value in STATES):
+            filters[key] = value
+    return filters
+
+
+async def get_issues_or_prs_page(user_id: int, api_worker: AsyncApi, option: bool, page: int,
+                                 filters: dict = None) -> Tuple[list, bool]:
+    """
+    Function for getting page of issues or pull requests, recently viewed pages are cached,
+    filters of the listing are kept in the FSM storage, so they outlive the cached pages
+    :param user_id: user id in Telegram
+    :param api_worker: asynchronous Api object
+    :param option: issue or pull request
+    :param page: number of the page
+    :param filters: new filters from the command, the remembered ones are used if None
+    :return: list of items and whether the next page exists
+    """
+    pages = page_cache.get(user_id)
+    if pages is None:
+        pages = {}
+        page_cache.set(user_id, pages)
+    if filters is not None:
+        # The command starts a new listing, so pages viewed before are stale
+        for key in [key for key in pages if key[0] == option]:
+            del pages[key]
+        await dp.storage.update_bucket(chat=user_id, user=user_id, bucket={LISTING_FILTERS[option]: filters})
+    if (option, page) not in pages:
+        if filters is None:
+            bucket = await dp.storage.get_bucket(chat=user_id, user=user_id)
+            filters = bucket.get(LISTING_FILTERS[option], {})
+        pages[(option, page)] = await api_worker.get_issues_or_prs_page(option, page, PAGE_SIZE, filters)
+    return pages[(option, page)]
+
+
+async def prepare_issues_or_prs(user_id: int, token: str, option: bool, page: int = 1,
+                                filters: dict = None) -> Tuple[str, types.InlineKeyboardMarkup]:
+    """
+    Function for returning pretty information about one page of issues or pull requests,
+    in the select mode a page is fetched once and shown the same until the selection is over
+    :param user_id: user id in Telegram
     :param token: decrypted GitHub token
     :param option: issue or pull request
+    :param page: number of the page
+    :param filters: new filters from the command, the remembered ones are used if None
     :return: text and keyboard with buttons
     """
-    api_worker = Api(token)
-    items = api_worker.get_issues_or_prs(option)
-    final_text = ''
-    index = 1
-    buttons = []
-    length_of_url = 29
-    inline_keyboard = types.InlineKeyboardMarkup(row_width=4)
-    for item in items:
-        final_text += f'*{index}*. _{item.title}_ [#{item.number}]({item.html_url}), ' \
-                      f'[link to repository]({item.repository.html_url}).\n' \
-                      f'Created: _{await prepare_date(item.created_at)}_. ' \
-                      f'Author: _{item.user.name}_\n'
-        short_url = item.url[length_of_url:]
-        button = types.InlineKeyboardButton(f'Close {index}', callback_data=f'c{short_url}')
-        buttons.append(button)
-        if not option:
-            button = types.InlineKeyboardButton(f'Merge {index}', callback_data=f'm{short_url}')
-            buttons.append(button)
-        index += 1
-    inline_keyboard.add(*buttons)
-    return final_text, inline_keyboard
-
-
-async def prepare_date(date: datetime):
-    return date.strftime('%d/%m/%Y')
+    if filters is not None:
+        # The command starts a new listing without the select mode
+        (selections.get(user_id) or {}).pop(option, None)
+    selection = (selections.get(user_id) or {}).get(option)
+    if selection is not None and page in selection.pages:
+        items, has_next = selection.pages[page]
+    else:
+        items, has_next = await get_issues_or_prs_page(user_id, get_api(token), option, page, filters)
+        if selection is not None:
+            selection.pages[page] = (items, has_next)
+    return render_issues_page(items, option, page, has_next, PAGE_SIZE, selection.items if selection else None)
 
 
-@dp.callback_query_handler(lambda c: c.data)
-async def process_callback(callback_query: types.CallbackQuery) -> Any:
+def toggle_selection(user_id: int, option: bool, page: int, position: int) -> bool:
+    """
+    Function for selecting the item of the page as the user saw it or removing it from the selection
+    :param user_id: user id in Telegram
+    :param option: issue or pull request
+    :param page: number of the page
+    :param position: index of the item on the page
+    :return: False if the select mode is off or the page wasn't shown in it
     """
-    This handler will be called when user sends `/start` or `/help` command
+    selection = (selections.get(user_id) or {}).get(option)
+    if selection is None or page not in selection.pages or position >= len(selection.pages[page][0]):
+        return False
+    short_url = get_short_url(selection.pages[page][0][position])
+    if short_url in selection.items:
+        del selection.items[short_url]
+    else:
+        # Dictionary keeps the order of selection for the report
+        selection.items[short_url] = None
+    return True
+
+
+async def run_selected(user_id: int, token: str, option: bool, merge: bool) -> str:
+    """
+    Function for closing or merging selected items concurrently, the select mode is switched off
+    :param user_id: user id in Telegram
+    :param token: decrypted GitHub token
+    :param option: issue or pull request
+    :param merge: merge pull requests, otherwise close the items
+    :return: text of the report
+    """
+    selection = (selections.get(user_id) or {}).pop(option, None)
+    targets = list(selection.items) if selection else []
+    api_worker = get_api(token)
+    action = api_worker.merge_prs if merge else api_worker.close_issues_or_prs
+    results = await run_batch(targets, action, BATCH_CONCURRENCY)
+    page_cache.pop(user_id)
+    for result in results:
+        if result.ok:
+            repo_snapshots.forget(user_id, parse_item_url(result.target)[0])
+    return render_batch_summary(results, merge)
+
+
+async def answer_without_token(callback_query: types.CallbackQuery) -> types.Message:
+    return await bot.send_message(callback_query.from_user.id, 'Your token isn\'t in database. Type the command /token')
+
+
+# Handlers of buttons are checked in the order of registration, so one-letter prefixes go after the longer ones
+# that start with the same letter, e.g. PAGE before CREATE_PR
+@dp.callback_query_handler(lambda c: c.data.startswith(REPO_PAGE))
+async def process_repo_page_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user turns the page of repository details
     """
     user_id = callback_query.from_user.id
     decrypted_token = await decrypt_token(user_id)
-    if decrypted_token:
-        api_worker = Api(decrypted_token)
-        if callback_query.data.startswith(CLOSE):
-            if api_worker.close_issues_or_prs(callback_query.data[len(CLOSE):]):
-                return await bot.answer_callback_query(callback_query.id, 'Issue has been closed.')
-            else:
-                return await bot.answer_callback_query(callback_query.id, 'Error while closing.')
-        elif callback_query.data.startswith(MERGE):
-            if api_worker.merge_prs(callback_query.data[len(MERGE):]):
-                return await bot.answer_callback_query(callback_query.id, 'Pull request has been merged.')
-            else:
-                return await bot.answer_callback_query(callback_query.id, 'Error while merging.')
-        elif callback_query.data.startswith(CREATE_ISSUE):
-            await Issue.first()
-            await bot.send_message(callback_query.from_user.id, 'So, the name of repository is:')
-            message = await bot.send_message(callback_query.from_user.id, callback_query.data[1:])
-            message.from_user.id = callback_query.from_user.id
-            return await handle_complex_state(message, dp.current_state(), Issue, 'Write the title of issue:',
-                                              'Enter valid name of repository.', 'RepoName')
-        elif callback_query.data.startswith(CREATE_PR):
-            await PullRequest.first()
-            await bot.send_message(callback_query.from_user.id, 'So, the name of repository is:')
-            message = await bot.send_message(callback_query.from_user.id, callback_query.data[1:])
-            message.from_user.id = callback_query.from_user.id
-            return await handle_complex_state(message, dp.current_state(), PullRequest,
-                                              'Write the title of pull request:',
-                                              'Enter valid name of repository.', 'RepoName')
-        else:
-            data = api_worker.get_repo(callback_query.data)
-            final_text, inline_keyboard = await get_full_repo(data)
-            return await bot.send_message(callback_query.from_user.id, final_text, reply_markup=inline_keyboard,
-                                          parse_mode='Markdown')
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    name, page = callback_query.data[len(REPO_PAGE):].rsplit(':', 1)
+    data = await repo_snapshots.get_page(user_id, get_api(decrypted_token), name, int(page))
+    if not data:
+        return await bot.answer_callback_query(callback_query.id, 'Couldn\'t find your repository')
+    repo, items, has_next = data
+    final_text, inline_keyboard = render_repo(repo, items, int(page), has_next)
+    await bot.answer_callback_query(callback_query.id)
+    return await callback_query.message.edit_text(final_text, parse_mode='Markdown', reply_markup=inline_keyboard)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(PAGE))
+async def process_page_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user turns the page of /issues or /prs
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    option, page = callback_query.data[len(PAGE):].split(':')
+    final_text, inline_keyboard = await prepare_issues_or_prs(user_id, decrypted_token, option == '1', int(page))
+    await bot.answer_callback_query(callback_query.id)
+    return await callback_query.message.edit_text(final_text, parse_mode='Markdown', reply_markup=inline_keyboard)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(SELECT))
+async def process_select_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user switches the select mode of /issues or /prs on or off
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    option, page = callback_query.data[len(SELECT):].split(':')
+    user_selections = selections.get(user_id) or {}
+    if user_selections.pop(option == '1', None) is None:
+        user_selections[option == '1'] = Selection({}, {})
+    selections.set(user_id, user_selections)
+    final_text, inline_keyboard = await prepare_issues_or_prs(user_id, decrypted_token, option == '1', int(page))
+    await bot.answer_callback_query(callback_query.id)
+    return await callback_query.message.edit_text(final_text, parse_mode='Markdown', reply_markup=inline_keyboard)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(TOGGLE))
+async def process_toggle_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user selects the item in the select mode or removes it from the selection
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    option, page, position = callback_query.data[len(TOGGLE):].split(':')
+    if not toggle_selection(user_id, option == '1', int(page), int(position)):
+        return await bot.answer_callback_query(callback_query.id, 'The selection has expired, press Select again.')
+    final_text, inline_keyboard = await prepare_issues_or_prs(user_id, decrypted_token, option == '1', int(page))
+    await bot.answer_callback_query(callback_query.id)
+    return await callback_query.message.edit_text(final_text, parse_mode='Markdown', reply_markup=inline_keyboard)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(BATCH))
+async def process_batch_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user closes or merges the selected items
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    action, option = callback_query.data[len(BATCH):].split(':')
+    selection = (selections.get(user_id) or {}).get(option == '1')
+    if not selection or not selection.items:
+        return await bot.answer_callback_query(callback_query.id, 'Nothing is selected.')
+    merge = action == MERGE
+    await bot.answer_callback_query(callback_query.id, f'{"Merging" if merge else "Closing"} '
+                                                       f'{len(selection.items)} items...')
+    text = await run_selected(user_id, decrypted_token, option == '1', merge)
+    return await callback_query.message.edit_text(text, disable_web_page_preview=True)
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(BRANCH))
+async def process_stale_branch_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when the button was left from a finished or cancelled /create_pr
+    """
+    return await bot.answer_callback_query(callback_query.id, 'The pull request isn\'t being created now.')
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(CLOSE))
+async def process_close_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user closes the issue or the pull request
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    part_of_url = callback_query.data[len(CLOSE):]
+    if await get_api(decrypted_token).close_issues_or_prs(part_of_url):
+        page_cache.pop(user_id)
+        repo_snapshots.forget(user_id, parse_item_url(part_of_url)[0])
+        return await bot.answer_callback_query(callback_query.id, 'Issue has been closed.')
     else:
-        return await bot.send_message(callback_query.from_user.id,
-                                      'Your token isn\'t in database. Type the command /token')
+        return await bot.answer_callback_query(callback_query.id, 'Error while closing.')
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(MERGE))
+async def process_merge_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user merges the pull request
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    part_of_url = callback_query.data[len(MERGE):]
+    if await get_api(decrypted_token).merge_prs(part_of_url):
+        page_cache.pop(user_id)
+        repo_snapshots.forget(user_id, parse_item_url(part_of_url)[0])
+        return await bot.answer_callback_query(callback_query.id, 'Pull request has been merged.')
+    else:
+        return await bot.answer_callback_query(callback_query.id, 'Error while merging.')
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith(CREATE_ISSUE) or c.data.startswith(CREATE_PR))
+async def process_create_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user starts to create the issue or the pull request from repository details
+    """
+    if not await decrypt_token(callback_query.from_user.id):
+        return await answer_without_token(callback_query)
+    name = callback_query.data[1:]
+    state_class = Issue if callback_query.data.startswith(CREATE_ISSUE) else PullRequest
+    await state_class.first()
+    message = await bot.send_message(callback_query.from_user.id, f'So, the name of repository is: {name}')
+    message.from_user.id = callback_query.from_user.id
+    answer_text = 'Write the title of issue:' if state_class is Issue else 'Write the title of pull request:'
+    return await handle_complex_state(message, dp.current_state(), state_class, answer_text,
+                                      'Enter valid name of repository.', 'RepoName', name)
+
+
+@dp.callback_query_handler(lambda c: c.data)
+async def process_repo_callback(callback_query: types.CallbackQuery) -> Any:
+    """
+    This handler will be called when user chooses the repository in /repos
+    """
+    user_id = callback_query.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await answer_without_token(callback_query)
+    api_worker = get_api(decrypted_token)
+    # Buttons of /repos sent before the prefix was added have the bare name
+    name = callback_query.data[len(REPO):] if callback_query.data.startswith(REPO) else callback_query.data
+    data = await repo_snapshots.get_page(user_id, api_worker, name)
+    if not data:
+        (await get_repo_index(user_id, api_worker)).remove(name)
+        return await bot.answer_callback_query(callback_query.id, 'Couldn\'t find your repository')
+    repo, items, has_next = data
+    final_text, inline_keyboard = render_repo(repo, items, has_next=has_next)
+    await bot.answer_callback_query(callback_query.id)
+    return await bot.send_message(callback_query.from_user.id, final_text, reply_markup=inline_keyboard,
+                                  parse_mode='Markdown')
 
 
 @dp.message_handler(commands=['start'])
@@ -201,7 +598,16 @@ async def send_help(message: types.Message) -> types.Message:
            '/me - get information about the user\n' \
            '/prs - get information about user pull requests\n' \
            '/issues - get information about user issues\n' \
+           'Filter them with <i>repo:name label:bug author:login state:closed</i>. ' \
+           'Example: /issues repo:github-helper label:bug\n' \
+           'Only your own repositories are listed, add <i>owner:organization</i> for repositories of others.\n' \
+           'Press <i>Select</i> under the list to close or merge several items at once.\n' \
            '/repos - get information about user repositories\n' \
+           '/limits - get information about remaining GitHub API requests\n' \
+           '/subscribe - get new notifications about issues and pull requests here\n' \
+           '/unsubscribe - stop getting notifications\n' \
+           '/watch - get events of the repository as soon as they happen. Example: /watch github-helper\n' \
+           '/unwatch - stop getting events of the repository\n' \
            '/create_issue - start the process of creating an issue. Just answer the questions.\n' \
            '/create_pr - start the process of creating a pull request. Just answer the questions.\n' \
            'Also you can just type the name of repository and get information.'
@@ -217,23 +623,21 @@ async def get_token(message: types.Message) -> types.Message:
         token = message.text.split(' ')[1]
     except IndexError:
         return await message.reply('Enter the _token_', parse_mode='Markdown')
-    api_worker = Api(token)
-    hasher = Hasher(HASH_KEY)
+    api_worker = get_api(token)
+    hasher = Hasher(HASH_KEY, HASH_OLD_KEYS)
     user_id = message.from_user.id
     try:
-        api_worker.get_user_info()
+        await api_worker.get_user_info()
     except BadCredentialsException:
         return await message.reply('*Bad* credentials.', parse_mode='Markdown')
-    db = Client(DB_PASSWORD, 'githubhelper', 'tokens')
-    data = db.get({'telegram_id': user_id})
     encrypted_token = hasher.encrypt_message(token)
-    if data:
-        db.update({'telegram_id': user_id}, {'token': encrypted_token})
+    result = await get_tokens_db().upsert({'telegram_id': user_id}, {'token': encrypted_token})
+    if result.upserted_id is None:
         await message.reply('Your token has been _updated_', parse_mode='Markdown')
     else:
-        db.insert({'token': encrypted_token, 'telegram_id': user_id})
         await message.reply('Your token has been _set_', parse_mode='Markdown')
-    avatar_url, text = api_worker.get_user_info()
+    token_cache.set(user_id, token)
+    avatar_url, text = await api_worker.get_user_info()
     await message.answer(text, parse_mode='Markdown')
     return await message.answer_photo(avatar_url)
 
@@ -246,14 +650,110 @@ async def get_me(message: types.Message) -> types.Message:
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
     if decrypted_token:
-        api_worker = Api(decrypted_token)
-        avatar_url, text = api_worker.get_user_info()
+        api_worker = get_api(decrypted_token)
+        avatar_url, text = await api_worker.get_user_info()
         await message.answer(text, parse_mode='Markdown')
         return await message.answer_photo(avatar_url)
     else:
         return await message.answer('Your token isn\'t in database. Type the command /token')
 
 
+@dp.message_handler(commands=['limits'])
+async def get_limits(message: types.Message) -> types.Message:
+    """
+    This handler will be called when user sends `/limits` command
+    """
+    user_id = message.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if decrypted_token:
+        stats = get_api(decrypted_token).scheduler.stats()
+        text = ''
+        for resource, budget in stats['budgets'].items():
+            text += f'*{resource.capitalize()}*: _{budget["remaining"]}_ of _{budget["limit"]}_ requests left, ' \
+                    f'reset at _{datetime.fromtimestamp(budget["reset_at"]).strftime("%H:%M")}_\n'
+        if not text:
+            text = 'There weren\'t any requests to GitHub recently.\n'
+        text += f'Delayed calls: _{stats["throttled"]}_, retried calls: _{stats["retries"]}_'
+        return await message.answer(text, parse_mode='Markdown')
+    else:
+        return await message.answer('Your token isn\'t in database. Type the command /token')
+
+
+@dp.message_handler(commands=['subscribe'])
+async def subscribe(message: types.Message) -> types.Message:
+    """
+    This handler will be called when user sends `/subscribe` command
+    """
+    user_id = message.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if decrypted_token:
+        await get_tokens_db().update({'telegram_id': user_id}, {'notifications': True})
+        notification_poller.subscribe(user_id)
+        return await message.answer('You will get new notifications about _issues_ and _pull requests_ here. '
+                                    'Type the command /unsubscribe to stop.', parse_mode='Markdown')
+    else:
+        return await message.answer('Your token isn\'t in database. Type the command /token')
+
+
+@dp.message_handler(commands=['unsubscribe'])
+async def unsubscribe(message: types.Message) -> types.Message:
+    """
+    This handler will be called when user sends `/unsubscribe` command
+    """
+    user_id = message.from_user.id
+    await get_tokens_db().update({'telegram_id': user_id}, {'notifications': False})
+    notification_poller.unsubscribe(user_id)
+    return await message.answer('You won\'t get notifications anymore.')
+
+
+@dp.message_handler(commands=['watch'])
+async def watch(message: types.Message) -> types.Message:
+    """
+    This handler will be called when user sends `/watch` command
+    """
+    name = message.get_args()
+    if not name:
+        return await message.reply('Enter the _name_ of repository', parse_mode='Markdown')
+    if not GITHUB_WEBHOOK_SECRET:
+        return await message.reply('Watching repositories isn\'t enabled on this bot.')
+    user_id = message.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await message.answer('Your token isn\'t in database. Type the command /token')
+    api_worker = get_api(decrypted_token)
+    index = await get_repo_index(user_id, api_worker)
+    repo = index.get(name)
+    if not repo:
+        return await message.reply(get_not_found_text('Couldn\'t find your repository', index, name))
+    if not await api_worker.create_hook(repo.full_name, GITHUB_WEBHOOK_URL, GITHUB_WEBHOOK_SECRET, EVENTS):
+        return await message.reply('Couldn\'t add the webhook. The token needs the admin:repo_hook scope.')
+    await get_watches_db().upsert({'repo': repo.full_name.lower(), 'telegram_id': user_id}, {'login': index.login})
+    return await message.answer(f'You will get events of _{repo.name}_ here. Type the command /unwatch {repo.name} '
+                                f'to stop.', parse_mode='Markdown')
+
+
+@dp.message_handler(commands=['unwatch'])
+async def unwatch(message: types.Message) -> types.Message:
+    """
+    This handler will be called when user sends `/unwatch` command
+    """
+    name = message.get_args()
+    if not name:
+        return await message.reply('Enter the _name_ of repository', parse_mode='Markdown')
+    user_id = message.from_user.id
+    decrypted_token = await decrypt_token(user_id)
+    if not decrypted_token:
+        return await message.answer('Your token isn\'t in database. Type the command /token')
+    index = await get_repo_index(user_id, get_api(decrypted_token))
+    repo = index.get(name)
+    full_name = repo.full_name if repo else f'{index.login}/{name.strip()}'
+    # The webhook stays, other users may watch the repository too
+    result = await get_watches_db().delete({'repo': full_name.lower(), 'telegram_id': user_id})
+    if result.deleted_count:
+        return await message.answer('You won\'t get events of the repository anymore.')
+    return await message.reply('You don\'t watch this repository.')
+
+
 @dp.message_handler(commands=['repos'])
 async def get_repos(message: types.Message) -> types.Message:
     """
@@ -262,22 +762,11 @@ async def get_repos(message: types.Message) -> types.Message:
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
     if decrypted_token:
-        api_worker = Api(decrypted_token)
-        repos = api_worker.get_repos()
-        text = ''
-        index = 1
-        inline_keyboard = types.InlineKeyboardMarkup(row_width=5)
-        buttons = []
-        for repo in repos:
-            if not repo.archived:
-                text += f'*{index}. {repo.name}*, [link]({repo.html_url}).\n' \
-                        f'Total issues and prs: _{repo.get_issues().totalCount}_\n' \
-                        f'Type: _{"Private" if repo.private else "Public"}_\n'
-                button = types.InlineKeyboardButton(str(index), callback_data=repo.name)
-                buttons.append(button)
-                index += 1
-        inline_keyboard.add(*buttons)
-        text += '\nClick the number of repository to get *details*'
+        api_worker = get_api(decrypted_token)
+        repos = await api_worker.get_all_repos()
+        await get_repo_index(user_id, api_worker, repos)
+        repo_snapshots.store(user_id, repos)
+        text, inline_keyboard = render_repos(repos)
         return await message.answer(text, parse_mode='Markdown', reply_markup=inline_keyboard)
     else:
         return await message.answer('Your token isn\'t in database. Type the command /token')
@@ -291,7 +780,8 @@ async def get_issues(message: types.Message) -> types.Message:
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
     if decrypted_token:
-        final_text, inline_keyboard = await prepare_issues_or_prs(decrypted_token, True)
+        filters = parse_filters(message.get_args())
+        final_text, inline_keyboard = await prepare_issues_or_prs(user_id, decrypted_token, True, filters=filters)
         return await message.answer(final_text, parse_mode='Markdown', reply_markup=inline_keyboard)
     else:
         return await message.answer('Your token isn\'t in database. Type the command /token')
@@ -305,7 +795,8 @@ async def get_prs(message: types.Message) -> types.Message:
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
     if decrypted_token:
-        final_text, inline_keyboard = await prepare_issues_or_prs(decrypted_token, False)
+        filters = parse_filters(message.get_args())
+        final_text, inline_keyboard = await prepare_issues_or_prs(user_id, decrypted_token, False, filters=filters)
         return await message.answer(final_text, parse_mode='Markdown', reply_markup=inline_keyboard)
     else:
         return await message.answer('Your token isn\'t in database. Type the command /token')
@@ -352,6 +843,7 @@ async def cancel_handler(message: types.Message, state: FSMContext) -> types.Mes
     if current_state is None:
         return await message.reply('There aren\'t any processes.')
     await state.finish()
+    pr_prefetch.forget(message.from_user.id)
     return await message.reply('Cancelled.')
 
 
@@ -364,19 +856,25 @@ async def handle_simple_state(message: types.Message, state: FSMContext, state_c
 
 
 async def handle_complex_state(message: types.Message, state: FSMContext, state_class,
-                               answer_text: str, error_text: str, key: str) -> types.Message:
-    answer = message.text
+                               answer_text: str, error_text: str, key: str, answer: str = None) -> types.Message:
+    answer = message.text if answer is None else answer
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
-    api_worker = Api(decrypted_token)
-    repo = api_worker.get_repo(answer)
+    api_worker = get_api(decrypted_token)
+    index = await get_repo_index(user_id, api_worker)
+    repo = index.get(answer)
+    if repo and repo.archived:
+        return await message.reply('The repository is archived, it is read-only.')
     if repo:
-        await state.update_data({key: answer})
-        await state.update_data(Repository=repo)
+        # Only plain fields, so the state can be stored outside of the process
+        await state.update_data({key: repo.name, 'FullName': repo.full_name, 'DefaultBranch': repo.default_branch})
+        if state_class is PullRequest:
+            # Branches and assignees are loaded while the user types the title and the body
+            pr_prefetch.start(user_id, api_worker, repo.full_name)
         await state_class.next()
         return await message.answer(answer_text)
     else:
-        return await message.reply(error_text)
+        return await message.reply(get_not_found_text(error_text, index, answer))
 
 
 @dp.message_handler(state=Issue.RepoName)
@@ -413,11 +911,38 @@ async def answer_body_pr(message: types.Message, state: FSMContext) -> types.Mes
                                      'Write the nickname of user to assign this pr. If no-one - write "empty".')
 
 
+async def stop_pr_flow(message: types.Message, user_id: int, state: FSMContext) -> types.Message:
+    """
+    Function for finishing /create_pr when GitHub couldn't give branches or assignees of the repository
+    :param message: message to answer
+    :param user_id: user id in Telegram
+    :param state: state of the conversation
+    :return: sent message
+    """
+    await state.finish()
+    pr_prefetch.forget(user_id)
+    return await message.answer('Couldn\'t get branches and assignees of the repository from GitHub. '
+                                'Try /create_pr again later.')
+
+
 @dp.message_handler(state=PullRequest.Assignee)
 async def answer_assign_pr(message: types.Message, state: FSMContext) -> types.Message:
-    if message.text == 'empty':
-        message.text = ''
-    return await handle_simple_state(message, state, PullRequest, 'Assignee', 'Write the name of the base branch:')
+    answer = message.text.strip()
+    answer = '' if answer == 'empty' else answer
+    user_id = message.from_user.id
+    state_data = await state.get_data()
+    api_worker = get_api(await decrypt_token(user_id))
+    full_name = state_data.get('FullName')
+    try:
+        if answer and not await pr_prefetch.can_assign(user_id, api_worker, full_name, answer):
+            return await message.reply('This user can\'t be assigned to pull requests of the repository')
+        targets = await pr_prefetch.get(user_id, api_worker, full_name)
+    except (GithubException, asyncio.TimeoutError):
+        return await stop_pr_flow(message, user_id, state)
+    await state.update_data(Assignee=answer)
+    await PullRequest.next()
+    inline_keyboard = render_branches(targets.branches, state_data.get('DefaultBranch'), limit=BRANCH_BUTTONS)
+    return await message.answer('Write or choose the name of the base branch:', reply_markup=inline_keyboard)
 
 
 @dp.message_handler(state=Issue.Assignee)
@@ -430,53 +955,114 @@ async def answer_assign_issue(message: types.Message, state: FSMContext) -> type
     data = await state.get_data()
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
-    api_worker = Api(decrypted_token)
-    issue = api_worker.create_issue(data)
+    api_worker = get_api(decrypted_token)
+    issue = await api_worker.create_issue(data)
     await state.finish()
+    repo_snapshots.forget(user_id, data['FullName'])
     if issue:
         return await message.answer('Issue has been created.')
     else:
         return await message.answer('Error.')
 
 
-@dp.message_handler(state=PullRequest.Base)
-async def answer_base_pr(message: types.Message, state: FSMContext) -> types.Message:
-    answer = message.text
+async def choose_base_branch(message: types.Message, user_id: int, state: FSMContext, branch: str) -> types.Message:
+    """
+    Function for checking the base branch against the loaded branches and asking for the head one
+    :param message: message to answer
+    :param user_id: user id in Telegram
+    :param state: state of the conversation
+    :param branch: name of the branch
+    :return: sent message
+    """
     state_data = await state.get_data()
-    if state_data.get('Repository').default_branch == answer:
-        await state.update_data(Base=answer)
-        await PullRequest.next()
-        return await message.answer('Write the name of the head branch')
-    else:
-        return await message.reply('The name of the base branch is incorrect')
+    api_worker = get_api(await decrypt_token(user_id))
+    full_name = state_data.get('FullName')
+    try:
+        if not await pr_prefetch.has_branch(user_id, api_worker, full_name, branch):
+            return await message.reply('The name of the base branch is incorrect')
+        targets = await pr_prefetch.get(user_id, api_worker, full_name)
+    except (GithubException, asyncio.TimeoutError):
+        return await stop_pr_flow(message, user_id, state)
+    await state.update_data(Base=branch)
+    await PullRequest.next()
+    inline_keyboard = render_branches(targets.branches, exclude=branch, limit=BRANCH_BUTTONS)
+    return await message.answer('Write or choose the name of the head branch:', reply_markup=inline_keyboard)
 
 
-@dp.message_handler(state=PullRequest.Head)
-async def answer_head_pr(message: types.Message, state: FSMContext) -> types.Message:
-    answer = message.text
+async def choose_head_branch(message: types.Message, user_id: int, state: FSMContext, branch: str) -> types.Message:
+    """
+    Function for checking the head branch against the loaded branches and asking about the draft
+    :param message: message to answer
+    :param user_id: user id in Telegram
+    :param state: state of the conversation
+    :param branch: name of the branch
+    :return: sent message
+    """
     state_data = await state.get_data()
+    if branch == state_data.get('Base'):
+        return await message.reply('The head branch must differ from the base branch')
+    api_worker = get_api(await decrypt_token(user_id))
     try:
-        state_data.get('Repository').get_branch(answer)
-    except GithubException:
-        return await message.reply('The name of the head branch is incorrect')
-    await state.update_data(Head=answer)
+        if not await pr_prefetch.has_branch(user_id, api_worker, state_data.get('FullName'), branch):
+            return await message.reply('The name of the head branch is incorrect')
+    except (GithubException, asyncio.TimeoutError):
+        return await stop_pr_flow(message, user_id, state)
+    await state.update_data(Head=branch)
     await PullRequest.next()
     return await message.answer('Is this pr still in draft?(Write True or False)')
 
 
+@dp.callback_query_handler(lambda c: c.data.startswith(BRANCH), state=[PullRequest.Base, PullRequest.Head])
+async def process_branch_callback(callback_query: types.CallbackQuery, state: FSMContext) -> types.Message:
+    """
+    This handler will be called when user chooses the base or the head branch with the button
+    :param callback_query: pressed button with the index of the branch in the loaded branches
+    :param state: state of the conversation, PullRequest.Base or PullRequest.Head
+    :return: sent message
+    """
+    user_id = callback_query.from_user.id
+    state_data = await state.get_data()
+    try:
+        targets = await pr_prefetch.get(user_id, get_api(await decrypt_token(user_id)), state_data.get('FullName'))
+    except (GithubException, asyncio.TimeoutError):
+        await bot.answer_callback_query(callback_query.id)
+        await callback_query.message.edit_reply_markup()
+        return await stop_pr_flow(callback_query.message, user_id, state)
+    index = int(callback_query.data[len(BRANCH):])
+    if index >= len(targets.branches):
+        return await bot.answer_callback_query(callback_query.id, 'The branches have changed, write the name')
+    await bot.answer_callback_query(callback_query.id)
+    # The buttons are removed, so the choice can't be pressed twice
+    await callback_query.message.edit_reply_markup()
+    if await state.get_state() == PullRequest.Base.state:
+        return await choose_base_branch(callback_query.message, user_id, state, targets.branches[index])
+    return await choose_head_branch(callback_query.message, user_id, state, targets.branches[index])
+
+
+@dp.message_handler(state=PullRequest.Base)
+async def answer_base_pr(message: types.Message, state: FSMContext) -> types.Message:
+    return await choose_base_branch(message, message.from_user.id, state, message.text.strip())
+
+
+@dp.message_handler(state=PullRequest.Head)
+async def answer_head_pr(message: types.Message, state: FSMContext) -> types.Message:
+    return await choose_head_branch(message, message.from_user.id, state, message.text.strip())
+
+
 @dp.message_handler(state=PullRequest.Draft)
 async def answer_draft_pr(message: types.Message, state: FSMContext) -> types.Message:
-    answer = message.text
-    if answer.strip().lower() == 'true':
-        await state.update_data(Draft=True)
-    elif answer.strip().lower() == 'false':
-        await state.update_data(Draft=False)
+    answer = message.text.strip().lower()
+    if answer not in ('true', 'false'):
+        return await message.reply('Write True or False')
+    await state.update_data(Draft=answer == 'true')
     data = await state.get_data()
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
-    api_worker = Api(decrypted_token)
-    pr = api_worker.create_pr(data)
+    api_worker = get_api(decrypted_token)
+    pr = await api_worker.create_pr(data)
     await state.finish()
+    pr_prefetch.forget(user_id)
+    repo_snapshots.forget(user_id, data['FullName'])
     if pr:
         return await message.answer('Pull request has been created')
     else:
@@ -488,45 +1074,121 @@ async def echo(message: types.Message) -> types.Message:
     user_id = message.from_user.id
     decrypted_token = await decrypt_token(user_id)
     if decrypted_token:
-        api_worker = Api(decrypted_token)
-        data = api_worker.get_repo(message.text)
+        api_worker = get_api(decrypted_token)
+        index = await get_repo_index(user_id, api_worker)
+        repo = index.get(message.text)
+        data = await repo_snapshots.get_page(user_id, api_worker, repo.name) if repo else None
         if data:
-            final_text, inline_keyboard = await get_full_repo(data)
+            details, items, has_next = data
+            final_text, inline_keyboard = render_repo(details, items, has_next=has_next)
             return await message.answer(final_text, reply_markup=inline_keyboard, parse_mode='Markdown')
         else:
-            return await message.answer('Couldn\'t find your repository')
+            if repo:
+                index.remove(repo.name)
+            return await message.answer(get_not_found_text('Couldn\'t find your repository', index, message.text))
     else:
         return await message.answer('Your token isn\'t in database. Type the command /token')
 
 
-# Webhook settings
-HEROKU_APP_NAME = os.getenv('HEROKU_APP_NAME')
-WEBHOOK_HOST = f'https://{HEROKU_APP_NAME}.herokuapp.com'
-WEBHOOK_PATH = f'/webhook/{API_TOKEN}'
-WEBHOOK_URL = f'{WEBHOOK_HOST}{WEBHOOK_PATH}'
+@dp.errors_handler(exception=asyncio.TimeoutError)
+async def timeout_error_handler(update: types.Update, exception: asyncio.TimeoutError) -> bool:
+    """
+    This handler will be called when GitHub doesn't respond in time
+    """
+    chat = types.Chat.get_current()
+    if chat:
+        await bot.send_message(chat.id, 'GitHub is not responding. Try again later.')
+    return True
+
+
+@dp.errors_handler(exception=PyMongoError)
+async def database_error_handler(update: types.Update, exception: PyMongoError) -> bool:
+    """
+    This handler will be called when the database fails, the error is already logged
+    """
+    chat = types.Chat.get_current()
+    if chat:
+        await bot.send_message(chat.id, 'Database is unavailable. Try again later.')
+    return True
+
 
-# Webserver settings
-WEBAPP_HOST = '0.0.0.0'
-WEBAPP_PORT = int(os.getenv('PORT', 5000))
+@dp.errors_handler(exception=RateLimitExceededException)
+async def rate_limit_error_handler(update: types.Update, exception: RateLimitExceededException) -> bool:
+    """
+    This handler will be called when the GitHub rate limit of the user is exhausted
+    """
+    chat = types.Chat.get_current()
+    if chat:
+        await bot.send_message(chat.id, 'GitHub rate limit is exceeded. Type the command /limits to see when it resets.')
+    return True
+
+
+@dp.errors_handler(exception=RetryAfter)
+async def retry_after_error_handler(update: types.Update, exception: RetryAfter) -> bool:
+    """
+    This handler will be called when Telegram flood control lasts longer than the send queue waits
+    """
+    logging.warning('Message was dropped, flood control for %s seconds', exception.timeout)
+    return True
 
 
 # Functions for webhooks
 async def on_startup(dp):
-    await bot.set_webhook(WEBHOOK_URL)
+    db = get_tokens_db()
+    if not await db.ping():
+        logging.warning('Database is unavailable')
+    else:
+        try:
+            await db.ensure_index('telegram_id')
+            await get_watches_db().ensure_index('repo', unique=False)
+        except PyMongoError:
+            # It is logged by the client, the bot works without the index, only slower
+            pass
+        try:
+            subscribers = await db.find({'notifications': True}, {'telegram_id': True, '_id': False})
+        except PyMongoError:
+            subscribers = []
+        # Every worker behind the router polls only users of its own shard
+        notification_poller.subscribe_all(item['telegram_id'] for item in subscribers
+                                          if item['telegram_id'] % WORKER_COUNT == WORKER_INDEX)
+    notification_poller.start()
+    api_registry.start(API_CLIENTS_SWEEP)
+    # Behind the router the webhook points to the router, it sets the webhook itself
+    if not WEBHOOK_WORKER:
+        await bot.set_webhook(WEBHOOK_URL)
 
 
 async def on_shutdown(dp):
     logging.warning('Shutting down..')
+    await notification_poller.stop()
+    logging.info('Notifications: %s', notification_poller.stats())
+    await github_webhook.close()
+    logging.info('GitHub webhook: %s', github_webhook.stats())
+    logging.info('Send queue: %s', send_queue.stats())
+    logging.info('Token cache: %s', token_cache.stats())
+    logging.info('Repository snapshots: %s', repo_snapshots.stats())
+    await api_registry.stop()
+    github_executor.shutdown(wait=False)
+    api_registry.close()
+    if response_cache:
+        logging.info('GitHub response cache: %s', response_cache.stats())
+        response_cache.close()
+    await dp.storage.close()
+    await dp.storage.wait_closed()
+    AsyncClient.shutdown()
+    Client.close_all()
     logging.warning('Bye!')
 
 
 if __name__ == '__main__':
-    start_webhook(
+    # The same server receives Telegram updates and GitHub deliveries
+    app = web.Application()
+    app.router.add_post(GITHUB_WEBHOOK_PATH, github_webhook.handle)
+    set_webhook(
         dispatcher=dp,
         webhook_path=WEBHOOK_PATH,
         on_startup=on_startup,
         on_shutdown=on_shutdown,
-        skip_updates=True,
-        host=WEBAPP_HOST,
-        port=WEBAPP_PORT
-    )
+        skip_updates=not WEBHOOK_WORKER,
+        web_app=app
+    ).run_app(host=WEBAPP_HOST, port=WEBAPP_PORT)
@@ -0,0 +1,127 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """
+    Class for bounded in-memory caching with time to live and least recently used eviction
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 300, timer: Callable[[], float] = time.monotonic,
+                 sliding: bool = False, on_evict: Callable[[Hashable, Any], None] = None):
+        """
+        Create the empty cache
+        :param maxsize: maximum number of stored items
+        :param ttl: number of seconds while an item is valid
+        :param timer: function that returns current time in seconds
+        :param sliding: every hit prolongs the life of the item, so ttl limits idle time
+        :param on_evict: function called with key and value of evicted or expired item
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.sliding = sliding
+        self.on_evict = on_evict
+        self.items = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Method for getting the value and marking it as recently used
+        :param key: key of the item
+        :param default: value to return if the item is missing or expired
+        :return: cached value
+        """
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            now = self.timer()
+            if expires_at > now:
+                if self.sliding:
+                    self.items[key] = (now + self.ttl, value)
+                self.items.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.items[key]
+            self.misses += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Method for storing the value, the least recently used item is evicted when the cache is full
+        :param key: key of the item
+        :param value: value to store
+        :return: nothing to return
+        """
+        evicted = []
+        with self.lock:
+            self.items[key] = (self.timer() + self.ttl, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                evicted_key, (_, evicted_value) = self.items.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+                self.evictions += 1
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Method for invalidating the item
+        :param key: key of the item
+        :param default: value to return if the item is missing
+        :return: removed value
+        """
+        with self.lock:
+            item = self.items.pop(key, None)
+            return default if item is None else item[1]
+
+    def expire(self) -> int:
+        """
+        Method for removing expired items that nobody asks for, e.g. from a periodic task
+        :return: number of removed items
+        """
+        with self.lock:
+            now = self.timer()
+            expired = [(key, value) for key, (expires_at, value) in self.items.items() if expires_at <= now]
+            for key, _ in expired:
+                del self.items[key]
+        if self.on_evict:
+            for key, value in expired:
+                self.on_evict(key, value)
+        return len(expired)
+
+    def values(self) -> list:
+        """
+        Method for getting all stored values including expired ones
+        :return: list of values
+        """
+        with self.lock:
+            return [value for _, value in self.items.values()]
+
+    def clear(self) -> None:
+        """
+        Method for removing all items
+        :return: nothing to return
+        """
+        with self.lock:
+            self.items.clear()
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the cache
+        :return: dictionary with hits, misses, evictions and size
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.items)}
+
+    def __len__(self) -> int:
+        return len(self.items)
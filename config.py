@@ -4,3 +4,66 @@ API_TOKEN = os.getenv('TELEGRAM_TOKEN', 'telegram_token')
 DB_PASSWORD = os.getenv('MONGO_PASSWORD', 'password_to_database')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', 'github_token')
 HASH_KEY = os.getenv('HASH_KEY', 'hash_key')
+# Comma-separated previous values of HASH_KEY while tokens are re-encrypted by key_rotation.py
+HASH_OLD_KEYS = [key.strip() for key in os.getenv('HASH_OLD_KEYS', '').split(',') if key.strip()]
+MONGO_URI = os.getenv('MONGO_URI', '')
+MONGO_POOL_SIZE = int(os.getenv('MONGO_POOL_SIZE', 100))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 600))
+GITHUB_WORKERS = int(os.getenv('GITHUB_WORKERS', 32))
+GITHUB_TIMEOUT = int(os.getenv('GITHUB_TIMEOUT', 30))
+GITHUB_GRAPHQL = os.getenv('GITHUB_GRAPHQL', 'true').lower() == 'true'
+GITHUB_CACHE = os.getenv('GITHUB_CACHE', 'memory')
+GITHUB_CACHE_PATH = os.getenv('GITHUB_CACHE_PATH', 'github_cache.sqlite3')
+GITHUB_CACHE_SIZE = int(os.getenv('GITHUB_CACHE_SIZE', 50 * 1024 * 1024))
+PAGE_SIZE = int(os.getenv('PAGE_SIZE', 10))
+PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', 1000))
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 60))
+# Select mode of /issues and /prs: how long the selection lives and how many items are closed or merged at once
+SELECTION_TTL = int(os.getenv('SELECTION_TTL', 600))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 4))
+API_CLIENTS_SIZE = int(os.getenv('API_CLIENTS_SIZE', 1000))
+API_CLIENTS_TTL = int(os.getenv('API_CLIENTS_TTL', 600))
+# How often clients of users that haven't come back are closed
+API_CLIENTS_SWEEP = int(os.getenv('API_CLIENTS_SWEEP', 60))
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'mongo')
+FSM_REDIS_URL = os.getenv('FSM_REDIS_URL', 'redis://localhost:6379/0')
+FSM_STATE_TTL = int(os.getenv('FSM_STATE_TTL', 24 * 60 * 60))
+REPO_INDEX_SIZE = int(os.getenv('REPO_INDEX_SIZE', 10000))
+REPO_INDEX_TTL = int(os.getenv('REPO_INDEX_TTL', 300))
+# Issues and pull requests on one page of repository details
+REPO_PAGE_SIZE = int(os.getenv('REPO_PAGE_SIZE', 8))
+REPO_SNAPSHOT_SIZE = int(os.getenv('REPO_SNAPSHOT_SIZE', 10000))
+REPO_SNAPSHOT_TTL = int(os.getenv('REPO_SNAPSHOT_TTL', 120))
+# Branches and assignees loaded when /create_pr gets the repository, and the number of branch buttons
+PR_PREFETCH_SIZE = int(os.getenv('PR_PREFETCH_SIZE', 10000))
+PR_PREFETCH_TTL = int(os.getenv('PR_PREFETCH_TTL', 600))
+BRANCH_BUTTONS = int(os.getenv('BRANCH_BUTTONS', 10))
+NOTIFICATIONS_CONCURRENCY = int(os.getenv('NOTIFICATIONS_CONCURRENCY', 8))
+NOTIFICATIONS_INTERVAL = int(os.getenv('NOTIFICATIONS_INTERVAL', 60))
+# Telegram flood limits: messages per second to all chats and to one chat, messages to one chat sent at once
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+TELEGRAM_CHAT_BURST = float(os.getenv('TELEGRAM_CHAT_BURST', 3))
+
+# Webhook settings
+HEROKU_APP_NAME = os.getenv('HEROKU_APP_NAME')
+WEBHOOK_HOST = f'https://{HEROKU_APP_NAME}.herokuapp.com'
+WEBHOOK_PATH = f'/webhook/{API_TOKEN}'
+WEBHOOK_URL = f'{WEBHOOK_HOST}{WEBHOOK_PATH}'
+# The process runs behind router.py and gets updates of its shard only
+WEBHOOK_WORKER = os.getenv('WEBHOOK_WORKER', 'false').lower() == 'true'
+# Position of the worker in WORKER_URLS of the router, the worker polls notifications of its shard only
+WORKER_INDEX = int(os.getenv('WORKER_INDEX', 0))
+WORKER_COUNT = int(os.getenv('WORKER_COUNT', 1))
+# Comma-separated base urls of the workers for router.py, e.g. http://10.0.0.2:5001,http://10.0.0.3:5001
+WORKER_URLS = [url.strip() for url in os.getenv('WORKER_URLS', '').split(',') if url.strip()]
+
+# GitHub webhook settings, /watch adds the webhook to the repository with this secret
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', '')
+GITHUB_WEBHOOK_PATH = '/github'
+GITHUB_WEBHOOK_URL = f'{WEBHOOK_HOST}{GITHUB_WEBHOOK_PATH}'
+
+# Webserver settings
+WEBAPP_HOST = '0.0.0.0'
+WEBAPP_PORT = int(os.getenv('PORT', 5000))
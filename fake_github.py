@@ -0,0 +1,547 @@
+import hashlib
+import json
+import re
+import shlex
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+
+class FakeGitHub:
+    """
+    Local HTTP server that imitates the parts of GitHub REST API used by the bot
+    """
+
+    def __init__(self, login: str = 'octocat', delay: float = 0.0):
+        """
+        Create the server with an empty account
+        :param login: login of the authenticated user
+        :param delay: number of seconds to wait before every response
+        """
+        self.login = login
+        self.delay = delay
+        self.repos = {}
+        self.issues = {}
+        self.branches = {}
+        self.assignees = {}
+        self.hooks = {}
+        self.notifications = []
+        self.notifications_modified = 1622541600
+        self.poll_interval = '60'
+        self.requests: List[Tuple[str, str]] = []
+        self.not_modified = 0
+        self.rate_limits = {}
+        self.secondary_limits = 0
+        self.retry_after = '1'
+        self.lock = threading.Lock()
+        self.routes = [
+            ('GET', r'/user', self.get_user),
+            ('GET', r'/user/repos', self.get_user_repos),
+            ('GET', r'/user/issues', self.get_user_issues),
+            ('GET', r'/users/(?P<login>[^/]+)', self.get_other_user),
+            ('GET', r'/search/issues', self.search_issues),
+            ('GET', r'/notifications', self.get_notifications),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)', self.get_repo),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues', self.get_repo_issues),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/branches', self.get_branches),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/branches/(?P<branch>.+)', self.get_branch),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/assignees', self.get_assignees),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/assignees/(?P<login>[^/]+)', self.check_assignee),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues/(?P<number>\d+)', self.get_issue),
+            ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues', self.create_issue),
+            ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues/(?P<number>\d+)/assignees', self.add_assignees),
+            ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls', self.create_pull),
+            ('PATCH', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues/(?P<number>\d+)', self.edit_issue),
+            ('GET', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls/(?P<number>\d+)', self.get_pull),
+            ('PUT', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls/(?P<number>\d+)/merge', self.merge_pull),
+            ('POST', r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/hooks', self.create_hook),
+            ('POST', r'/graphql', self.graphql),
+        ]
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self) -> 'FakeGitHub':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'FakeGitHub':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def reset_requests(self) -> None:
+        with self.lock:
+            self.requests.clear()
+            self.not_modified = 0
+
+    def count_requests(self, method: str = None, path: str = None) -> int:
+        """
+        Method for counting received requests
+        :param method: count only requests with this HTTP method
+        :param path: count only requests with this path
+        :return: number of requests
+        """
+        with self.lock:
+            return sum(1 for request_method, request_path in self.requests
+                       if method in (None, request_method) and path in (None, request_path))
+
+    def set_rate_limit(self, resource: str, limit: int, remaining: int, reset: float) -> None:
+        """
+        Method for enabling X-RateLimit headers of the resource
+        :param resource: core, search or graphql
+        :param limit: number of requests per window
+        :param remaining: number of requests left
+        :param reset: unix time when the window resets
+        """
+        self.rate_limits[resource] = {'limit': limit, 'remaining': remaining, 'reset': reset}
+
+    def check_rate_limit(self, path: str) -> Tuple[int, dict, dict]:
+        """
+        Method for spending the rate limit of the request
+        :param path: path of the request
+        :return: status, payload and headers, status is None if the request is allowed
+        """
+        with self.lock:
+            if self.secondary_limits:
+                self.secondary_limits -= 1
+                return 403, {'message': 'You have exceeded a secondary rate limit.'}, {'Retry-After': self.retry_after}
+            resource = 'search' if path.startswith('/search/') else 'graphql' if path == '/graphql' else 'core'
+            rate_limit = self.rate_limits.get(resource)
+            if rate_limit is None:
+                return None, None, {}
+            headers = {
+                'X-RateLimit-Limit': str(rate_limit['limit']),
+                'X-RateLimit-Reset': str(int(rate_limit['reset'])),
+                'X-RateLimit-Resource': resource,
+            }
+            if rate_limit['remaining'] <= 0:
+                headers['X-RateLimit-Remaining'] = '0'
+                return 403, {'message': 'API rate limit exceeded for user.'}, headers
+            rate_limit['remaining'] -= 1
+            headers['X-RateLimit-Remaining'] = str(rate_limit['remaining'])
+            return None, None, headers
+
+    def add_repo(self, name: str, **fields) -> dict:
+        """
+        Method for adding repository to the account
+        :param name: short name of the repository
+        :param fields: fields that override the default payload
+        :return: repository payload
+        """
+        full_name = f'{self.login}/{name}'
+        repo = {
+            'id': len(self.repos) + 1,
+            'name': name,
+            'full_name': full_name,
+            'owner': self.user_payload(self.login),
+            'private': False,
+            'archived': False,
+            'html_url': f'https://github.com/{full_name}',
+            'url': f'{self.base_url}/repos/{full_name}',
+            'stargazers_count': 0,
+            'forks_count': 0,
+            'open_issues_count': 0,
+            'language': 'Python',
+            'default_branch': 'main',
+            'created_at': '2021-06-01T10:00:00Z',
+            'updated_at': '2021-06-02T10:00:00Z',
+        }
+        repo.update(fields)
+        self.repos[full_name] = repo
+        self.issues[full_name] = []
+        self.branches[full_name] = [repo['default_branch']]
+        self.assignees[full_name] = [self.login]
+        return repo
+
+    def add_branch(self, repo_name: str, branch: str) -> None:
+        """
+        Method for adding branch to the repository
+        :param repo_name: short name of the repository
+        :param branch: name of the branch
+        :return: nothing to return
+        """
+        self.branches[f'{self.login}/{repo_name}'].append(branch)
+
+    def add_assignee(self, repo_name: str, login: str) -> None:
+        """
+        Method for allowing the user to be assigned to issues and pull requests of the repository
+        :param repo_name: short name of the repository
+        :param login: login of the user
+        :return: nothing to return
+        """
+        self.assignees[f'{self.login}/{repo_name}'].append(login)
+
+    def add_issue(self, repo_name: str, title: str, pull_request: bool = False, **fields) -> dict:
+        """
+        Method for adding open issue or pull request to the repository
+        :param repo_name: short name of the repository
+        :param title: title of the issue
+        :param pull_request: issue - False, pull request - True
+        :param fields: fields that override the default payload
+        :return: issue payload
+        """
+        full_name = f'{self.login}/{repo_name}'
+        repo = self.repos[full_name]
+        number = len(self.issues[full_name]) + 1
+        issue = {
+            'id': number,
+            'number': number,
+            'title': title,
+            'state': 'open',
+            'body': '',
+            'labels': [],
+            'user': self.user_payload(self.login),
+            'html_url': f'https://github.com/{full_name}/issues/{number}',
+            'url': f'{self.base_url}/repos/{full_name}/issues/{number}',
+            'repository_url': f'{self.base_url}/repos/{full_name}',
+            'created_at': '2021-06-03T10:00:00Z',
+            'updated_at': '2021-06-03T10:00:00Z',
+        }
+        if pull_request:
+            issue['pull_request'] = {'url': f'{self.base_url}/repos/{full_name}/pulls/{number}'}
+        issue.update(fields)
+        self.issues[full_name].append(issue)
+        repo['open_issues_count'] += 1
+        return issue
+
+    def add_notification(self, repo_name: str, title: str, subject_type: str = 'Issue', reason: str = 'subscribed',
+                         number: int = 1) -> dict:
+        """
+        Method for adding unread notification, the newest notifications go first like in GitHub
+        :param repo_name: short name of the repository
+        :param title: title of the issue or pull request
+        :param subject_type: Issue, PullRequest, Release or another GitHub type
+        :param reason: why the user gets the notification, e.g. review_requested
+        :param number: number of the issue or pull request
+        :return: notification payload
+        """
+        full_name = f'{self.login}/{repo_name}'
+        self.notifications_modified += 1
+        kind = 'pulls' if subject_type == 'PullRequest' else 'issues'
+        notification = {
+            'id': str(len(self.notifications) + 1),
+            'unread': True,
+            'reason': reason,
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.notifications_modified)),
+            'subject': {'title': title, 'type': subject_type, 'url': f'{self.base_url}/repos/{full_name}/{kind}/{number}'},
+            'repository': {'full_name': full_name},
+        }
+        self.notifications.insert(0, notification)
+        return notification
+
+    def user_payload(self, login: str) -> dict:
+        return {
+            'login': login,
+            'id': 1,
+            'url': f'{self.base_url}/users/{login}',
+            'html_url': f'https://github.com/{login}',
+            'avatar_url': f'https://avatars.githubusercontent.com/{login}',
+            'type': 'User',
+        }
+
+    def paginate(self, items: list, path: str, query: dict) -> Tuple[int, list, dict]:
+        """
+        Method for returning one page of items with the GitHub Link header
+        :param items: all items
+        :param path: path of the request
+        :param query: parsed query of the request
+        :return: status, page of items and headers
+        """
+        per_page = int(query.get('per_page', ['30'])[0])
+        page = int(query.get('page', ['1'])[0])
+        headers = {}
+        if page * per_page < len(items):
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query['page'] = page + 1
+            next_query['per_page'] = per_page
+            headers['Link'] = f'<{self.base_url}{path}?{urlencode(next_query)}>; rel="next"'
+        return 200, items[(page - 1) * per_page:page * per_page], headers
+
+    def get_user(self, query: dict, body: dict, path: str) -> Tuple[int, dict, dict]:
+        payload = self.user_payload(self.login)
+        payload['name'] = self.login.capitalize()
+        return 200, payload, {}
+
+    def get_other_user(self, query: dict, body: dict, path: str, login: str) -> Tuple[int, dict, dict]:
+        payload = self.user_payload(login)
+        payload['name'] = login.capitalize()
+        return 200, payload, {}
+
+    def get_user_repos(self, query: dict, body: dict, path: str) -> Tuple[int, list, dict]:
+        return self.paginate(list(self.repos.values()), path, query)
+
+    def get_user_issues(self, query: dict, body: dict, path: str) -> Tuple[int, list, dict]:
+        items = []
+        for full_name, issues in self.issues.items():
+            for issue in issues:
+                if issue['state'] == 'open':
+                    items.append(dict(issue, repository=self.repos[full_name]))
+        return self.paginate(items, path, query)
+
+    def search_issues(self, query: dict, body: dict, path: str) -> Tuple[int, dict, dict]:
+        """
+        Method that supports the is, user, repo, label and author qualifiers
+        """
+        qualifiers = [term.partition(':') for term in shlex.split(query['q'][0])]
+        items = []
+        for full_name, issues in self.issues.items():
+            for issue in reversed(issues):
+                matches = True
+                for key, _, value in qualifiers:
+                    if key == 'is' and value in ('issue', 'pr'):
+                        matches &= ('pull_request' in issue) == (value == 'pr')
+                    elif key == 'is':
+                        matches &= issue['state'] == value
+                    elif key == 'user':
+                        matches &= full_name.split('/')[0] == value
+                    elif key == 'repo':
+                        matches &= full_name == value
+                    elif key == 'label':
+                        matches &= value in [label['name'] for label in issue['labels']]
+                    elif key == 'author':
+                        matches &= issue['user']['login'] == value
+                if matches:
+                    items.append(issue)
+        status, page, headers = self.paginate(items, path, query)
+        return status, {'total_count': len(items), 'incomplete_results': False, 'items': page}, headers
+
+    def get_notifications(self, query: dict, body: dict, path: str) -> Tuple[int, list, dict]:
+        status, page, headers = self.paginate(self.notifications, path, query)
+        headers['Last-Modified'] = formatdate(self.notifications_modified, usegmt=True)
+        headers['X-Poll-Interval'] = self.poll_interval
+        return status, page, headers
+
+    def get_repo(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, dict, dict]:
+        full_name = f'{owner}/{repo}'
+        if full_name not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        return 200, self.repos[full_name], {}
+
+    def get_repo_issues(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, list, dict]:
+        full_name = f'{owner}/{repo}'
+        if full_name not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        items = [issue for issue in self.issues[full_name] if issue['state'] == 'open']
+        return self.paginate(items, path, query)
+
+    def get_branch(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                   branch: str) -> Tuple[int, dict, dict]:
+        branch = unquote(branch)
+        if branch not in self.branches.get(f'{owner}/{repo}', []):
+            return 404, {'message': 'Branch not found'}, {}
+        return 200, {'name': branch, 'protected': False}, {}
+
+    def get_branches(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, list, dict]:
+        full_name = f'{owner}/{repo}'
+        if full_name not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        return self.paginate([{'name': branch, 'protected': False} for branch in self.branches[full_name]], path, query)
+
+    def get_assignees(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, list, dict]:
+        full_name = f'{owner}/{repo}'
+        if full_name not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        return self.paginate([self.user_payload(login) for login in self.assignees[full_name]], path, query)
+
+    def check_assignee(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                       login: str) -> Tuple[int, dict, dict]:
+        if login.lower() not in [assignee.lower() for assignee in self.assignees.get(f'{owner}/{repo}', [])]:
+            return 404, {'message': 'Not Found'}, {}
+        return 204, None, {}
+
+    def find_issue(self, owner: str, repo: str, number: str) -> dict:
+        issues = self.issues.get(f'{owner}/{repo}', [])
+        index = int(number) - 1
+        return issues[index] if 0 <= index < len(issues) else None
+
+    def get_issue(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                  number: str) -> Tuple[int, dict, dict]:
+        issue = self.find_issue(owner, repo, number)
+        if issue is None:
+            return 404, {'message': 'Not Found'}, {}
+        return 200, issue, {}
+
+    def create_issue(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, dict, dict]:
+        if f'{owner}/{repo}' not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        assignees = [self.user_payload(body['assignee'])] if body.get('assignee') else []
+        return 201, self.add_issue(repo, body['title'], body=body.get('body', ''), assignees=assignees), {}
+
+    def add_assignees(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                      number: str) -> Tuple[int, dict, dict]:
+        issue = self.find_issue(owner, repo, number)
+        if issue is None:
+            return 404, {'message': 'Not Found'}, {}
+        allowed = [login.lower() for login in self.assignees[f'{owner}/{repo}']]
+        # Like GitHub, logins that can't be assigned are ignored
+        issue['assignees'] = issue.get('assignees', []) + [self.user_payload(login) for login in body['assignees']
+                                                           if login.lower() in allowed]
+        return 201, issue, {}
+
+    def create_pull(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, dict, dict]:
+        full_name = f'{owner}/{repo}'
+        if full_name not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        if body['base'] not in self.branches[full_name] or body['head'] not in self.branches[full_name]:
+            return 422, {'message': 'Validation Failed', 'errors': [{'field': 'head', 'code': 'invalid'}]}, {}
+        issue = self.add_issue(repo, body['title'], pull_request=True, body=body.get('body', ''),
+                               draft=body.get('draft', False), head=body['head'])
+        return 201, self.pull_payload(issue), {}
+
+    def edit_issue(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                   number: str) -> Tuple[int, dict, dict]:
+        issue = self.find_issue(owner, repo, number)
+        if issue is None:
+            return 404, {'message': 'Not Found'}, {}
+        if issue['state'] == 'open' and body.get('state') == 'closed':
+            self.repos[f'{owner}/{repo}']['open_issues_count'] -= 1
+        issue.update(body)
+        return 200, issue, {}
+
+    def get_pull(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                 number: str) -> Tuple[int, dict, dict]:
+        issue = self.find_issue(owner, repo, number)
+        if issue is None or 'pull_request' not in issue:
+            return 404, {'message': 'Not Found'}, {}
+        return 200, self.pull_payload(issue), {}
+
+    def pull_payload(self, issue: dict) -> dict:
+        full_name = issue['repository_url'].split('/repos/', 1)[1]
+        pull = dict(issue, url=issue['pull_request']['url'], merged=issue.get('merged', False))
+        pull['base'] = {'ref': self.repos[full_name]['default_branch'], 'repo': self.repos[full_name]}
+        pull['head'] = {'ref': issue.get('head', 'feature'), 'repo': self.repos[full_name]}
+        return pull
+
+    def merge_pull(self, query: dict, body: dict, path: str, owner: str, repo: str,
+                   number: str) -> Tuple[int, dict, dict]:
+        issue = self.find_issue(owner, repo, number)
+        if issue is None or 'pull_request' not in issue:
+            return 404, {'message': 'Not Found'}, {}
+        if issue['state'] != 'open':
+            return 405, {'message': 'Pull Request is not mergeable'}, {}
+        issue['state'] = 'closed'
+        issue['merged'] = True
+        self.repos[f'{owner}/{repo}']['open_issues_count'] -= 1
+        return 200, {'merged': True, 'message': 'Pull Request successfully merged'}, {}
+
+    def create_hook(self, query: dict, body: dict, path: str, owner: str, repo: str) -> Tuple[int, dict, dict]:
+        full_name = f'{owner}/{repo}'
+        if full_name not in self.repos:
+            return 404, {'message': 'Not Found'}, {}
+        hooks = self.hooks.setdefault(full_name, [])
+        if any(hook['config']['url'] == body['config']['url'] for hook in hooks):
+            return 422, {'message': 'Validation Failed', 'errors': [{'message': 'Hook already exists on this repository'}]}, {}
+        hook = dict(body, id=len(hooks) + 1)
+        hooks.append(hook)
+        return 201, hook, {}
+
+    def graphql(self, query: dict, body: dict, path: str) -> Tuple[int, dict, dict]:
+        """
+        Method that answers the GraphQL queries sent by Api
+        """
+        variables = body.get('variables', {})
+        if 'viewer' in body['query'] and 'repository(name:' in body['query']:
+            return 200, self.graphql_repository(variables['name'], variables['first']), {}
+        return 200, {'errors': [{'message': 'Unsupported query'}]}, {}
+
+    def graphql_repository(self, name: str, first: int) -> dict:
+        full_name = f'{self.login}/{name}'
+        if full_name not in self.repos:
+            return {'data': {'viewer': {'repository': None}},
+                    'errors': [{'type': 'NOT_FOUND', 'message': f'Could not resolve to a Repository {name}'}]}
+        repo = self.repos[full_name]
+        issues = [issue for issue in reversed(self.issues[full_name]) if issue['state'] == 'open']
+
+        def connection(items: list) -> dict:
+            return {'totalCount': len(items),
+                    'nodes': [{'number': item['number'], 'title': item['title'], 'url': item['html_url']}
+                              for item in items[:first]]}
+
+        node = {
+            'name': repo['name'],
+            'nameWithOwner': repo['full_name'],
+            'url': repo['html_url'],
+            'stargazerCount': repo['stargazers_count'],
+            'forkCount': repo['forks_count'],
+            'isPrivate': repo['private'],
+            'isArchived': repo['archived'],
+            'createdAt': repo['created_at'],
+            'updatedAt': repo['updated_at'],
+            'primaryLanguage': {'name': repo['language']} if repo['language'] else None,
+            'defaultBranchRef': {'name': repo['default_branch']},
+            'issues': connection([issue for issue in issues if 'pull_request' not in issue]),
+            'pullRequests': connection([issue for issue in issues if 'pull_request' in issue]),
+        }
+        return {'data': {'viewer': {'repository': node}}}
+
+    def dispatch(self, method: str, raw_path: str, body: dict) -> Tuple[int, object, dict]:
+        """
+        Method for finding the route and calling it
+        :param method: HTTP method
+        :param raw_path: path with query
+        :param body: decoded JSON body
+        :return: status, payload and headers
+        """
+        url = urlparse(raw_path)
+        with self.lock:
+            self.requests.append((method, url.path))
+        if self.delay:
+            time.sleep(self.delay)
+        status, payload, rate_limit_headers = self.check_rate_limit(url.path)
+        if status is not None:
+            return status, payload, rate_limit_headers
+        query = parse_qs(url.query)
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                status, payload, headers = handler(query, body, url.path, **match.groupdict())
+                return status, payload, dict(headers, **rate_limit_headers)
+        return 404, {'message': 'Not Found'}, rate_limit_headers
+
+    def make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def handle_request(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw_body = self.rfile.read(length) if length else b''
+                body = json.loads(raw_body) if raw_body else {}
+                status, payload, headers = fake.dispatch(self.command, self.path, body)
+                data = b'' if payload is None else json.dumps(payload).encode()
+                if self.command == 'GET' and status == 200:
+                    headers['ETag'] = f'"{hashlib.md5(data).hexdigest()}"'
+                    if self.headers.get('If-None-Match') == headers['ETag'] or \
+                            self.headers.get('If-Modified-Since') == headers.get('Last-Modified', ''):
+                        with fake.lock:
+                            fake.not_modified += 1
+                        status, data = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
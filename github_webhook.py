@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from collections import OrderedDict
+from html import escape
+from typing import Awaitable, Callable, List, Optional, Set
+
+from aiohttp import web
+
+# Events that the bot subscribes repositories to
+EVENTS = ('issues', 'pull_request', 'pull_request_review')
+ISSUE_ACTIONS = ('opened', 'closed', 'reopened')
+PR_ACTIONS = ('opened', 'closed', 'reopened', 'ready_for_review')
+
+
+def verify_signature(secret: str, body: bytes, signature: str) -> bool:
+    """
+    Function for checking that the delivery was signed by GitHub with the secret of the webhook
+    :param secret: secret of the webhook
+    :param body: raw body of the delivery
+    :param signature: value of X-Hub-Signature-256 header, e.g. sha256=...
+    :return: status of verification
+    """
+    expected = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def format_event(event: str, payload: dict) -> Optional[str]:
+    """
+    Function for making the message about the event
+    :param event: value of X-GitHub-Event header
+    :param payload: decoded delivery
+    :return: HTML text or None if the event isn't worth a message
+    """
+    action = payload.get('action')
+    sender = escape(payload['sender']['login'])
+    repo = f'<b>{escape(payload["repository"]["full_name"])}</b>'
+    if event == 'issues' and action in ISSUE_ACTIONS:
+        item, kind = payload['issue'], 'issue'
+    elif event == 'pull_request' and action in PR_ACTIONS:
+        item, kind = payload['pull_request'], 'pull request'
+        if action == 'closed' and item.get('merged'):
+            action = 'merged'
+        action = action.replace('_', ' ')
+    elif event == 'pull_request_review' and action == 'submitted':
+        item, kind = payload['pull_request'], 'pull request'
+        action = {'approved': 'approved', 'changes_requested': 'requested changes in'}.get(
+            payload['review']['state'].lower(), 'reviewed')
+    else:
+        return None
+    link = f'<a href="{escape(item["html_url"])}">{escape(item["title"])} #{item["number"]}</a>'
+    return f'{repo}: {sender} {action} {kind} {link}'
+
+
+class GitHubWebhook:
+    """
+    Class for receiving GitHub webhook deliveries and sending them to users that watch the repository.
+    The work is done once per event instead of polling every user
+    """
+
+    def __init__(self, secret: str, get_subscribers: Callable[[str], Awaitable[List[dict]]],
+                 send: Callable[[int, str], Awaitable], invalidate: Callable[[str, dict], None] = None,
+                 concurrency: int = 8, deliveries_size: int = 1000):
+        """
+        Create the receiver
+        :param secret: secret of the webhooks, deliveries are rejected if it is empty
+        :param get_subscribers: coroutine function that returns documents with telegram_id and login of the watchers
+        :param send: coroutine function that sends the HTML text to the user
+        :param invalidate: function called with full name and fields of the repository to drop cached data
+        :param concurrency: maximum number of messages sent at the same time for one event
+        :param deliveries_size: number of delivery ids remembered to skip deliveries that GitHub sends again
+        """
+        self.secret = secret
+        self.get_subscribers = get_subscribers
+        self.send = send
+        self.invalidate = invalidate
+        self.concurrency = concurrency
+        self.deliveries_size = deliveries_size
+        self.deliveries: OrderedDict = OrderedDict()
+        self.sending: Set[asyncio.Future] = set()
+        self.received = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.sent = 0
+        self.errors = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Method for answering the delivery, messages are sent after the answer, GitHub waits 10 seconds at most
+        :param request: request from GitHub
+        :return: response for GitHub
+        """
+        body = await request.read()
+        if not self.secret or not verify_signature(self.secret, body, request.headers.get('X-Hub-Signature-256', '')):
+            self.rejected += 1
+            return web.Response(status=401)
+        event = request.headers.get('X-GitHub-Event', '')
+        if event == 'ping':
+            return web.Response(text='pong')
+        if event not in EVENTS:
+            return web.Response(status=204)
+        delivery = request.headers.get('X-GitHub-Delivery', '')
+        if delivery and delivery in self.deliveries:
+            self.duplicates += 1
+            return web.Response(status=200)
+        try:
+            payload = json.loads(body)
+            repo = payload['repository']
+            full_name = repo['full_name']
+            sender = payload['sender']['login']
+        except (ValueError, KeyError, TypeError):
+            return web.Response(status=400)
+        if self.invalidate:
+            try:
+                self.invalidate(full_name, repo)
+            except Exception:
+                # Cached data expires anyway, the event still goes to the watchers
+                logging.exception('Failed to invalidate cached data of %s', full_name)
+                self.errors += 1
+        # The delivery is remembered only when it is handled, so a redelivery after a failure isn't dropped
+        if delivery:
+            self.deliveries[delivery] = True
+            if len(self.deliveries) > self.deliveries_size:
+                self.deliveries.popitem(last=False)
+        self.received += 1
+        text = format_event(event, payload)
+        if text:
+            future = asyncio.ensure_future(self.deliver(full_name, sender, text))
+            self.sending.add(future)
+            future.add_done_callback(self.sending.discard)
+        return web.Response(status=202)
+
+    async def deliver(self, full_name: str, sender: str, text: str) -> None:
+        """
+        Method for sending the message to every watcher of the repository except the author of the event
+        :param full_name: full name of the repository
+        :param sender: login of the user that caused the event
+        :param text: HTML text of the message
+        :return: nothing to return
+        """
+        try:
+            subscribers = await self.get_subscribers(full_name)
+        except Exception:
+            logging.exception('Failed to get watchers of %s', full_name)
+            self.errors += 1
+            return
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(user_id: int) -> None:
+            async with semaphore:
+                try:
+                    await self.send(user_id, text)
+                    self.sent += 1
+                except Exception:
+                    logging.exception('Failed to send event of %s to %s', full_name, user_id)
+                    self.errors += 1
+
+        await asyncio.gather(*(send(item['telegram_id']) for item in subscribers
+                               if item.get('login', '').lower() != sender.lower()))
+
+    async def close(self) -> None:
+        """
+        Method for waiting for messages that are being sent
+        :return: nothing to return
+        """
+        if self.sending:
+            await asyncio.wait(list(self.sending))
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the receiver
+        :return: dictionary with received, rejected and repeated deliveries, sent messages and errors
+        """
+        return {'received': self.received, 'rejected': self.rejected, 'duplicates': self.duplicates,
+                'sent': self.sent, 'errors': self.errors}
@@ -1,16 +1,19 @@
-from cryptography.fernet import Fernet
+from typing import Iterable
+
+from cryptography.fernet import Fernet, MultiFernet
 
 
 class Hasher:
     """
     Class for hashing tokens in database
     """
-    def __init__(self, key: str):
+    def __init__(self, key: str, old_keys: Iterable[str] = ()):
         """
         Create the hasher object with custom key
-        :param key: value for hashing
+        :param key: value for hashing, new messages are encrypted with it
+        :param old_keys: previous keys, messages encrypted with them can still be decrypted during key rotation
         """
-        self.f = Fernet(str.encode(key))
+        self.f = MultiFernet([Fernet(str.encode(item)) for item in [key, *old_keys]])
 
     @staticmethod
     def generate_key(filepath='secret.key') -> None:
@@ -56,3 +59,12 @@ class Hasher:
         except TypeError:
             return ''
         return decrypted_message
+
+    def rotate_message(self, encrypted_message: bytes) -> bytes:
+        """
+        Method that encrypts hashing string again with the current key
+        :param encrypted_message: hashing string encrypted with the current or one of the old keys
+        :return: hashing string encrypted with the current key
+        :raise InvalidToken: the string isn't encrypted with any of the keys
+        """
+        return self.f.rotate(encrypted_message)
@@ -0,0 +1,195 @@
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import NamedTuple, Optional
+
+
+class CachedResponse(NamedTuple):
+    """
+    Validators and body of one GitHub response
+    """
+    etag: str
+    last_modified: str
+    next_url: str
+    body: bytes
+
+
+class ResponseCache(ABC):
+    """
+    Base class for storing GitHub responses to revalidate them with conditional requests
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Create the cache with counters
+        :param max_size: maximum total size of stored bodies in bytes
+        """
+        self.max_size = max_size
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Method for getting stored response
+        :param key: user and url of the request
+        :return: stored response or None
+        """
+
+    @abstractmethod
+    def set(self, key: str, response: CachedResponse) -> None:
+        """
+        Method for storing response, the least recently used responses are evicted when the cache is full
+        :param key: user and url of the request
+        :param response: validators and body
+        :return: nothing to return
+        """
+
+    @abstractmethod
+    def size(self) -> int:
+        """
+        Method for getting total size of stored bodies
+        :return: size in bytes
+        """
+
+    def close(self) -> None:
+        """
+        Method for releasing resources of the backend
+        :return: nothing to return
+        """
+
+    def record_hit(self) -> None:
+        """
+        Method for counting response that GitHub confirmed with 304 Not Modified
+        :return: nothing to return
+        """
+        with self.lock:
+            self.hits += 1
+
+    def record_miss(self) -> None:
+        """
+        Method for counting response that was downloaded in full
+        :return: nothing to return
+        """
+        with self.lock:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the cache
+        :return: dictionary with hits, misses, stores, evictions and size in bytes
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores,
+                'evictions': self.evictions, 'size': self.size()}
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Class for storing GitHub responses in process memory
+    """
+
+    def __init__(self, max_size: int = 50 * 1024 * 1024):
+        super().__init__(max_size)
+        self.responses = OrderedDict()
+        self.total_size = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            response = self.responses.get(key)
+            if response is not None:
+                self.responses.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        if len(response.body) > self.max_size:
+            return
+        with self.lock:
+            old_response = self.responses.pop(key, None)
+            if old_response is not None:
+                self.total_size -= len(old_response.body)
+            self.responses[key] = response
+            self.total_size += len(response.body)
+            self.stores += 1
+            while self.total_size > self.max_size:
+                _, evicted = self.responses.popitem(last=False)
+                self.total_size -= len(evicted.body)
+                self.evictions += 1
+
+    def size(self) -> int:
+        return self.total_size
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Class for storing GitHub responses in SQLite database, so they survive restarts
+    """
+
+    def __init__(self, path: str = 'github_cache.sqlite3', max_size: int = 50 * 1024 * 1024):
+        """
+        Create the cache with table in the database file
+        :param path: path to database file
+        :param max_size: maximum total size of stored bodies in bytes
+        """
+        super().__init__(max_size)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, etag TEXT, '
+                                'last_modified TEXT, next_url TEXT, body BLOB, size INTEGER, used_at REAL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)')
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self.lock:
+            row = self.connection.execute('SELECT etag, last_modified, next_url, body FROM responses '
+                                          'WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute('UPDATE responses SET used_at = ? WHERE key = ?', (time.time(), key))
+            self.connection.commit()
+            return CachedResponse(*row)
+
+    def set(self, key: str, response: CachedResponse) -> None:
+        if len(response.body) > self.max_size:
+            return
+        with self.lock:
+            self.connection.execute('REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (key, response.etag, response.last_modified, response.next_url,
+                                     response.body, len(response.body), time.time()))
+            self.stores += 1
+            total_size = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            while total_size > self.max_size:
+                evicted_key, size = self.connection.execute(
+                    'SELECT key, size FROM responses ORDER BY used_at LIMIT 1').fetchone()
+                self.connection.execute('DELETE FROM responses WHERE key = ?', (evicted_key,))
+                total_size -= size
+                self.evictions += 1
+            self.connection.commit()
+
+    def size(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def create_response_cache(backend: str, path: str, max_size: int) -> Optional[ResponseCache]:
+    """
+    Function for creating cache by name of the backend
+    :param backend: 'memory', 'sqlite' or empty string to disable caching
+    :param path: path to database file for sqlite backend
+    :param max_size: maximum total size of stored bodies in bytes
+    :return: cache object or None
+    """
+    if backend == 'memory':
+        return MemoryResponseCache(max_size)
+    if backend == 'sqlite':
+        return SQLiteResponseCache(path, max_size)
+    if backend:
+        raise ValueError(f'Unknown cache backend: {backend}')
+    return None
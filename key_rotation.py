@@ -0,0 +1,172 @@
+"""
+Re-encryption of all tokens with the current HASH_KEY after it was changed.
+Set the new key in HASH_KEY and the previous one in HASH_OLD_KEYS, restart the bot, then run:
+    python key_rotation.py --batch-size 1000
+The job can be stopped at any moment, the next run continues after the last written batch.
+Remove the key from HASH_OLD_KEYS when the job reports that all tokens are rotated.
+"""
+import argparse
+import hashlib
+import logging
+import time
+
+from cryptography.fernet import InvalidToken
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from config import DB_PASSWORD, HASH_KEY, HASH_OLD_KEYS, MONGO_URI, MONGO_POOL_SIZE
+from database import Client
+from hashing import Hasher
+
+
+class KeyRotation:
+    """
+    Class for re-encrypting tokens collection in batches, with bulk writes and a checkpoint after every batch
+    """
+
+    def __init__(self, collection: Collection, checkpoints: Collection, hasher: Hasher, batch_size: int = 1000,
+                 name: str = 'tokens'):
+        """
+        Create the job
+        :param collection: collection with encrypted tokens in the token field
+        :param checkpoints: collection where the job keeps its progress
+        :param hasher: hasher with the new key and the old keys
+        :param batch_size: number of documents in one cursor batch and in one bulk write
+        :param name: name of the checkpoint, runs with the same name continue each other
+        """
+        self.collection = collection
+        self.checkpoints = checkpoints
+        self.hasher = hasher
+        self.batch_size = batch_size
+        self.name = name
+        self.rotated = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def load_checkpoint(self):
+        """
+        Method for getting _id of the last rotated document and restoring counters
+        :return: _id or None if the job hasn't started yet
+        """
+        checkpoint = self.checkpoints.find_one({'_id': self.name})
+        if checkpoint is None:
+            return None
+        self.rotated = checkpoint['rotated']
+        self.skipped = checkpoint['skipped']
+        self.failed = checkpoint['failed']
+        return checkpoint['last_id']
+
+    def save_checkpoint(self, last_id, finished: bool = False) -> None:
+        """
+        Method for persisting the progress after a batch is written: _id of its last document and the counters,
+        a stopped or crashed job resumes after this _id on the next run, reset starts it from the beginning
+        :param last_id: _id of the last rotated document, documents are rotated in ascending order of _id
+        :param finished: all documents have been rotated, the next run only picks up documents added since
+        :return: nothing to return
+        """
+        self.checkpoints.update_one({'_id': self.name},
+                                    {'$set': {'last_id': last_id, 'rotated': self.rotated, 'skipped': self.skipped,
+                                              'failed': self.failed, 'finished': finished}},
+                                    upsert=True)
+
+    def reset(self) -> None:
+        """
+        Method for starting the job from the beginning on the next run
+        :return: nothing to return
+        """
+        self.checkpoints.delete_one({'_id': self.name})
+        self.rotated = self.skipped = self.failed = 0
+
+    def rotate_batch(self, documents: list) -> None:
+        """
+        Method for re-encrypting one batch with one bulk write
+        :param documents: documents with _id and token fields
+        :return: nothing to return
+        """
+        requests = []
+        for document in documents:
+            try:
+                token = self.hasher.rotate_message(document['token'])
+            except (InvalidToken, TypeError, KeyError):
+                logging.warning('Token of document %s can\'t be decrypted with any key', document['_id'])
+                self.failed += 1
+                continue
+            # The filter keeps the token that the user has set with /token while the job was running
+            requests.append(UpdateOne({'_id': document['_id'], 'token': document['token']}, {'$set': {'token': token}}))
+        if requests:
+            result = self.collection.bulk_write(requests, ordered=False)
+            self.rotated += result.modified_count
+            self.skipped += len(requests) - result.modified_count
+
+    def run(self) -> dict:
+        """
+        Method for rotating all tokens after the checkpoint
+        :return: dictionary with counters of rotated, skipped and failed tokens
+        """
+        last_id = self.load_checkpoint()
+        query = {} if last_id is None else {'_id': {'$gt': last_id}}
+        total = self.collection.count_documents(query)
+        logging.info('Rotating %s tokens, %s already done', total, self.rotated + self.skipped + self.failed)
+        cursor = self.collection.find(query, {'token': True}).sort('_id', ASCENDING).batch_size(self.batch_size)
+        start = time.perf_counter()
+        done = 0
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) == self.batch_size:
+                last_id = self.finish_batch(batch)
+                done += len(batch)
+                batch = []
+                self.report(done, total, start)
+        if batch:
+            last_id = self.finish_batch(batch)
+            done += len(batch)
+            self.report(done, total, start)
+        self.save_checkpoint(last_id, finished=True)
+        return {'rotated': self.rotated, 'skipped': self.skipped, 'failed': self.failed}
+
+    def finish_batch(self, batch: list):
+        """
+        Method for rotating the batch and saving the checkpoint right after its bulk write
+        :param batch: documents with _id and token fields in ascending order of _id
+        :return: _id of the last document of the batch
+        """
+        self.rotate_batch(batch)
+        last_id = batch[-1]['_id']
+        self.save_checkpoint(last_id)
+        return last_id
+
+    @staticmethod
+    def report(done: int, total: int, start: float) -> None:
+        """
+        Function for logging the progress of the run with its rate and estimated remaining time
+        :param done: number of documents handled during this run
+        :param total: number of documents to handle during this run
+        :param start: value of time.perf_counter when the run started
+        :return: nothing to return
+        """
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0
+        remaining = (total - done) / rate if rate else 0
+        logging.info('Rotated %s/%s tokens, %.0f tokens/s, %.0f seconds left', done, total, rate, remaining)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--restart', action='store_true', help='forget the checkpoint and rotate all tokens again')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    tokens = Client(DB_PASSWORD, 'githubhelper', 'tokens', MONGO_URI, MONGO_POOL_SIZE)
+    checkpoints = Client(DB_PASSWORD, 'githubhelper', 'key_rotations', MONGO_URI, MONGO_POOL_SIZE)
+    # A new key starts from the beginning, a stopped run with the same key continues
+    name = f'tokens:{hashlib.sha256(HASH_KEY.encode()).hexdigest()[:16]}'
+    job = KeyRotation(tokens.collection, checkpoints.collection, Hasher(HASH_KEY, HASH_OLD_KEYS), args.batch_size, name)
+    if args.restart:
+        job.reset()
+    logging.info('Finished: %s', job.run())
+    Client.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import OrderedDict
+from html import escape
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from api import AsyncApi, get_html_url
+
+# Types of notification subjects that are sent to Telegram
+SUBJECT_TYPES = ('Issue', 'PullRequest')
+
+
+class Subscription:
+    """
+    Class that represents polling state of one subscribed user
+    """
+    __slots__ = ('user_id', 'last_modified', 'interval', 'seen', 'started', 'errors')
+
+    def __init__(self, user_id: int, interval: float):
+        self.user_id = user_id
+        self.last_modified = ''
+        self.interval = interval
+        # Keys of notifications that were already handled, in order of handling
+        self.seen: OrderedDict = OrderedDict()
+        # The first poll only remembers what is already unread, so the user doesn't get old notifications
+        self.started = False
+        self.errors = 0
+
+
+class NotificationPoller:
+    """
+    Class for polling GitHub notifications of subscribed users in the background and sending new ones to Telegram
+    """
+
+    def __init__(self, get_api: Callable[[int], Awaitable[Optional[AsyncApi]]],
+                 send: Callable[[int, str], Awaitable], concurrency: int = 8, interval: float = 60,
+                 jitter: float = 0.1, max_interval: float = 3600, seen_size: int = 200,
+                 timer: Callable[[], float] = time.monotonic):
+        """
+        Create the poller
+        :param get_api: coroutine function that returns GitHub worker of the user or None if there is no token
+        :param send: coroutine function that sends the HTML text to the user
+        :param concurrency: maximum number of users polled at the same time
+        :param interval: minimum number of seconds between polls of one user, GitHub may ask for more
+        :param jitter: part of the interval added at random, so polls of different users don't come in bursts
+        :param max_interval: maximum number of seconds between polls after errors
+        :param seen_size: number of notification keys remembered per user for deduplication
+        :param timer: function that returns current time in seconds
+        """
+        self.get_api = get_api
+        self.send = send
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self.jitter = jitter
+        self.max_interval = max_interval
+        self.seen_size = seen_size
+        self.timer = timer
+        self.subscriptions: Dict[int, Subscription] = {}
+        self.queue: List[tuple] = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.polling: Set[asyncio.Future] = set()
+        self.polls = 0
+        self.not_modified = 0
+        self.sent = 0
+        self.errors = 0
+
+    def schedule(self, subscription: Subscription, delay: float) -> None:
+        """
+        Method for queueing the next poll of the user and waking up the loop, so it can wait less
+        :param subscription: polling state of the user
+        :param delay: number of seconds from now until the poll is due
+        :return: nothing to return
+        """
+        heapq.heappush(self.queue, (self.timer() + delay, next(self.counter), subscription))
+        self.wakeup.set()
+
+    def subscribe(self, user_id: int) -> None:
+        """
+        Method for starting to poll notifications of the user, the first poll is spread over one interval
+        :param user_id: id of the Telegram user
+        :return: nothing to return
+        """
+        if user_id not in self.subscriptions:
+            subscription = Subscription(user_id, self.interval)
+            self.subscriptions[user_id] = subscription
+            self.schedule(subscription, random.uniform(0, self.interval))
+
+    def subscribe_all(self, user_ids: Iterable[int]) -> None:
+        """
+        Method for subscribing users at once, e.g. subscribers from the database on startup
+        :param user_ids: ids of the Telegram users
+        :return: nothing to return
+        """
+        for user_id in user_ids:
+            self.subscribe(user_id)
+
+    def unsubscribe(self, user_id: int) -> None:
+        """
+        Method for stopping to poll notifications of the user, the queued poll is dropped when it is due
+        :param user_id: id of the Telegram user
+        :return: nothing to return
+        """
+        self.subscriptions.pop(user_id, None)
+
+    @staticmethod
+    def format_notification(notification: dict) -> str:
+        subject = notification['subject']
+        kind = 'Pull request' if subject['type'] == 'PullRequest' else 'Issue'
+        reason = notification['reason'].replace('_', ' ')
+        # Titles are written by other people, so HTML is escaped instead of using Markdown
+        return f'<b>{escape(notification["repository"]["full_name"])}</b>: {kind} ' \
+               f'<a href="{escape(get_html_url(subject["url"]))}">{escape(subject["title"])}</a>, <i>{reason}</i>'
+
+    async def poll(self, subscription: Subscription) -> None:
+        """
+        Method for getting new notifications of the user and sending them
+        :param subscription: polling state of the user
+        :return: nothing to return
+        """
+        api_worker = await self.get_api(subscription.user_id)
+        if api_worker is None:
+            self.unsubscribe(subscription.user_id)
+            return
+        notifications = await api_worker.get_notifications(subscription.last_modified)
+        self.polls += 1
+        subscription.interval = max(self.interval, notifications.poll_interval)
+        if notifications.last_modified == subscription.last_modified and not notifications.items:
+            self.not_modified += 1
+            return
+        # GitHub returns the newest notifications first
+        for notification in reversed(notifications.items):
+            key = f'{notification["id"]}:{notification["updated_at"]}'
+            if key in subscription.seen:
+                continue
+            subject = notification['subject']
+            if subscription.started and subject['type'] in SUBJECT_TYPES and subject.get('url'):
+                # A failed send stops the batch, the next poll asks for the same notifications again
+                await self.send(subscription.user_id, self.format_notification(notification))
+                self.sent += 1
+            subscription.seen[key] = True
+            if len(subscription.seen) > self.seen_size:
+                subscription.seen.popitem(last=False)
+        subscription.last_modified = notifications.last_modified
+        subscription.started = True
+
+    async def poll_and_schedule(self, subscription: Subscription) -> None:
+        """
+        Method for polling the user within the concurrency limit and queueing the next poll, errors are logged
+        and double the interval up to max_interval, jitter is added to every interval
+        :param subscription: polling state of the user
+        :return: nothing to return
+        """
+        try:
+            async with self.semaphore:
+                await self.poll(subscription)
+            subscription.errors = 0
+        except Exception:
+            logging.exception('Failed to poll notifications of %s', subscription.user_id)
+            self.errors += 1
+            subscription.errors += 1
+        if self.subscriptions.get(subscription.user_id) is subscription:
+            delay = min(subscription.interval * 2 ** subscription.errors, self.max_interval)
+            self.schedule(subscription, delay * random.uniform(1, 1 + self.jitter))
+
+    async def run(self) -> None:
+        """
+        Method for starting polls when they are due, it runs until the task is cancelled
+        :return: nothing to return
+        """
+        while True:
+            self.wakeup.clear()
+            now = self.timer()
+            while self.queue and self.queue[0][0] <= now:
+                _, _, subscription = heapq.heappop(self.queue)
+                # The user may have unsubscribed or subscribed again while the poll was queued
+                if self.subscriptions.get(subscription.user_id) is subscription:
+                    future = asyncio.ensure_future(self.poll_and_schedule(subscription))
+                    self.polling.add(future)
+                    future.add_done_callback(self.polling.discard)
+            delay = self.queue[0][0] - now if self.queue else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """
+        Method for starting the loop in the background, it must be called from the running event loop
+        :return: nothing to return
+        """
+        self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self) -> None:
+        """
+        Method for stopping the loop and polls that are in progress
+        :return: nothing to return
+        """
+        tasks = list(self.polling)
+        if self.task:
+            tasks.append(self.task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the poller
+        :return: dictionary with subscribers, polls, polls without changes, sent notifications and errors
+        """
+        return {'subscribers': len(self.subscriptions), 'polls': self.polls, 'not_modified': self.not_modified,
+                'sent': self.sent, 'errors': self.errors}
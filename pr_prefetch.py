@@ -0,0 +1,122 @@
+import asyncio
+from typing import List, NamedTuple
+
+from api import AsyncApi
+from cache import TTLCache
+
+
+class PullRequestTargets(NamedTuple):
+    """
+    Branches and assignees of the repository that answers of /create_pr are checked against
+    """
+    full_name: str
+    branches: List[str]
+    branches_complete: bool
+    assignees: List[str]
+    assignees_complete: bool
+
+
+class PullRequestPrefetch:
+    """
+    Class for loading branches and assignees of the repository while the user types the title and the body
+    of the pull request, so later answers are checked without GitHub requests
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 600, max_pages: int = 10):
+        """
+        Create the empty cache
+        :param maxsize: maximum number of users with loaded repositories
+        :param ttl: number of seconds while the loaded lists are valid
+        :param max_pages: maximum number of pages with 100 branches or assignees, the rest is checked with requests
+        """
+        self.targets = TTLCache(maxsize, ttl)
+        self.max_pages = max_pages
+
+    async def load(self, api_worker: AsyncApi, full_name: str) -> PullRequestTargets:
+        """
+        Method for loading branches and assignees of the repository at the same time
+        :param api_worker: GitHub worker of the user
+        :param full_name: full name of the repository
+        :return: branches and assignees, at most max_pages pages of each
+        """
+        (branches, branches_complete), (assignees, assignees_complete) = await asyncio.gather(
+            api_worker.get_branches(full_name, self.max_pages), api_worker.get_assignees(full_name, self.max_pages))
+        return PullRequestTargets(full_name, branches, branches_complete, assignees, assignees_complete)
+
+    def start(self, user_id: int, api_worker: AsyncApi, full_name: str) -> asyncio.Future:
+        """
+        Method for starting to load branches and assignees of the repository in the background
+        :param user_id: id of the Telegram user
+        :param api_worker: GitHub worker of the user
+        :param full_name: full name of the repository
+        :return: future with the targets
+        """
+        self.forget(user_id)
+        future = asyncio.ensure_future(self.load(api_worker, full_name))
+        # The user may cancel the flow before anyone awaits the result
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.targets.set(user_id, (full_name, future))
+        return future
+
+    async def get(self, user_id: int, api_worker: AsyncApi, full_name: str) -> PullRequestTargets:
+        """
+        Method for getting branches and assignees of the repository, they are loaded again if they have expired,
+        e.g. the user has answered after a long pause
+        :param user_id: id of the Telegram user
+        :param api_worker: GitHub worker of the user
+        :param full_name: full name of the repository
+        :return: branches and assignees
+        """
+        entry = self.targets.get(user_id)
+        if entry and entry[0] == full_name:
+            future = entry[1]
+        else:
+            future = self.start(user_id, api_worker, full_name)
+        try:
+            return await asyncio.shield(future)
+        except Exception:
+            # The next answer tries again instead of getting the same error
+            if self.targets.get(user_id) == (full_name, future):
+                self.targets.pop(user_id)
+            raise
+
+    async def has_branch(self, user_id: int, api_worker: AsyncApi, full_name: str, branch: str) -> bool:
+        """
+        Method for checking the branch locally, only a repository with too many branches costs a request
+        :param user_id: id of the Telegram user
+        :param api_worker: GitHub worker of the user
+        :param full_name: full name of the repository
+        :param branch: name of the branch
+        :return: status of existence
+        """
+        targets = await self.get(user_id, api_worker, full_name)
+        if branch in targets.branches:
+            return True
+        return not targets.branches_complete and await api_worker.has_branch(full_name, branch)
+
+    async def can_assign(self, user_id: int, api_worker: AsyncApi, full_name: str, login: str) -> bool:
+        """
+        Method for checking the assignee locally, only a repository with too many assignees costs a request
+        :param user_id: id of the Telegram user
+        :param api_worker: GitHub worker of the user
+        :param full_name: full name of the repository
+        :param login: login of the user in any case
+        :return: status of checking
+        """
+        targets = await self.get(user_id, api_worker, full_name)
+        if login.lower() in (assignee.lower() for assignee in targets.assignees):
+            return True
+        return not targets.assignees_complete and await api_worker.can_assign(full_name, login)
+
+    def forget(self, user_id: int) -> None:
+        """
+        Method for dropping the loaded lists, e.g. when the flow is over
+        :param user_id: id of the Telegram user
+        :return: nothing to return
+        """
+        entry = self.targets.pop(user_id)
+        if entry and not entry[1].done():
+            entry[1].cancel()
+
+    def stats(self) -> dict:
+        return self.targets.stats()
@@ -0,0 +1,197 @@
+from datetime import datetime
+from typing import Collection, Iterable, List, Optional, Tuple
+
+from aiogram import types
+
+from api import IssueRecord, ItemRecord, RepoRecord
+from batch import BatchResult
+
+# Prefixes of callback data
+CLOSE = 'c'
+MERGE = 'm'
+CREATE_ISSUE = 'i'
+CREATE_PR = 'p'
+# Repository names can't contain ':', so these don't clash with each other and with other callbacks
+PAGE = 'page:'
+REPO = 'repo:'
+REPO_PAGE = 'rpage:'
+# Select mode of /issues and /prs: switching it, marking the item by its index on the page, running the action
+SELECT = 'select:'
+TOGGLE = 'toggle:'
+BATCH = 'batch:'
+# Branch buttons are pressed during /create_pr only, the number is the index in the loaded list of branches
+BRANCH = 'branch:'
+
+# Templates are filled from plain records, nothing in them makes requests
+ISSUE_TEMPLATE = '*{index}*. _{title}_ [#{number}]({html_url}), [link to repository]({repository_url}).\n' \
+                 'Created: _{created}_. Author: _{author}_\n'
+REPO_ITEM_TEMPLATE = '*{index}. {name}*, [link]({html_url}).\n' \
+                     'Total issues and prs: _{open_issues_count}_\n' \
+                     'Type: _{type}_\n'
+REPO_TEMPLATE = 'Name: *{name}*, link: [click here]({html_url})\n' \
+                'Total stars: _{stargazers_count}_\n' \
+                'Total issues and prs: _{open_issues_count}_\n' \
+                'Total forks: _{forks_count}_\n' \
+                'Main language: _{language}_\n' \
+                'Created at: _{created}_\n' \
+                'Updated at: _{updated}_\n' \
+                'Type: _{type}_\n'
+
+
+def format_date(date: datetime) -> str:
+    return date.strftime('%d/%m/%Y')
+
+
+def get_navigation(prefix: str, page: int, has_next: bool) -> List[types.InlineKeyboardButton]:
+    """
+    Function for making Prev and Next buttons
+    :param prefix: callback data without the number of the page
+    :param page: number of the current page
+    :param has_next: whether the next page exists
+    :return: list of buttons for one row
+    """
+    navigation = []
+    if page > 1:
+        navigation.append(types.InlineKeyboardButton('Prev', callback_data=f'{prefix}{page - 1}'))
+    if has_next:
+        navigation.append(types.InlineKeyboardButton('Next', callback_data=f'{prefix}{page + 1}'))
+    return navigation
+
+
+def get_short_url(item: IssueRecord) -> str:
+    """
+    Function for making the part of api url that close and merge buttons carry
+    :param item: record of issue or pull request
+    :return: string in format owner/repo/issues/number
+    """
+    return f'{item.repository}/issues/{item.number}'
+
+
+def render_issues_page(items: List[IssueRecord], option: bool, page: int, has_next: bool, page_size: int,
+                       selected: Optional[Collection[str]] = None) -> Tuple[str, types.InlineKeyboardMarkup]:
+    """
+    Function for making the message with one page of issues or pull requests
+    :param items: records of the page
+    :param option: issue or pull request
+    :param page: number of the page
+    :param has_next: whether the next page exists
+    :param page_size: number of items on full page, for numbering
+    :param selected: short urls of selected items on all pages, None if the select mode is off
+    :return: text and keyboard with buttons
+    """
+    lines = []
+    buttons = []
+    for position, item in enumerate(items):
+        index = (page - 1) * page_size + position + 1
+        lines.append(ISSUE_TEMPLATE.format(index=index, title=item.title, number=item.number, html_url=item.html_url,
+                                           repository_url=f'https://github.com/{item.repository}',
+                                           created=format_date(item.created_at), author=item.author))
+        short_url = get_short_url(item)
+        if selected is not None:
+            mark = '\u2611' if short_url in selected else '\u2610'
+            buttons.append(types.InlineKeyboardButton(f'{mark} {index}',
+                                                      callback_data=f'{TOGGLE}{int(option)}:{page}:{position}'))
+            continue
+        buttons.append(types.InlineKeyboardButton(f'Close {index}', callback_data=f'{CLOSE}{short_url}'))
+        if not option:
+            buttons.append(types.InlineKeyboardButton(f'Merge {index}', callback_data=f'{MERGE}{short_url}'))
+    inline_keyboard = types.InlineKeyboardMarkup(row_width=4)
+    inline_keyboard.add(*buttons)
+    navigation = get_navigation(f'{PAGE}{int(option)}:', page, has_next)
+    if navigation:
+        inline_keyboard.row(*navigation)
+    if selected is not None:
+        actions = [types.InlineKeyboardButton(f'Close selected ({len(selected)})',
+                                              callback_data=f'{BATCH}{CLOSE}:{int(option)}')]
+        if not option:
+            actions.append(types.InlineKeyboardButton(f'Merge selected ({len(selected)})',
+                                                      callback_data=f'{BATCH}{MERGE}:{int(option)}'))
+        inline_keyboard.row(*actions)
+        inline_keyboard.row(types.InlineKeyboardButton('Cancel selection', callback_data=f'{SELECT}{int(option)}:{page}'))
+    elif items:
+        inline_keyboard.row(types.InlineKeyboardButton('Select', callback_data=f'{SELECT}{int(option)}:{page}'))
+    return ''.join(lines) or 'There are no items on this page.', inline_keyboard
+
+
+def render_batch_summary(results: List[BatchResult], merge: bool) -> str:
+    """
+    Function for making the plain text report of the batch, names of repositories may break Markdown
+    :param results: results of the batch in the order of selection
+    :param merge: pull requests were merged, otherwise closed
+    :return: text of the message
+    """
+    done = 'merged' if merge else 'closed'
+    succeeded = sum(result.ok for result in results)
+    lines = [f'{done.capitalize()} {succeeded} of {len(results)} items.']
+    for result in results:
+        full_name, number = result.target.rsplit('/issues/', 1)
+        status = done if result.ok else f'failed{": " + result.error if result.error else ""}'
+        lines.append(f'{full_name}#{number} - {status}')
+    return '\n'.join(lines)
+
+
+def render_branches(branches: List[str], first: str = None, exclude: str = None,
+                    limit: int = 10) -> types.InlineKeyboardMarkup:
+    """
+    Function for making buttons with names of branches
+    :param branches: names of branches as they were loaded
+    :param first: branch that goes first, e.g. the default one
+    :param exclude: branch without the button, e.g. the base one
+    :param limit: maximum number of buttons
+    :return: keyboard with buttons
+    """
+    # Sorting is stable, so the other branches keep their order
+    order = sorted(range(len(branches)), key=lambda index: branches[index] != first)
+    buttons = [types.InlineKeyboardButton(branches[index], callback_data=f'{BRANCH}{index}')
+               for index in order if branches[index] != exclude]
+    inline_keyboard = types.InlineKeyboardMarkup(row_width=2)
+    inline_keyboard.add(*buttons[:limit])
+    return inline_keyboard
+
+
+def render_repos(repos: Iterable[dict]) -> Tuple[str, types.InlineKeyboardMarkup]:
+    """
+    Function for making the message with the list of repositories, archived ones are skipped
+    :param repos: repositories as GitHub returns them
+    :return: text and keyboard with buttons
+    """
+    lines = []
+    buttons = []
+    for repo in repos:
+        if repo['archived']:
+            continue
+        index = len(lines) + 1
+        lines.append(REPO_ITEM_TEMPLATE.format(index=index, name=repo['name'], html_url=repo['html_url'],
+                                               open_issues_count=repo['open_issues_count'],
+                                               type='Private' if repo['private'] else 'Public'))
+        buttons.append(types.InlineKeyboardButton(str(index), callback_data=f'{REPO}{repo["name"]}'))
+    lines.append('\nClick the number of repository to get *details*')
+    inline_keyboard = types.InlineKeyboardMarkup(row_width=5)
+    inline_keyboard.add(*buttons)
+    return ''.join(lines), inline_keyboard
+
+
+def render_repo(repo: RepoRecord, items: List[ItemRecord], page: int = 1,
+                has_next: bool = False) -> Tuple[str, types.InlineKeyboardMarkup]:
+    """
+    Function for making the message with repository details
+    :param repo: record of the repository
+    :param items: one page of open issues and pull requests
+    :param page: number of the page
+    :param has_next: whether the next page exists
+    :return: text and keyboard with buttons
+    """
+    inline_keyboard = types.InlineKeyboardMarkup(row_width=2)
+    inline_keyboard.add(types.InlineKeyboardButton('Create issue', callback_data=f'{CREATE_ISSUE}{repo.name}'))
+    inline_keyboard.add(types.InlineKeyboardButton('Create pull request', callback_data=f'{CREATE_PR}{repo.name}'))
+    for item in items:
+        kind = 'Pull request' if item.pull_request else 'Issue'
+        inline_keyboard.add(types.InlineKeyboardButton(f'{kind} #{item.number} - {item.title}', url=item.html_url))
+    text = REPO_TEMPLATE.format(name=repo.name, html_url=repo.html_url, stargazers_count=repo.stargazers_count,
+                                open_issues_count=repo.open_issues_count, forks_count=repo.forks_count,
+                                language=repo.language, created=format_date(repo.created_at),
+                                updated=format_date(repo.updated_at), type='Private' if repo.private else 'Public')
+    navigation = get_navigation(f'{REPO_PAGE}{repo.name}:', page, has_next)
+    if navigation:
+        inline_keyboard.row(*navigation)
+    return text, inline_keyboard
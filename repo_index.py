@@ -0,0 +1,68 @@
+from difflib import get_close_matches
+from typing import Dict, Iterable, List, Optional
+
+from api import RepoRecord, get_repo_record
+
+
+class RepoIndex:
+    """
+    Class for resolving repository names of one user locally, without GitHub requests
+    """
+
+    def __init__(self, login: str, repos: Iterable[dict] = ()):
+        """
+        Create the index from the listing of user repositories
+        :param login: login of the user, only repositories of this owner can be found by short name
+        :param repos: repositories as GitHub returns them
+        """
+        self.login = login
+        self.entries: Dict[str, RepoRecord] = {}
+        for repo in repos:
+            self.add(repo)
+
+    def add(self, repo: dict) -> None:
+        """
+        Method for adding or refreshing the repository
+        :param repo: repository as GitHub returns it
+        :return: nothing to return
+        """
+        if repo['owner']['login'].lower() != self.login.lower():
+            return
+        # GitHub doesn't distinguish case in names of repositories
+        self.entries[repo['name'].lower()] = get_repo_record(repo)
+
+    def remove(self, name: str) -> None:
+        """
+        Method for removing the repository, e.g. when GitHub says that it doesn't exist anymore
+        :param name: short name of the repository
+        :return: nothing to return
+        """
+        self.entries.pop(name.lower(), None)
+
+    def get(self, name: str) -> Optional[RepoRecord]:
+        """
+        Method for finding the repository by short name
+        :param name: short name of the repository in any case
+        :return: record of the repository or None
+        """
+        return self.entries.get(name.strip().lower())
+
+    def suggest(self, name: str, limit: int = 3) -> List[str]:
+        """
+        Method for finding names that the user probably meant
+        :param name: mistyped name of the repository
+        :param limit: maximum number of suggestions
+        :return: names that start with the text first, then similar names
+        """
+        name = name.strip().lower()
+        if not name:
+            return []
+        keys = sorted(self.entries)
+        matches = [key for key in keys if key.startswith(name)][:limit]
+        for key in get_close_matches(name, keys, limit, 0.6):
+            if len(matches) < limit and key not in matches:
+                matches.append(key)
+        return [self.entries[key].name for key in matches]
+
+    def __len__(self) -> int:
+        return len(self.entries)
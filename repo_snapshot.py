@@ -0,0 +1,103 @@
+from typing import Iterable, List, Optional, Tuple
+
+from api import AsyncApi, ItemRecord, RepoRecord, get_repo_record
+from cache import TTLCache
+
+
+class RepoSnapshots:
+    """
+    Class for keeping repositories that users have recently listed or opened, so the detail view
+    and its pages of items are rendered without GitHub requests while the snapshot lives
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 120, page_size: int = 8):
+        """
+        Create the empty cache
+        :param maxsize: maximum number of users with snapshots
+        :param ttl: number of seconds while the snapshot of the user is valid
+        :param page_size: number of issues and pull requests on one page of the detail view
+        """
+        self.snapshots = TTLCache(maxsize, ttl)
+        self.page_size = page_size
+
+    def get_snapshot(self, user_id: int) -> dict:
+        """
+        Method for getting repositories of the user, an empty snapshot is started if there is none
+        :param user_id: id of the Telegram user
+        :return: dictionary with the record and pages of items by lowercase full name of the repository
+        """
+        snapshot = self.snapshots.get(user_id)
+        if snapshot is None:
+            snapshot = {}
+            self.snapshots.set(user_id, snapshot)
+        return snapshot
+
+    def store(self, user_id: int, repos: Iterable[dict]) -> None:
+        """
+        Method for remembering repositories from the listing, pages of items survive if the count of them hasn't changed
+        :param user_id: id of the Telegram user
+        :param repos: repositories as GitHub returns them
+        :return: nothing to return
+        """
+        old = self.snapshots.get(user_id) or {}
+        snapshot = {}
+        for repo in repos:
+            # Repositories of organizations and other owners may have the same short name as the user's own ones
+            key = repo['full_name'].lower()
+            view = old.get(key)
+            # The record always comes from the fresh listing, only pages of unchanged items are kept
+            pages = view['pages'] if view and view['repo'].open_issues_count == repo['open_issues_count'] else {}
+            snapshot[key] = {'repo': get_repo_record(repo), 'pages': pages}
+        self.snapshots.set(user_id, snapshot)
+
+    async def get_page(self, user_id: int, api_worker: AsyncApi, name: str,
+                       page: int = 1) -> Optional[Tuple[RepoRecord, List[ItemRecord], bool]]:
+        """
+        Method for getting the repository and one page of its open issues and pull requests,
+        a repository that wasn't listed costs one request, every new page costs one request
+        :param user_id: id of the Telegram user
+        :param api_worker: GitHub worker of the user
+        :param name: short name of the repository, it means the repository of the user as in get_repo_details
+        :param page: number of the page, starting from 1
+        :return: record of the repository, items and whether the next page exists, None if repository doesn't exist
+        """
+        snapshot = self.get_snapshot(user_id)
+        key = f'{await api_worker.get_login()}/{name}'.lower()
+        view = snapshot.get(key)
+        if view is None:
+            details = await api_worker.get_repo_details(name, self.page_size)
+            if details is None:
+                return None
+            repo, items = details
+            view = snapshot[key] = {'repo': repo, 'pages': {1: (items, repo.open_issues_count > len(items))}}
+        if page not in view['pages']:
+            view['pages'][page] = await api_worker.get_repo_items(view['repo'].full_name, page, self.page_size)
+        items, has_next = view['pages'][page]
+        return view['repo'], items, has_next
+
+    def forget(self, user_id: int, full_name: str) -> None:
+        """
+        Method for dropping the repository of the user, e.g. after the user has closed or created an issue
+        :param user_id: id of the Telegram user
+        :param full_name: full name of the repository
+        :return: nothing to return
+        """
+        snapshot = self.snapshots.get(user_id)
+        if snapshot:
+            snapshot.pop(full_name.lower(), None)
+
+    def forget_repo(self, full_name: str) -> None:
+        """
+        Method for dropping the repository of all users, e.g. after GitHub has sent its event
+        :param full_name: full name of the repository
+        :return: nothing to return
+        """
+        for snapshot in self.snapshots.values():
+            snapshot.pop(full_name.lower(), None)
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the cache
+        :return: dictionary with hits, misses, evictions and size
+        """
+        return self.snapshots.stats()
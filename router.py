@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector, web
+
+from config import API_TOKEN, GITHUB_WEBHOOK_PATH, WEBHOOK_PATH, WEBHOOK_URL, WORKER_URLS, WEBAPP_HOST, WEBAPP_PORT
+
+# Headers of GitHub deliveries that the workers need to verify and handle them
+GITHUB_HEADERS = ('Content-Type', 'X-GitHub-Event', 'X-GitHub-Delivery', 'X-Hub-Signature-256')
+
+
+def get_shard_key(update: dict) -> int:
+    """
+    Function for getting the key that keeps updates of one conversation on one worker
+    :param update: decoded Telegram update
+    :return: id of the user, id of the chat if there is no user (channel posts), id of the update otherwise
+    """
+    for value in update.values():
+        if isinstance(value, dict):
+            user = value.get('from') or value.get('user')
+            if user:
+                return user['id']
+            chat = value.get('chat')
+            if chat:
+                return chat['id']
+    return update.get('update_id', 0)
+
+
+class UpdateRouter:
+    """
+    Class for receiving Telegram webhook updates and forwarding them to the workers by user id.
+    The next update of the user is forwarded only when the worker has answered the previous one,
+    so the conversation is handled in order
+    """
+
+    def __init__(self, worker_urls: List[str], timeout: float = 60, connections: int = 100):
+        """
+        Create the router
+        :param worker_urls: base urls of the workers, e.g. http://127.0.0.1:5001
+        :param timeout: number of seconds to wait for the worker, aiogram answers webhook in 55 seconds at most
+        :param connections: maximum number of open connections to all workers
+        """
+        if not worker_urls:
+            raise ValueError('There are no workers to route updates to')
+        self.worker_urls = [url.rstrip('/') for url in worker_urls]
+        self.timeout = timeout
+        self.connections = connections
+        self.session: Optional[ClientSession] = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.forwarded = [0] * len(self.worker_urls)
+        self.failed = 0
+
+    def get_shard(self, key: int) -> int:
+        return key % len(self.worker_urls)
+
+    async def start(self) -> None:
+        self.session = ClientSession(timeout=ClientTimeout(total=self.timeout),
+                                     connector=TCPConnector(limit=self.connections))
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+
+    async def send(self, previous: Optional[asyncio.Future], url: str, body: bytes,
+                   headers: Dict[str, str] = None) -> Tuple[int, bytes, str]:
+        """
+        Method for sending the update to the worker after the previous update of the same user
+        :param previous: forwarding of the previous update of the user or None
+        :param url: url of the worker webhook
+        :param body: raw update
+        :param headers: headers of the request, JSON content type if None
+        :return: status, body and content type of the worker response
+        """
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            async with self.session.post(url, data=body,
+                                         headers=headers or {'Content-Type': 'application/json'}) as response:
+                return response.status, await response.read(), response.content_type
+        except (ClientError, asyncio.TimeoutError) as e:
+            logging.warning('Worker %s failed: %r', url, e)
+            self.failed += 1
+            # Telegram sends the update again after an error
+            return 502, b'', 'text/plain'
+
+    async def forward(self, key: int, path: str, body: bytes) -> Tuple[int, bytes, str]:
+        """
+        Method for forwarding the update to the worker of its shard
+        :param key: shard key of the update
+        :param path: path and query of the webhook request
+        :param body: raw update
+        :return: status, body and content type of the worker response
+        """
+        shard = self.get_shard(key)
+        self.forwarded[shard] += 1
+        task = asyncio.ensure_future(self.send(self.pending.get(key), self.worker_urls[shard] + path, body))
+        self.pending[key] = task
+        task.add_done_callback(lambda _: self.pending.pop(key) if self.pending.get(key) is task else None)
+        # Telegram may drop the connection, but the next update of the user still waits for this one
+        return await asyncio.shield(task)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+        status, payload, content_type = await self.forward(get_shard_key(update), request.path_qs, body)
+        return web.Response(status=status, body=payload, content_type=content_type)
+
+    async def handle_github(self, request: web.Request) -> web.Response:
+        """
+        Method for sending GitHub delivery to all workers, every worker drops its cached data of the repository
+        and messages watchers of its own shard
+        :param request: request from GitHub
+        :return: the worst response of the workers
+        """
+        body = await request.read()
+        headers = {name: request.headers[name] for name in GITHUB_HEADERS if name in request.headers}
+        responses = await asyncio.gather(*(self.send(None, url + request.path_qs, body, headers)
+                                           for url in self.worker_urls))
+        status, payload, content_type = max(responses, key=lambda response: response[0])
+        return web.Response(status=status, body=payload, content_type=content_type)
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the router
+        :return: dictionary with forwarded updates by worker, failed forwards and users with updates in flight
+        """
+        return {'forwarded': dict(zip(self.worker_urls, self.forwarded)), 'failed': self.failed,
+                'pending': len(self.pending)}
+
+    def create_app(self, path: str, github_path: str = None) -> web.Application:
+        """
+        Method for creating web application that receives webhook updates
+        :param path: path of the webhook
+        :param github_path: path of GitHub webhook deliveries, they are not received if None
+        :return: application
+        """
+        app = web.Application()
+        app.router.add_post(path, self.handle)
+        if github_path:
+            app.router.add_post(github_path, self.handle_github)
+
+        async def on_startup(_):
+            await self.start()
+
+        async def on_cleanup(_):
+            logging.info('Router: %s', self.stats())
+            await self.close()
+
+        app.on_startup.append(on_startup)
+        app.on_cleanup.append(on_cleanup)
+        return app
+
+
+async def set_webhook(_) -> None:
+    bot = Bot(token=API_TOKEN)
+    try:
+        await bot.set_webhook(WEBHOOK_URL)
+    finally:
+        await bot.session.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    router = UpdateRouter(WORKER_URLS)
+    application = router.create_app(WEBHOOK_PATH, GITHUB_WEBHOOK_PATH)
+    application.on_startup.append(set_webhook)
+    web.run_app(application, host=WEBAPP_HOST, port=WEBAPP_PORT)
@@ -0,0 +1,186 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+from github.GithubException import RateLimitExceededException
+
+# Priorities of calls, interactive calls (button presses) go before bulk ones (listings)
+INTERACTIVE = 0
+BULK = 1
+
+
+class RateLimitBudget:
+    """
+    Class that represents the rate limit of one GitHub resource: core, search or graphql
+    """
+    __slots__ = ('limit', 'remaining', 'reset_at', 'next_bulk_at')
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: float = 0
+        self.next_bulk_at: float = 0
+
+
+class RateLimitScheduler:
+    """
+    Class for pacing requests of one token by the rate limit that GitHub reports in response headers
+    """
+
+    def __init__(self, reserve: int = 50, pace_below: float = 0.1, max_wait: float = 10, max_retries: int = 3,
+                 backoff: float = 1, max_backoff: float = 60, timer: Callable[[], float] = time.time):
+        """
+        Create the scheduler with unknown budget
+        :param reserve: number of requests kept for interactive calls, bulk calls wait for reset below it
+        :param pace_below: part of the limit below which bulk calls are spread evenly until reset
+        :param max_wait: maximum number of seconds to wait, RateLimitExceededException is raised instead
+        :param max_retries: number of retries after secondary rate limit responses
+        :param backoff: first delay of exponential backoff in seconds when GitHub doesn't send Retry-After
+        :param max_backoff: maximum delay of exponential backoff in seconds
+        :param timer: function that returns current unix time in seconds
+        """
+        self.reserve = reserve
+        self.pace_below = pace_below
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timer = timer
+        self.budgets: Dict[str, RateLimitBudget] = {}
+        self.blocked_until = 0
+        self.queued = [0, 0]
+        self.condition = threading.Condition()
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def get_budget(self, resource: str) -> RateLimitBudget:
+        if resource not in self.budgets:
+            self.budgets[resource] = RateLimitBudget()
+        return self.budgets[resource]
+
+    def get_delay(self, priority: int, resource: str) -> float:
+        """
+        Method for calculating how long the call has to wait
+        :param priority: INTERACTIVE or BULK
+        :param resource: name of the rate limit resource
+        :return: number of seconds, zero or negative if the call can go now
+        """
+        now = self.timer()
+        delay = self.blocked_until - now
+        budget = self.get_budget(resource)
+        if budget.remaining is None or now >= budget.reset_at:
+            return delay
+        if budget.remaining <= 0 or (priority == BULK and budget.remaining <= self.reserve):
+            return max(delay, budget.reset_at - now)
+        if priority == BULK:
+            return max(delay, budget.next_bulk_at - now)
+        return delay
+
+    def acquire(self, priority: int, resource: str) -> None:
+        """
+        Method for waiting until the call fits in the budget
+        :param priority: INTERACTIVE or BULK
+        :param resource: name of the rate limit resource
+        :return: nothing to return
+        :raise RateLimitExceededException: the call would wait longer than max_wait
+        """
+        with self.condition:
+            self.queued[priority] += 1
+            try:
+                throttled = False
+                while True:
+                    delay = self.get_delay(priority, resource)
+                    interactive_first = priority == BULK and self.queued[INTERACTIVE] > 0
+                    if delay <= 0 and not interactive_first:
+                        break
+                    if delay > self.max_wait:
+                        raise RateLimitExceededException(403, {'message': 'API rate limit exceeded, '
+                                                                          f'retry in {int(delay)} seconds'}, None)
+                    if not throttled:
+                        throttled = True
+                        self.throttled += 1
+                    self.condition.wait(delay if delay > 0 else 0.01)
+            finally:
+                self.queued[priority] -= 1
+            self.requests += 1
+            budget = self.get_budget(resource)
+            if budget.remaining is not None:
+                now = self.timer()
+                budget.remaining -= 1
+                if priority == BULK and budget.limit and budget.remaining < budget.limit * self.pace_below:
+                    spare = max(budget.remaining - self.reserve, 1)
+                    budget.next_bulk_at = now + max(budget.reset_at - now, 0) / spare
+
+    def update(self, response: requests.Response, resource: str) -> None:
+        """
+        Method for updating the budget from X-RateLimit headers of the response
+        :param response: response from GitHub
+        :param resource: name of the rate limit resource used when the header is missing
+        :return: nothing to return
+        """
+        headers = response.headers
+        if 'X-RateLimit-Remaining' not in headers:
+            return
+        with self.condition:
+            budget = self.get_budget(headers.get('X-RateLimit-Resource', resource))
+            budget.remaining = int(headers['X-RateLimit-Remaining'])
+            budget.limit = int(headers.get('X-RateLimit-Limit', budget.limit or 0))
+            budget.reset_at = float(headers.get('X-RateLimit-Reset', budget.reset_at))
+            self.condition.notify_all()
+
+    def get_retry_delay(self, response: requests.Response, attempt: int) -> Optional[float]:
+        """
+        Method for detecting secondary rate limit and getting delay before the retry
+        :param response: response from GitHub
+        :param attempt: number of retries made before
+        :return: number of seconds or None if the response isn't a secondary rate limit
+        """
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            return float(retry_after)
+        if 'secondary rate limit' in response.text.lower():
+            return min(self.backoff * 2 ** attempt, self.max_backoff)
+        return None
+
+    def execute(self, send: Callable[[], requests.Response], priority: int = INTERACTIVE,
+                resource: str = 'core') -> requests.Response:
+        """
+        Method for sending the request when the budget allows it and retrying after secondary rate limit
+        :param send: function that sends the request
+        :param priority: INTERACTIVE or BULK
+        :param resource: name of the rate limit resource
+        :return: response from GitHub
+        :raise RateLimitExceededException: the call would wait longer than max_wait
+        """
+        attempt = 0
+        while True:
+            self.acquire(priority, resource)
+            response = send()
+            self.update(response, resource)
+            delay = self.get_retry_delay(response, attempt)
+            if delay is None or attempt >= self.max_retries:
+                return response
+            with self.condition:
+                self.blocked_until = max(self.blocked_until, self.timer() + delay)
+                self.retries += 1
+            attempt += 1
+
+    def stats(self) -> dict:
+        """
+        Method for getting budget and counters of the scheduler
+        :return: dictionary with requests, throttled and retried calls, queued calls and budgets by resource
+        """
+        with self.condition:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'queued': sum(self.queued),
+                'budgets': {resource: {'limit': budget.limit, 'remaining': budget.remaining,
+                                       'reset_at': budget.reset_at}
+                            for resource, budget in self.budgets.items()},
+            }
@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from aiogram import Bot
+from aiogram.utils.exceptions import RetryAfter
+
+# Methods that post into a chat and count against flood limits of the chat
+CHAT_METHODS = ('send', 'edit', 'copy', 'forward')
+# Fields of sendMessage that allow joining it with the next message, anything else (keyboards, replies) doesn't
+COALESCE_FIELDS = {'chat_id', 'text', 'parse_mode', 'disable_web_page_preview', 'disable_notification'}
+MAX_TEXT_LENGTH = 4096
+
+
+class TokenBucket:
+    """
+    Class for limiting the rate of events with allowed bursts
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        """
+        Create the full bucket
+        :param rate: number of tokens added per second
+        :param capacity: maximum number of tokens, i.e. the longest burst
+        :param now: current time in seconds
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+
+    def get_delay(self, now: float) -> float:
+        """
+        Method for calculating how long to wait for a token
+        :param now: current time in seconds
+        :return: number of seconds, zero if the token is available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class OutgoingRequest:
+    """
+    Class that represents one queued request to Telegram and the callers that wait for its result
+    """
+    __slots__ = ('method', 'data', 'files', 'futures', 'retries')
+
+    def __init__(self, method: str, data: dict, files: Optional[dict]):
+        self.method = method
+        self.data = data
+        self.files = files
+        self.futures = [asyncio.get_event_loop().create_future()]
+        self.retries = 0
+
+    def can_join(self, other: 'OutgoingRequest') -> bool:
+        """
+        Method for checking that the other text message can be sent as a part of this one
+        :param other: the next request to the same chat
+        :return: status of checking
+        """
+        if self.method != 'sendMessage' or other.method != 'sendMessage' or self.files or other.files:
+            return False
+        if not COALESCE_FIELDS.issuperset(self.data) or not COALESCE_FIELDS.issuperset(other.data):
+            return False
+        if any(self.data.get(key) != other.data.get(key) for key in COALESCE_FIELDS if key != 'text'):
+            return False
+        return len(self.data['text']) + len(other.data['text']) + 2 <= MAX_TEXT_LENGTH
+
+    def join(self, other: 'OutgoingRequest') -> None:
+        self.data = dict(self.data, text=f'{self.data["text"]}\n\n{other.data["text"]}')
+        self.futures.extend(other.futures)
+
+
+class ChatQueue:
+    """
+    Class that represents requests waiting for one chat
+    """
+    __slots__ = ('bucket', 'pending', 'blocked_until', 'task')
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.pending: Deque[OutgoingRequest] = deque()
+        self.blocked_until = 0.0
+        self.task: Optional[asyncio.Task] = None
+
+
+class SendQueue:
+    """
+    Class for sending messages within Telegram flood limits: about 30 messages per second to all chats
+    and about 1 message per second to one chat. Messages that wait for the same chat are joined when possible
+    """
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, chat_burst: float = 3, max_retries: int = 3,
+                 max_wait: float = 30, coalesce: bool = True, timer: Callable[[], float] = time.monotonic):
+        """
+        Create the queue
+        :param global_rate: messages per second to all chats
+        :param chat_rate: messages per second to one chat
+        :param chat_burst: number of messages to one chat that are sent at once before pacing starts
+        :param max_retries: number of retries after RetryAfter errors
+        :param max_wait: maximum number of seconds to wait after RetryAfter, the error is raised instead
+        :param coalesce: join text messages that wait for the same chat
+        :param timer: function that returns current time in seconds
+        """
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.coalesce = coalesce
+        self.timer = timer
+        self.global_bucket = TokenBucket(global_rate, global_rate, timer())
+        self.chats: Dict[Any, ChatQueue] = {}
+        self.sent = 0
+        self.coalesced = 0
+        self.throttled = 0
+        self.retries = 0
+
+    async def put(self, chat_id: Any, method: str, data: dict, files: Optional[dict],
+                  send: Callable[[str, dict, Optional[dict]], Awaitable]) -> Any:
+        """
+        Method for queueing the request and waiting for its result
+        :param chat_id: id of the chat
+        :param method: Telegram API method
+        :param data: parameters of the method
+        :param files: files of the method
+        :param send: coroutine function that makes the request
+        :return: result of the request, joined messages get the same result
+        """
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            chat = self.chats[chat_id] = ChatQueue(TokenBucket(self.chat_rate, self.chat_burst, self.timer()))
+        request = OutgoingRequest(method, data, files)
+        if chat.pending and self.coalesce and chat.pending[-1].can_join(request):
+            chat.pending[-1].join(request)
+            self.coalesced += 1
+        else:
+            chat.pending.append(request)
+        if chat.task is None:
+            chat.task = asyncio.ensure_future(self.drain(chat_id, chat, send))
+        return await request.futures[-1]
+
+    async def wait(self, bucket: TokenBucket, blocked_until: float = 0) -> bool:
+        """
+        Method for waiting until the bucket has a token and flood control is over
+        :param bucket: bucket of the chat or the global one
+        :param blocked_until: time when Telegram allows requests again
+        :return: whether the request had to wait
+        """
+        waited = False
+        while True:
+            now = self.timer()
+            delay = max(bucket.get_delay(now), blocked_until - now)
+            if delay <= 0:
+                bucket.take()
+                return waited
+            waited = True
+            await asyncio.sleep(delay)
+
+    async def drain(self, chat_id: Any, chat: ChatQueue, send: Callable[[str, dict, Optional[dict]], Awaitable]) -> None:
+        """
+        Method for sending requests of the chat one by one, it stops when the chat has nothing to send
+        :param chat_id: id of the chat
+        :param chat: queue of the chat
+        :param send: coroutine function that makes the request
+        :return: nothing to return
+        """
+        try:
+            while chat.pending:
+                waited = await self.wait(chat.bucket, chat.blocked_until)
+                waited = await self.wait(self.global_bucket) or waited
+                if waited:
+                    self.throttled += 1
+                # The request leaves the queue while it is sent, so the next messages aren't joined to it
+                request = chat.pending.popleft()
+                try:
+                    result = await send(request.method, request.data, request.files)
+                except RetryAfter as e:
+                    self.retries += 1
+                    request.retries += 1
+                    if request.retries > self.max_retries or e.timeout > self.max_wait:
+                        self.finish(request, error=e)
+                    else:
+                        logging.warning('Flood control for chat %s, retry in %s seconds', chat_id, e.timeout)
+                        chat.blocked_until = self.timer() + e.timeout
+                        chat.pending.appendleft(request)
+                    continue
+                except Exception as e:
+                    self.finish(request, error=e)
+                    continue
+                self.sent += 1
+                self.finish(request, result)
+        finally:
+            chat.task = None
+            # The bucket is forgotten when it is full again, a new one is the same then
+            asyncio.get_event_loop().call_later(max(chat.blocked_until - self.timer(), 0) + self.chat_burst / self.chat_rate,
+                                                self.forget, chat_id, chat)
+
+    def forget(self, chat_id: Any, chat: ChatQueue) -> None:
+        if chat.task is None and not chat.pending and self.chats.get(chat_id) is chat:
+            del self.chats[chat_id]
+
+    @staticmethod
+    def finish(request: OutgoingRequest, result: Any = None, error: Exception = None) -> None:
+        for future in request.futures:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        """
+        Method for getting counters of the queue
+        :return: dictionary with sent, joined and delayed messages, retries and chats with queued messages
+        """
+        return {'sent': self.sent, 'coalesced': self.coalesced, 'throttled': self.throttled, 'retries': self.retries,
+                'chats': len(self.chats)}
+
+
+class QueuedBot(Bot):
+    """
+    Bot that sends everything addressed to chats through SendQueue, so handlers don't need to care about flood limits
+    """
+
+    def __init__(self, token: str, send_queue: SendQueue, **kwargs):
+        super().__init__(token, **kwargs)
+        self.send_queue = send_queue
+
+    async def request(self, method: str, data: Optional[Dict] = None, files: Optional[Dict] = None, **kwargs) -> Any:
+        chat_id = (data or {}).get('chat_id')
+        if chat_id is None or not method.startswith(CHAT_METHODS) or method == 'sendChatAction':
+            return await super().request(method, data, files, **kwargs)
+
+        async def send(queued_method: str, queued_data: dict, queued_files: Optional[dict]) -> Any:
+            return await super(QueuedBot, self).request(queued_method, queued_data, queued_files, **kwargs)
+
+        return await self.send_queue.put(chat_id, method, data, files, send)
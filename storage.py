@@ -0,0 +1,139 @@
+import asyncio
+import json
+from concurrent.futures import Executor
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Optional, Union
+
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.dispatcher.storage import BaseStorage
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+Address = Union[str, int, None]
+
+
+class MongoStorage(BaseStorage):
+    """
+    Class for storing states of conversations in MongoDB, so they are shared between workers and survive restarts.
+    State, data and bucket of one user in one chat are kept in one document, so every call is one round trip
+    """
+
+    def __init__(self, get_collection: Callable[[], Collection], ttl: int = 0, executor: Executor = None):
+        """
+        Create the storage, the collection is opened with the first call
+        :param get_collection: function that returns collection for documents of states
+        :param ttl: number of seconds after the last change when abandoned conversation is deleted, 0 - never
+        :param executor: executor for blocking database calls, the default executor of the loop if None
+        """
+        self.get_collection = get_collection
+        self.ttl = ttl
+        self.executor = executor
+        self.collection: Optional[Collection] = None
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Method for calling the collection, it opens the collection and creates TTL index on the first call
+        :param method: name of the method of the collection
+        :param args: positional arguments of the method
+        :param kwargs: keyword arguments of the method
+        :return: result of the method
+        """
+        if self.collection is None:
+            collection = self.get_collection()
+            if self.ttl:
+                collection.create_index([('updated_at', ASCENDING)], name='updated_at_ttl',
+                                        expireAfterSeconds=self.ttl)
+            self.collection = collection
+        return getattr(self.collection, method)(*args, **kwargs)
+
+    async def run(self, method: str, *args, **kwargs):
+        """
+        Method for calling the collection without blocking the event loop
+        :param method: name of the method of the collection
+        :param args: positional arguments of the method
+        :param kwargs: keyword arguments of the method
+        :return: result of the method
+        """
+        return await asyncio.get_event_loop().run_in_executor(self.executor,
+                                                              partial(self.call, method, *args, **kwargs))
+
+    def get_key(self, chat: Address, user: Address) -> str:
+        chat, user = self.check_address(chat=chat, user=user)
+        return f'{chat}:{user}'
+
+    async def get_field(self, chat: Address, user: Address, field: str, default):
+        document = await self.run('find_one', {'_id': self.get_key(chat, user)}, {field: True})
+        if document is None or document.get(field) is None:
+            return default
+        return document[field]
+
+    async def set_fields(self, chat: Address, user: Address, fields: dict) -> None:
+        fields['updated_at'] = datetime.utcnow()
+        await self.run('update_one', {'_id': self.get_key(chat, user)}, {'$set': fields}, upsert=True)
+
+    async def close(self) -> None:
+        """
+        Connections belong to the shared pool, they are closed by Client.close_all
+        """
+
+    async def wait_closed(self) -> None:
+        pass
+
+    async def get_state(self, *, chat: Address = None, user: Address = None,
+                        default: Optional[str] = None) -> Optional[str]:
+        return await self.get_field(chat, user, 'state', self.resolve_state(default))
+
+    async def get_data(self, *, chat: Address = None, user: Address = None, default: Optional[dict] = None) -> Dict:
+        return await self.get_field(chat, user, 'data', default or {})
+
+    async def set_state(self, *, chat: Address = None, user: Address = None, state: Optional[str] = None) -> None:
+        await self.set_fields(chat, user, {'state': self.resolve_state(state)})
+
+    async def set_data(self, *, chat: Address = None, user: Address = None, data: Dict = None) -> None:
+        await self.set_fields(chat, user, {'data': data or {}})
+
+    async def update_data(self, *, chat: Address = None, user: Address = None, data: Dict = None, **kwargs) -> None:
+        """
+        Method for updating the keys of data in place, without reading the document first
+        """
+        data = dict(data or {}, **kwargs)
+        if data:
+            await self.set_fields(chat, user, {f'data.{key}': value for key, value in data.items()})
+
+    async def reset_state(self, *, chat: Address = None, user: Address = None,
+                          with_data: Optional[bool] = True) -> None:
+        fields = {'state': None}
+        if with_data:
+            fields['data'] = {}
+        await self.set_fields(chat, user, fields)
+
+    def has_bucket(self) -> bool:
+        return True
+
+    async def get_bucket(self, *, chat: Address = None, user: Address = None,
+                         default: Optional[dict] = None) -> Dict:
+        return await self.get_field(chat, user, 'bucket', default or {})
+
+    async def set_bucket(self, *, chat: Address = None, user: Address = None, bucket: Dict = None) -> None:
+        await self.set_fields(chat, user, {'bucket': bucket or {}})
+
+    async def update_bucket(self, *, chat: Address = None, user: Address = None,
+                            bucket: Dict = None, **kwargs) -> None:
+        bucket = dict(bucket or {}, **kwargs)
+        if bucket:
+            await self.set_fields(chat, user, {f'bucket.{key}': value for key, value in bucket.items()})
+
+
+class LocalStorage(MemoryStorage):
+    """
+    Class for storing states in process memory like a remote storage does: data goes through JSON,
+    so anything that couldn't be stored in MongoDB or Redis fails here as well
+    """
+
+    async def set_data(self, *, chat: Address = None, user: Address = None, data: Dict = None) -> None:
+        await super().set_data(chat=chat, user=user, data=json.loads(json.dumps(data or {})))
+
+    async def update_data(self, *, chat: Address = None, user: Address = None, data: Dict = None, **kwargs) -> None:
+        data = json.loads(json.dumps(dict(data or {}, **kwargs)))
+        await super().update_data(chat=chat, user=user, data=data)
@@ -1,10 +1,16 @@
+import asyncio
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
 
-from github.PaginatedList import PaginatedList
-from github.Repository import Repository
+from github.GithubException import GithubException
 
-from api import Api
+from api import Api, ApiRegistry, AsyncApi, IssueRecord, RepoRecord
 from config import GITHUB_TOKEN
+from fake_github import FakeGitHub
+from render import render_repos
+from test_cache import FakeTimer
 
 
 class TestApi(TestCase):
@@ -16,26 +22,297 @@ class TestApi(TestCase):
         self.assertIsNotNone(output)
         self.assertIsInstance(output, tuple)
 
-    def test_get_repos(self):
-        output = self.api.get_repos()
-        self.assertIsNotNone(output)
-        self.assertIsInstance(output, PaginatedList)
-
     def test_get_repo(self):
         repo_name = 'portfolio'
         non_exist_repo_name = 'portfolio1'
         output = self.api.get_repo(repo_name)
         self.assertIsNotNone(output)
-        self.assertIsInstance(output, Repository)
+        self.assertIsInstance(output, RepoRecord)
         output = self.api.get_repo(non_exist_repo_name)
         self.assertIsNone(output)
 
-    def test_get_issues_or_prs(self):
-        output = self.api.get_issues_or_prs(True)
-        self.assertIsNotNone(output)
+    def test_get_issues_or_prs_page(self):
+        output, _ = self.api.get_issues_or_prs_page(True)
         self.assertIsInstance(output, list)
         self.assertTrue(all(not item.pull_request for item in output))
-        output = self.api.get_issues_or_prs(False)
-        self.assertIsNotNone(output)
+        output, _ = self.api.get_issues_or_prs_page(False)
         self.assertIsInstance(output, list)
         self.assertTrue(all(item.pull_request for item in output))
+
+
+class TestAsyncApi(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub(delay=0.2).start()
+        self.github.add_repo('portfolio')
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        self.api = AsyncApi(Api('token', base_url=self.github.base_url), self.executor, timeout=5)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+        self.github.stop()
+
+    def test_concurrent_calls(self):
+        async def get_repos():
+            return await asyncio.gather(*(self.api.get_repo('portfolio') for _ in range(8)))
+
+        start = time.perf_counter()
+        repos = asyncio.run(get_repos())
+        elapsed = time.perf_counter() - start
+        self.assertTrue(all(repo.name == 'portfolio' for repo in repos))
+        self.assertLess(elapsed, 8 * 0.2)
+
+    def test_timeout(self):
+        self.api.timeout = 0.05
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(self.api.get_repo('portfolio'))
+
+
+class TestApiRequestBudget(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub().start()
+        self.api = Api('token', base_url=self.github.base_url)
+
+    def tearDown(self) -> None:
+        self.github.stop()
+
+    def test_repos_listing(self):
+        for index in range(250):
+            self.github.add_repo(f'repo{index}', archived=index % 10 == 0)
+            self.github.add_issue(f'repo{index}', 'Bug')
+        # /repos renders the listing as it is, counts of issues and pull requests are already in it
+        text, inline_keyboard = render_repos(self.api.get_all_repos())
+        self.assertEqual(text.count('Total issues and prs: _1_'), 225)
+        self.assertEqual(len(inline_keyboard.inline_keyboard[-1]), 5)
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_get_all_repos(self):
+        for index in range(150):
+            self.github.add_repo(f'repo{index}', archived=index % 10 == 0)
+        repos = self.api.get_all_repos()
+        self.assertEqual(len(repos), 150)
+        self.assertEqual(sum(repo['archived'] for repo in repos), 15)
+        self.assertEqual(self.github.count_requests(), 2)
+
+    def test_get_repo_details(self):
+        self.github.add_repo('portfolio', stargazers_count=5)
+        for index in range(150):
+            self.github.add_issue('portfolio', f'Issue {index}', pull_request=index % 3 == 0)
+        repo, items = self.api.get_repo_details('portfolio')
+        self.assertEqual(self.github.count_requests(), 1)
+        self.assertEqual(repo.open_issues_count, 150)
+        self.assertEqual(repo.stargazers_count, 5)
+        self.assertEqual(len(items), 20)
+        self.assertEqual(items[0].number, 150)
+        self.assertIsNone(self.api.get_repo_details('portfolio1'))
+
+    def test_has_branch(self):
+        self.github.add_repo('portfolio')
+        self.github.add_branch('portfolio', 'feature/pages')
+        self.assertTrue(self.api.has_branch('octocat/portfolio', 'main'))
+        self.assertTrue(self.api.has_branch('octocat/portfolio', 'feature/pages'))
+        self.assertFalse(self.api.has_branch('octocat/portfolio', 'develop'))
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_get_notifications(self):
+        self.github.add_repo('portfolio')
+        self.github.add_notification('portfolio', 'Bug')
+        self.github.poll_interval = '120'
+        notifications = self.api.get_notifications()
+        self.assertEqual([item['subject']['title'] for item in notifications.items], ['Bug'])
+        self.assertEqual(notifications.poll_interval, 120)
+        unchanged = self.api.get_notifications(notifications.last_modified)
+        self.assertEqual(unchanged.items, [])
+        self.assertEqual(unchanged.last_modified, notifications.last_modified)
+        self.github.add_notification('portfolio', 'Fix', subject_type='PullRequest')
+        changed = self.api.get_notifications(notifications.last_modified)
+        self.assertEqual([item['subject']['title'] for item in changed.items], ['Fix', 'Bug'])
+        self.assertNotEqual(changed.last_modified, notifications.last_modified)
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_create_hook(self):
+        self.github.add_repo('portfolio')
+        events = ('issues', 'pull_request')
+        self.assertTrue(self.api.create_hook('octocat/portfolio', 'https://bot/github', 'secret', events))
+        self.assertTrue(self.api.create_hook('octocat/portfolio', 'https://bot/github', 'secret', events))
+        self.assertFalse(self.api.create_hook('octocat/portfolio1', 'https://bot/github', 'secret', events))
+        self.assertEqual(len(self.github.hooks['octocat/portfolio']), 1)
+        self.assertEqual(self.github.hooks['octocat/portfolio'][0]['events'], ['issues', 'pull_request'])
+
+    def test_get_repo_details_rest(self):
+        self.github.add_repo('portfolio')
+        self.github.add_issue('portfolio', 'Bug')
+        self.github.add_issue('portfolio', 'Fix', pull_request=True)
+        self.api.use_graphql = False
+        repo, items = self.api.get_repo_details('portfolio')
+        self.assertEqual(repo.open_issues_count, 2)
+        self.assertEqual([item.pull_request for item in items], [False, True])
+        self.assertIsNone(self.api.get_repo_details('portfolio1'))
+
+    def test_records(self):
+        self.github.add_repo('portfolio')
+        self.github.add_issue('portfolio', 'Bug')
+        repo = self.api.get_repo('portfolio')
+        self.assertFalse(hasattr(repo, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(repo)), repo)
+        items, _ = self.api.get_issues_or_prs_page(True)
+        self.assertIsInstance(items[0], IssueRecord)
+
+    def test_create_issue(self):
+        self.github.add_repo('portfolio')
+        data = {'RepoName': 'portfolio', 'FullName': 'octocat/portfolio', 'Title': 'Bug', 'Body': 'Steps',
+                'Assignee': 'hubot'}
+        issue = self.api.create_issue(data)
+        self.assertEqual((issue.number, issue.title, issue.repository), (1, 'Bug', 'octocat/portfolio'))
+        self.assertEqual(self.github.count_requests(), 1)
+        self.assertEqual(self.github.issues['octocat/portfolio'][0]['assignees'][0]['login'], 'hubot')
+        self.assertIsNone(self.api.create_issue(dict(data, FullName='octocat/portfolio1')))
+
+    def test_get_branches_and_assignees(self):
+        self.github.add_repo('portfolio')
+        for index in range(150):
+            self.github.add_branch('portfolio', f'feature/{index}')
+        self.github.add_assignee('portfolio', 'hubot')
+        branches, complete = self.api.get_branches('octocat/portfolio')
+        self.assertEqual((len(branches), branches[0], complete), (151, 'main', True))
+        branches, complete = self.api.get_branches('octocat/portfolio', max_pages=1)
+        self.assertEqual((len(branches), complete), (100, False))
+        self.assertEqual(self.api.get_assignees('octocat/portfolio'), (['octocat', 'hubot'], True))
+        self.assertTrue(self.api.can_assign('octocat/portfolio', 'hubot'))
+        self.assertFalse(self.api.can_assign('octocat/portfolio', 'nobody'))
+
+    def test_create_pr(self):
+        self.github.add_repo('portfolio')
+        self.github.add_branch('portfolio', 'feature')
+        self.github.add_assignee('portfolio', 'hubot')
+        data = {'RepoName': 'portfolio', 'FullName': 'octocat/portfolio', 'Title': 'Pages', 'Body': '', 'Base': 'main',
+                'Head': 'feature', 'Draft': True, 'Assignee': ''}
+        pr = self.api.create_pr(data)
+        self.assertEqual((pr.number, pr.title, pr.repository), (1, 'Pages', 'octocat/portfolio'))
+        self.assertIsNotNone(pr.pull_request)
+        self.assertEqual(self.github.count_requests(), 1)
+        pr = self.api.create_pr(dict(data, Assignee='hubot'))
+        self.assertEqual(self.github.count_requests(), 3)
+        self.assertEqual(self.github.issues['octocat/portfolio'][1]['assignees'][0]['login'], 'hubot')
+        self.assertIsNone(self.api.create_pr(dict(data, Head='develop')))
+
+    def test_close_issues_or_prs(self):
+        self.github.add_repo('portfolio')
+        self.github.add_issue('portfolio', 'Bug')
+        self.assertTrue(self.api.close_issues_or_prs('octocat/portfolio/issues/1'))
+        self.assertEqual(self.github.count_requests(), 1)
+        self.assertEqual(self.github.issues['octocat/portfolio'][0]['state'], 'closed')
+        self.assertFalse(self.api.close_issues_or_prs('octocat/portfolio/issues/2'))
+        self.assertFalse(self.api.close_issues_or_prs('octocat/portfolio'))
+        self.assertEqual(self.github.count_requests(), 2)
+
+    def test_merge_prs(self):
+        self.github.add_repo('portfolio')
+        self.github.add_issue('portfolio', 'Fix', pull_request=True)
+        self.assertTrue(self.api.merge_prs('octocat/portfolio/issues/1'))
+        self.assertEqual(self.github.count_requests(), 1)
+        self.assertFalse(self.api.merge_prs('octocat/portfolio/issues/1'))
+        self.assertEqual(self.github.count_requests(), 2)
+
+    def test_get_issues_or_prs_page(self):
+        self.github.add_repo('portfolio')
+        for index in range(500):
+            self.github.add_issue('portfolio', f'Issue {index}', pull_request=index % 2 == 1)
+        items, has_next = self.api.get_issues_or_prs_page(True, 2, 10)
+        self.assertEqual(self.github.count_requests(path='/search/issues'), 1)
+        self.assertEqual([item.number for item in items], list(range(479, 459, -2)))
+        self.assertTrue(has_next)
+        self.assertTrue(all(item.pull_request is None for item in items))
+        items, has_next = self.api.get_issues_or_prs_page(False, 25, 10)
+        self.assertEqual(len(items), 10)
+        self.assertFalse(has_next)
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_get_issues_or_prs_page_filters(self):
+        self.github.add_repo('portfolio')
+        self.github.add_repo('blog')
+        self.github.add_issue('portfolio', 'Bug', labels=[{'name': 'bug'}])
+        self.github.add_issue('portfolio', 'Question')
+        self.github.add_issue('blog', 'Bug', labels=[{'name': 'bug'}])
+        self.github.issues['octocat/blog'][0]['state'] = 'closed'
+        items, _ = self.api.get_issues_or_prs_page(True, filters={'label': 'bug'})
+        self.assertEqual([item.title for item in items], ['Bug'])
+        items, _ = self.api.get_issues_or_prs_page(True, filters={'repo': 'blog', 'state': 'all'})
+        self.assertEqual([item.html_url.split('/')[-3] for item in items], ['blog'])
+        query = self.api.get_search_query(False, {'repo': 'owner/name', 'author': 'mezgoodle', 'state': 'closed'})
+        self.assertEqual(query, 'is:pr is:closed repo:owner/name author:mezgoodle')
+
+    def test_connection_error(self):
+        api = Api('token', base_url='http://127.0.0.1:1')
+        with self.assertRaises(GithubException) as context:
+            api.get_branches('octocat/portfolio')
+        self.assertEqual(context.exception.status, 0)
+
+    def test_search_scope(self):
+        self.github.add_repo('portfolio')
+        self.github.add_issue('portfolio', 'Bug')
+        # Issues of a repository that the user only collaborates on
+        self.github.issues['acme/site'] = [dict(self.github.issues['octocat/portfolio'][0], title='Typo')]
+        self.assertEqual(self.api.get_search_query(True, {}), 'is:issue is:open user:octocat')
+        items, _ = self.api.get_issues_or_prs_page(True)
+        self.assertEqual([item.title for item in items], ['Bug'])
+        items, _ = self.api.get_issues_or_prs_page(True, filters={'owner': 'acme'})
+        self.assertEqual([item.title for item in items], ['Typo'])
+
+
+class TestApiRegistry(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub().start()
+        self.registry = ApiRegistry(lambda token: Api(token, base_url=self.github.base_url), maxsize=2)
+
+    def tearDown(self) -> None:
+        self.registry.close()
+        self.github.stop()
+
+    def test_reuse(self):
+        api = self.registry.get('token')
+        self.assertIs(self.registry.get('token'), api)
+        self.assertIsNot(self.registry.get('other_token'), api)
+
+    def test_login_is_requested_once(self):
+        self.github.add_repo('portfolio')
+        self.registry.get('token').get_repo('portfolio')
+        self.registry.get('token').get_repo('portfolio')
+        self.assertEqual(self.github.count_requests(path='/user'), 1)
+
+    def test_eviction_closes_api(self):
+        api = self.registry.get('first')
+        closed = []
+        api.close = lambda: closed.append(True)
+        self.registry.get('second')
+        self.registry.get('third')
+        self.assertEqual(closed, [True])
+        self.assertIsNot(self.registry.get('first'), api)
+
+    def test_idle_api_is_closed(self):
+        timer = FakeTimer()
+        registry = ApiRegistry(lambda token: Api(token, base_url=self.github.base_url), idle_ttl=10, timer=timer)
+        idle = registry.get('idle')
+        closed = []
+        idle.close = lambda: closed.append('idle')
+        timer.now = 5
+        active = registry.get('active')
+        timer.now = 10
+        # Nobody asks for the idle client again, only the sweep closes it
+        self.assertEqual(registry.expire(), 1)
+        self.assertEqual(closed, ['idle'])
+        self.assertIs(registry.get('active'), active)
+        registry.close()
+
+    def test_periodic_sweep(self):
+        registry = ApiRegistry(lambda token: Api(token, base_url=self.github.base_url), idle_ttl=0.05)
+        closed = []
+        registry.get('idle').close = lambda: closed.append('idle')
+
+        async def sweep():
+            registry.start(0.02)
+            await asyncio.sleep(0.15)
+            await registry.stop()
+
+        asyncio.run(sweep())
+        self.assertEqual(closed, ['idle'])
+        self.assertEqual(len(registry.clients), 0)
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from api import Api, AsyncApi
+from batch import BatchResult, run_batch
+from fake_github import FakeGitHub
+
+
+class TestRunBatch(TestCase):
+    def test_bounded_concurrency(self):
+        running = []
+        peak = []
+
+        async def action(target: str) -> bool:
+            running.append(target)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(target)
+            if target == 'error':
+                raise ValueError(target)
+            return target != 'fail'
+
+        results = asyncio.run(run_batch(['a', 'fail', 'b', 'error', 'c', 'd', 'e'], action, concurrency=3))
+        self.assertEqual(max(peak), 3)
+        self.assertEqual(results[:4], [BatchResult('a', True), BatchResult('fail', False),
+                                       BatchResult('b', True), BatchResult('error', False, 'ValueError')])
+        self.assertEqual(sum(result.ok for result in results), 5)
+
+    def test_close_selected(self):
+        with FakeGitHub(delay=0.05) as github:
+            github.add_repo('portfolio')
+            for index in range(30):
+                github.add_issue('portfolio', f'Bug {index}')
+            executor = ThreadPoolExecutor(max_workers=8)
+            api = AsyncApi(Api('token', base_url=github.base_url), executor, timeout=5)
+            targets = [f'octocat/portfolio/issues/{number}' for number in range(1, 31)] + ['octocat/portfolio/issues/99']
+            start = time.perf_counter()
+            results = asyncio.run(run_batch(targets, api.close_issues_or_prs, concurrency=4))
+            elapsed = time.perf_counter() - start
+            executor.shutdown()
+            # One targeted request per item, four of them at once
+            self.assertEqual(github.count_requests(method='PATCH'), 31)
+            self.assertEqual([result.ok for result in results], [True] * 30 + [False])
+            self.assertEqual(github.repos['octocat/portfolio']['open_issues_count'], 0)
+            self.assertLess(elapsed, 31 * 0.05 / 2)
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache(TestCase):
+    def setUp(self) -> None:
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get(1))
+        self.cache.set(1, 'token')
+        self.assertEqual(self.cache.get(1), 'token')
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1})
+
+    def test_expiration(self):
+        self.cache.set(1, 'token')
+        self.timer.now = 10
+        self.assertIsNone(self.cache.get(1))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction(self):
+        self.cache.set(1, 'first')
+        self.cache.set(2, 'second')
+        self.cache.get(1)
+        self.cache.set(3, 'third')
+        self.assertIsNone(self.cache.get(2))
+        self.assertEqual(self.cache.get(1), 'first')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_pop(self):
+        self.cache.set(1, 'token')
+        self.assertEqual(self.cache.pop(1), 'token')
+        self.assertIsNone(self.cache.get(1))
+        self.assertIsNone(self.cache.pop(1))
+
+    def test_sliding_expiration(self):
+        cache = TTLCache(maxsize=2, ttl=10, timer=self.timer, sliding=True)
+        cache.set(1, 'token')
+        self.timer.now = 8
+        self.assertEqual(cache.get(1), 'token')
+        self.timer.now = 16
+        self.assertEqual(cache.get(1), 'token')
+        self.timer.now = 26
+        self.assertIsNone(cache.get(1))
+
+    def test_on_evict(self):
+        evicted = []
+        cache = TTLCache(maxsize=1, ttl=10, timer=self.timer, on_evict=lambda key, value: evicted.append(key))
+        cache.set(1, 'first')
+        cache.set(2, 'second')
+        self.timer.now = 10
+        cache.get(2)
+        self.assertEqual(evicted, [1, 2])
+
+    def test_expire(self):
+        evicted = []
+        cache = TTLCache(maxsize=3, ttl=10, timer=self.timer, on_evict=lambda key, value: evicted.append(key))
+        cache.set(1, 'first')
+        self.timer.now = 5
+        cache.set(2, 'second')
+        self.timer.now = 10
+        self.assertEqual(cache.expire(), 1)
+        self.assertEqual(evicted, [1])
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get(2), 'second')
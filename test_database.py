@@ -1,9 +1,13 @@
+import asyncio
 import sys
+import time
 
-from unittest import TestCase
+from unittest import TestCase, skipUnless
 
-from database import Client
-from config import DB_PASSWORD
+from pymongo.errors import PyMongoError
+
+from database import AsyncClient, Client
+from config import DB_PASSWORD, MONGO_URI
 
 
 class Parent:
@@ -41,3 +45,80 @@ class TestClient3(TestCase, Parent):
         self.assertTrue(result.acknowledged)
         data = self.client.get(self.data_with_id)
         self.assertIsNone(data)
+
+
+class TestClient4(TestCase, Parent):
+    def test_shared_cluster(self):
+        other_client = Client(DB_PASSWORD, 'githubhelper', 'tokens')
+        self.assertIs(other_client.collection.database.client, self.client.collection.database.client)
+
+    def test_ping(self):
+        self.assertTrue(self.client.ping())
+
+
+class TestAsyncClient(TestCase, Parent):
+    def test_get(self):
+        async def get_all():
+            client = AsyncClient(DB_PASSWORD, 'githubhelper', 'tokens')
+            return await asyncio.gather(*(client.get({'test_id': 'test_id'}) for _ in range(10)))
+        results = asyncio.run(get_all())
+        self.assertEqual(results, [self.client.get({'test_id': 'test_id'})] * 10)
+
+    def test_unavailable_database(self):
+        client = AsyncClient('', 'githubhelper', 'tokens', 'mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=100')
+        with self.assertLogs(level='ERROR'):
+            with self.assertRaises(PyMongoError):
+                asyncio.run(client.get({'test_id': 'test_id'}))
+            self.assertFalse(asyncio.run(client.ping()))
+
+
+@skipUnless(MONGO_URI, 'needs a local mongod in MONGO_URI')
+class TestTokensIndex(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.client = Client('', 'githubhelper_test', 'tokens', MONGO_URI)
+        cls.client.collection.drop()
+        cls.client.ensure_index('telegram_id')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.client.collection.drop()
+
+    def fill(self, count: int) -> None:
+        start = self.client.collection.estimated_document_count()
+        for offset in range(start, count, 10000):
+            self.client.collection.insert_many([{'telegram_id': telegram_id, 'token': b'token'}
+                                                for telegram_id in range(offset, min(offset + 10000, count))])
+
+    def explain(self, telegram_id: int) -> dict:
+        result = self.client.collection.database.command(
+            'explain', {'find': 'tokens', 'filter': {'telegram_id': telegram_id}, 'projection': {'token': True}},
+            verbosity='executionStats')
+        return result['executionStats']
+
+    def measure(self, count: int) -> float:
+        start = time.perf_counter()
+        for telegram_id in range(0, count, count // 1000):
+            self.client.get({'telegram_id': telegram_id}, {'token': True, '_id': False})
+        return (time.perf_counter() - start) / 1000
+
+    def test_lookup_cost_is_flat(self):
+        self.fill(1000)
+        small_stats = self.explain(999)
+        small_time = self.measure(1000)
+        self.fill(1000000)
+        large_stats = self.explain(999999)
+        large_time = self.measure(1000000)
+        for stats in (small_stats, large_stats):
+            self.assertEqual(stats['totalKeysExamined'], 1)
+            self.assertEqual(stats['totalDocsExamined'], 1)
+        self.assertLess(large_time, small_time * 5)
+
+    def test_upsert(self):
+        first = self.client.upsert({'telegram_id': -1}, {'token': b'first'})
+        second = self.client.upsert({'telegram_id': -1}, {'token': b'second'})
+        self.assertIsNotNone(first.upserted_id)
+        self.assertIsNone(second.upserted_id)
+        self.assertEqual(self.client.get({'telegram_id': -1}, {'token': True, '_id': False}), {'token': b'second'})
+        with self.assertLogs(level='ERROR'):
+            self.assertIsNone(self.client.insert({'telegram_id': -1, 'token': b'duplicate'}))
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from unittest import TestCase
+
+from aiohttp import ClientSession, web
+
+from github_webhook import GitHubWebhook, format_event, verify_signature
+
+SECRET = 'secret'
+
+
+def make_payload(event: str, action: str, sender: str = 'monalisa', **fields) -> dict:
+    payload = {
+        'action': action,
+        'sender': {'login': sender},
+        'repository': {'name': 'portfolio', 'full_name': 'octocat/portfolio', 'owner': {'login': 'octocat'},
+                       'default_branch': 'main', 'private': False, 'archived': False},
+    }
+    item = {'number': 1, 'title': 'Fix <pages>', 'html_url': 'https://github.com/octocat/portfolio/pull/1'}
+    payload['issue' if event == 'issues' else 'pull_request'] = item
+    payload.update(fields)
+    return payload
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class TestFormatEvent(TestCase):
+    def test_issue(self):
+        text = format_event('issues', make_payload('issues', 'opened'))
+        self.assertEqual(text, '<b>octocat/portfolio</b>: monalisa opened issue '
+                               '<a href="https://github.com/octocat/portfolio/pull/1">Fix &lt;pages&gt; #1</a>')
+
+    def test_merged_pull_request(self):
+        payload = make_payload('pull_request', 'closed')
+        payload['pull_request']['merged'] = True
+        self.assertIn('monalisa merged pull request', format_event('pull_request', payload))
+
+    def test_review(self):
+        payload = make_payload('pull_request_review', 'submitted', review={'state': 'CHANGES_REQUESTED'})
+        self.assertIn('monalisa requested changes in pull request', format_event('pull_request_review', payload))
+
+    def test_ignored_action(self):
+        self.assertIsNone(format_event('issues', make_payload('issues', 'labeled')))
+
+
+async def post_all(webhook: GitHubWebhook, deliveries: list) -> list:
+    """
+    Function for posting deliveries of (event, payload, delivery id, secret) to the webhook one by one
+    """
+    app = web.Application()
+    app.router.add_post('/github', webhook.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    statuses = []
+    async with ClientSession() as session:
+        for event, payload, delivery, secret in deliveries:
+            body = json.dumps(payload).encode()
+            headers = {'X-GitHub-Event': event, 'X-GitHub-Delivery': delivery,
+                       'X-Hub-Signature-256': sign(body, secret), 'Content-Type': 'application/json'}
+            async with session.post(f'http://{host}:{port}/github', data=body, headers=headers) as response:
+                statuses.append(response.status)
+    await webhook.close()
+    await runner.cleanup()
+    return statuses
+
+
+class TestGitHubWebhook(TestCase):
+    def test_verify_signature(self):
+        body = b'{"zen": "Keep it simple."}'
+        self.assertTrue(verify_signature(SECRET, body, sign(body)))
+        self.assertFalse(verify_signature(SECRET, body, sign(body, 'other')))
+        self.assertFalse(verify_signature(SECRET, body, ''))
+
+    def test_deliveries(self):
+        messages = []
+        invalidated = []
+        watchers = {'octocat/portfolio': [{'telegram_id': 1, 'login': 'octocat'},
+                                          {'telegram_id': 2, 'login': 'monalisa'},
+                                          {'telegram_id': 3, 'login': 'hubot'}]}
+
+        async def get_subscribers(full_name: str) -> list:
+            return watchers.get(full_name, [])
+
+        async def send(user_id: int, text: str) -> None:
+            messages.append(user_id)
+
+        async def deliver():
+            webhook = GitHubWebhook(SECRET, get_subscribers, send, lambda name, repo: invalidated.append(name))
+            statuses = await post_all(webhook, [('issues', make_payload('issues', 'opened'), '1', SECRET),
+                                                ('issues', make_payload('issues', 'opened'), '1', SECRET),
+                                                ('issues', make_payload('issues', 'opened'), '2', 'other'),
+                                                ('issues', make_payload('issues', 'labeled'), '3', SECRET),
+                                                ('push', {'ref': 'refs/heads/main'}, '4', SECRET)])
+            return statuses, webhook.stats()
+
+        statuses, stats = asyncio.run(deliver())
+        self.assertEqual(statuses, [202, 200, 401, 202, 204])
+        # The author of the event doesn't get the message about it
+        self.assertEqual(sorted(messages), [1, 3])
+        self.assertEqual(invalidated, ['octocat/portfolio', 'octocat/portfolio'])
+        self.assertEqual(stats, {'received': 2, 'rejected': 1, 'duplicates': 1, 'sent': 2, 'errors': 0})
+
+    def test_failed_delivery_is_not_a_duplicate(self):
+        messages = []
+
+        async def get_subscribers(full_name: str) -> list:
+            return [{'telegram_id': 1, 'login': 'octocat'}]
+
+        async def send(user_id: int, text: str) -> None:
+            messages.append(user_id)
+
+        def invalidate(full_name: str, repo: dict) -> None:
+            raise KeyError('name')
+
+        async def deliver():
+            webhook = GitHubWebhook(SECRET, get_subscribers, send, invalidate)
+            broken = make_payload('issues', 'opened')
+            del broken['sender']
+            statuses = await post_all(webhook, [('issues', broken, '1', SECRET),
+                                                ('issues', make_payload('issues', 'opened'), '1', SECRET)])
+            return statuses, webhook.stats()
+
+        statuses, stats = asyncio.run(deliver())
+        # The redelivery is handled, and the failed invalidation doesn't stop the message
+        self.assertEqual(statuses, [400, 202])
+        self.assertEqual(messages, [1])
+        self.assertEqual(stats, {'received': 1, 'rejected': 0, 'duplicates': 0, 'sent': 1, 'errors': 1})
@@ -1,6 +1,8 @@
 import os
 from unittest import TestCase
 
+from cryptography.fernet import Fernet, InvalidToken
+
 from hashing import Hasher
 from config import HASH_KEY
 
@@ -33,6 +35,16 @@ class TestHasher(TestCase):
         self.assertIsInstance(decrypted_message, str)
         self.assertEqual(decrypted_message, '')
 
+    def test_rotate_message(self):
+        new_key = Fernet.generate_key().decode()
+        old_message = self.hasher.encrypt_message(self.message)
+        rotating_hasher = Hasher(new_key, [HASH_KEY])
+        self.assertEqual(rotating_hasher.decrypt_message(old_message), self.message)
+        new_message = rotating_hasher.rotate_message(old_message)
+        self.assertEqual(Hasher(new_key).decrypt_message(new_message), self.message)
+        with self.assertRaises(InvalidToken):
+            self.hasher.decrypt_message(new_message)
+
     @classmethod
     def tearDownClass(cls) -> None:
         os.remove('secret.key')
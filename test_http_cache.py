@@ -0,0 +1,112 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from api import Api
+from fake_github import FakeGitHub
+from http_cache import CachedResponse, MemoryResponseCache, ResponseCache, SQLiteResponseCache, create_response_cache
+
+
+class CacheTests:
+    def make_cache(self, max_size: int):
+        raise NotImplementedError
+
+    def test_get_and_set(self):
+        cache = self.make_cache(100)
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', CachedResponse('"etag"', '', '', b'[]'))
+        self.assertEqual(cache.get('key'), CachedResponse('"etag"', '', '', b'[]'))
+        self.assertEqual(cache.size(), 2)
+
+    def test_eviction(self):
+        cache = self.make_cache(10)
+        cache.set('first', CachedResponse('"1"', '', '', b'12345'))
+        cache.set('second', CachedResponse('"2"', '', '', b'12345'))
+        cache.get('first')
+        cache.set('third', CachedResponse('"3"', '', '', b'12345'))
+        self.assertIsNone(cache.get('second'))
+        self.assertIsNotNone(cache.get('first'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.size(), 10)
+
+    def test_too_large_response(self):
+        cache = self.make_cache(4)
+        cache.set('key', CachedResponse('"etag"', '', '', b'12345'))
+        self.assertIsNone(cache.get('key'))
+
+
+class TestMemoryResponseCache(CacheTests, TestCase):
+    def make_cache(self, max_size: int):
+        return MemoryResponseCache(max_size)
+
+
+class TestSQLiteResponseCache(CacheTests, TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.caches = []
+
+    def tearDown(self) -> None:
+        for cache in self.caches:
+            cache.close()
+        self.directory.cleanup()
+
+    def make_cache(self, max_size: int):
+        cache = SQLiteResponseCache(os.path.join(self.directory.name, 'cache.sqlite3'), max_size)
+        self.caches.append(cache)
+        return cache
+
+    def test_persistence(self):
+        self.make_cache(100).set('key', CachedResponse('"etag"', '', '', b'[]'))
+        self.assertIsNotNone(self.make_cache(100).get('key'))
+
+
+class TestCreateResponseCache(TestCase):
+    def test_backends(self):
+        self.assertIsInstance(create_response_cache('memory', '', 100), MemoryResponseCache)
+        self.assertIsNone(create_response_cache('', '', 100))
+        with self.assertRaises(ValueError):
+            create_response_cache('redis', '', 100)
+
+    def test_incomplete_backend(self):
+        class NoSizeCache(ResponseCache):
+            def get(self, key: str) -> None:
+                return None
+
+            def set(self, key: str, response: CachedResponse) -> None:
+                pass
+
+        with self.assertRaises(TypeError):
+            NoSizeCache(100)
+
+
+class TestApiConditionalRequests(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub().start()
+        for index in range(150):
+            self.github.add_repo(f'repo{index}')
+        self.cache = MemoryResponseCache()
+        self.api = Api('token', base_url=self.github.base_url, cache=self.cache)
+
+    def tearDown(self) -> None:
+        self.github.stop()
+
+    def test_repeated_listing(self):
+        first = [repo['name'] for repo in self.api.get_all_repos()]
+        second = [repo['name'] for repo in self.api.get_all_repos()]
+        self.assertEqual(first, second)
+        self.assertEqual(self.github.count_requests(), 4)
+        self.assertEqual(self.github.not_modified, 2)
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    def test_changed_resource(self):
+        self.api.get_user_info()
+        self.github.login = 'mezgoodle'
+        _, text = self.api.get_user_info()
+        self.assertIn('mezgoodle', text)
+        self.assertEqual(self.github.not_modified, 0)
+
+    def test_cache_is_per_token(self):
+        self.api.get_user_info()
+        other_api = Api('other_token', base_url=self.github.base_url, cache=self.cache)
+        other_api.get_user_info()
+        self.assertEqual(self.github.not_modified, 0)
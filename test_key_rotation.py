@@ -0,0 +1,43 @@
+from unittest import TestCase, skipUnless
+
+from cryptography.fernet import Fernet
+
+from database import Client
+from hashing import Hasher
+from key_rotation import KeyRotation
+from config import MONGO_URI
+
+
+@skipUnless(MONGO_URI, 'needs a local mongod in MONGO_URI')
+class TestKeyRotation(TestCase):
+    def setUp(self) -> None:
+        self.old_key = Fernet.generate_key().decode()
+        self.new_key = Fernet.generate_key().decode()
+        self.tokens = Client('', 'githubhelper_test', 'tokens', MONGO_URI).collection
+        self.checkpoints = Client('', 'githubhelper_test', 'key_rotations', MONGO_URI).collection
+        self.tokens.drop()
+        self.checkpoints.drop()
+        old_hasher = Hasher(self.old_key)
+        self.tokens.insert_many([{'telegram_id': telegram_id, 'token': old_hasher.encrypt_message(f'token{telegram_id}')}
+                                 for telegram_id in range(2500)])
+        self.tokens.insert_one({'telegram_id': -1, 'token': b'broken'})
+
+    def tearDown(self) -> None:
+        self.tokens.drop()
+        self.checkpoints.drop()
+
+    def create_job(self) -> KeyRotation:
+        return KeyRotation(self.tokens, self.checkpoints, Hasher(self.new_key, [self.old_key]), batch_size=1000)
+
+    def test_rotation(self):
+        self.assertEqual(self.create_job().run(), {'rotated': 2500, 'skipped': 0, 'failed': 1})
+        new_hasher = Hasher(self.new_key)
+        for document in self.tokens.find({'telegram_id': {'$gte': 0}}):
+            self.assertEqual(new_hasher.decrypt_message(document['token']), f'token{document["telegram_id"]}')
+
+    def test_resume(self):
+        job = self.create_job()
+        first_batch = list(self.tokens.find({}, {'token': True}).sort('_id', 1).limit(1000))
+        job.finish_batch(first_batch)
+        # The job was stopped after the first batch, the next run continues after it
+        self.assertEqual(self.create_job().run(), {'rotated': 2500, 'skipped': 0, 'failed': 1})
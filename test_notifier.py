@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from api import Api, AsyncApi
+from fake_github import FakeGitHub
+from notifier import NotificationPoller
+
+
+class TestNotificationPoller(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub().start()
+        self.github.add_repo('portfolio')
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        self.api = AsyncApi(Api('token', base_url=self.github.base_url), self.executor, timeout=5)
+        self.messages = []
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+        self.github.stop()
+
+    async def get_api(self, user_id: int) -> AsyncApi:
+        return self.api if user_id != 0 else None
+
+    async def send(self, user_id: int, text: str) -> None:
+        self.messages.append((user_id, text))
+
+    def test_poll(self):
+        async def poll():
+            poller = NotificationPoller(self.get_api, self.send)
+            poller.subscribe(1)
+            subscription = poller.subscriptions[1]
+            self.github.add_notification('portfolio', 'Old bug')
+            await poller.poll(subscription)
+            self.github.add_notification('portfolio', 'Fix <b>', subject_type='PullRequest', number=2)
+            self.github.add_notification('portfolio', 'v1.0', subject_type='Release')
+            await poller.poll(subscription)
+            await poller.poll(subscription)
+            return poller.stats()
+
+        stats = asyncio.run(poll())
+        self.assertEqual(len(self.messages), 1)
+        user_id, text = self.messages[0]
+        self.assertEqual(user_id, 1)
+        self.assertIn('Fix &lt;b&gt;', text)
+        self.assertIn('https://github.com/octocat/portfolio/pull/2', text)
+        self.assertEqual(stats['polls'], 3)
+        self.assertEqual(stats['not_modified'], 1)
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_failed_send(self):
+        failures = [ConnectionError('Telegram is down')]
+
+        async def send(user_id: int, text: str) -> None:
+            if failures:
+                raise failures.pop()
+            self.messages.append((user_id, text))
+
+        async def poll():
+            poller = NotificationPoller(self.get_api, send)
+            poller.subscribe(1)
+            subscription = poller.subscriptions[1]
+            await poller.poll(subscription)
+            last_modified = subscription.last_modified
+            self.github.add_notification('portfolio', 'Bug', number=1)
+            self.github.add_notification('portfolio', 'Fix', subject_type='PullRequest', number=2)
+            with self.assertRaises(ConnectionError):
+                await poller.poll(subscription)
+            self.assertEqual(subscription.last_modified, last_modified)
+            # The next poll delivers the whole batch again
+            await poller.poll(subscription)
+            await poller.poll(subscription)
+            return poller.stats()
+
+        stats = asyncio.run(poll())
+        self.assertEqual([text[text.index('">') + 2:text.index('</a>')] for _, text in self.messages], ['Bug', 'Fix'])
+        self.assertEqual(stats['sent'], 2)
+        self.assertEqual(stats['not_modified'], 1)
+
+    def test_unsubscribe_without_token(self):
+        async def poll():
+            poller = NotificationPoller(self.get_api, self.send)
+            poller.subscribe(0)
+            await poller.poll(poller.subscriptions[0])
+            return poller
+
+        poller = asyncio.run(poll())
+        self.assertEqual(poller.subscriptions, {})
+        self.assertEqual(self.github.count_requests(), 0)
+
+    def test_concurrency(self):
+        self.github.delay = 0.05
+        active = 0
+        most_active = 0
+
+        async def get_api(user_id: int) -> AsyncApi:
+            nonlocal active, most_active
+            active += 1
+            most_active = max(most_active, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return self.api
+
+        async def run():
+            poller = NotificationPoller(get_api, self.send, concurrency=3, interval=0.2)
+            poller.subscribe_all(range(1, 21))
+            poller.start()
+            await asyncio.sleep(1)
+            await poller.stop()
+            return poller.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats['subscribers'], 20)
+        self.assertGreaterEqual(stats['polls'], 20)
+        self.assertEqual(stats['errors'], 0)
+        self.assertLessEqual(most_active, 3)
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from api import Api, AsyncApi
+from fake_github import FakeGitHub
+from pr_prefetch import PullRequestPrefetch
+
+
+class TestPullRequestPrefetch(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub(delay=0.1).start()
+        self.github.add_repo('portfolio')
+        for index in range(150):
+            self.github.add_branch('portfolio', f'feature/{index}')
+        self.github.add_assignee('portfolio', 'Hubot')
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.api = AsyncApi(Api('token', base_url=self.github.base_url), self.executor, timeout=5)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+        self.github.stop()
+
+    def test_answers_are_checked_locally(self):
+        prefetch = PullRequestPrefetch()
+
+        async def create_pr():
+            prefetch.start(1, self.api, 'octocat/portfolio')
+            # The user types the title and the body meanwhile
+            await asyncio.sleep(0.5)
+            return [await prefetch.can_assign(1, self.api, 'octocat/portfolio', 'hubot'),
+                    await prefetch.can_assign(1, self.api, 'octocat/portfolio', 'nobody'),
+                    await prefetch.has_branch(1, self.api, 'octocat/portfolio', 'main'),
+                    await prefetch.has_branch(1, self.api, 'octocat/portfolio', 'feature/149'),
+                    await prefetch.has_branch(1, self.api, 'octocat/portfolio', 'feature/150')]
+
+        self.assertEqual(asyncio.run(create_pr()), [True, False, True, True, False])
+        # Two pages of branches and one page of assignees, typos cost nothing
+        self.assertEqual(self.github.count_requests(path='/repos/octocat/portfolio/branches'), 2)
+        self.assertEqual(self.github.count_requests(path='/repos/octocat/portfolio/assignees'), 1)
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_lists_are_loaded_concurrently(self):
+        prefetch = PullRequestPrefetch()
+
+        async def load():
+            return await prefetch.get(1, self.api, 'octocat/portfolio')
+
+        start = time.perf_counter()
+        targets = asyncio.run(load())
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(targets.branches), 151)
+        self.assertEqual(targets.assignees, ['octocat', 'Hubot'])
+        # Branches need two sequential pages, assignees are loaded next to them instead of after them
+        self.assertLess(elapsed, 3 * 0.1)
+
+    def test_too_many_branches(self):
+        prefetch = PullRequestPrefetch(max_pages=1)
+
+        async def check():
+            return [await prefetch.has_branch(1, self.api, 'octocat/portfolio', 'feature/10'),
+                    await prefetch.has_branch(1, self.api, 'octocat/portfolio', 'feature/140'),
+                    await prefetch.has_branch(1, self.api, 'octocat/portfolio', 'develop')]
+
+        self.assertEqual(asyncio.run(check()), [True, True, False])
+        # Branches that aren't in the first page are checked one by one
+        self.assertEqual(self.github.count_requests(path='/repos/octocat/portfolio/branches'), 1)
+        self.assertEqual(self.github.count_requests(), 4)
+
+    def test_other_repository_and_errors(self):
+        self.github.add_repo('blog')
+        prefetch = PullRequestPrefetch()
+
+        async def check():
+            prefetch.start(1, self.api, 'octocat/portfolio')
+            blog = await prefetch.has_branch(1, self.api, 'octocat/blog', 'feature/1')
+            with self.assertRaises(Exception):
+                await prefetch.get(1, self.api, 'octocat/missing')
+            # The failed load isn't kept
+            self.assertIsNone(prefetch.targets.get(1))
+            prefetch.start(2, self.api, 'octocat/portfolio')
+            prefetch.forget(2)
+            return blog
+
+        self.assertFalse(asyncio.run(check()))
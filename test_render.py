@@ -0,0 +1,89 @@
+from datetime import datetime
+from unittest import TestCase
+
+from api import IssueRecord, ItemRecord, RepoRecord
+from batch import BatchResult
+from render import render_batch_summary, render_branches, render_issues_page, render_repo, render_repos
+
+
+def get_callbacks(inline_keyboard) -> list:
+    return [button.callback_data for row in inline_keyboard.inline_keyboard for button in row]
+
+
+class TestRender(TestCase):
+    def setUp(self) -> None:
+        created_at = datetime(2021, 6, 3, 10)
+        self.items = [IssueRecord(number, f'Bug {number}', f'https://github.com/octocat/portfolio/issues/{number}',
+                                  'octocat/portfolio', 'hubot', created_at, 'open', None) for number in (4, 5)]
+        self.repo = {'name': 'portfolio', 'full_name': 'octocat/portfolio', 'html_url': 'https://github.com/octocat/portfolio',
+                     'stargazers_count': 3, 'forks_count': 1, 'open_issues_count': 20, 'language': 'Python',
+                     'default_branch': 'main', 'created_at': created_at, 'updated_at': created_at, 'private': False}
+        self.record = RepoRecord('portfolio', 'octocat/portfolio', 'https://github.com/octocat/portfolio', 'main', False,
+                                 False, 3, 1, 20, 'Python', created_at, created_at)
+
+    def test_issues_page(self):
+        text, inline_keyboard = render_issues_page(self.items, True, 2, True, 10)
+        self.assertTrue(text.startswith('*11*. _Bug 4_ [#4](https://github.com/octocat/portfolio/issues/4), '
+                                        '[link to repository](https://github.com/octocat/portfolio).\n'
+                                        'Created: _03/06/2021_. Author: _hubot_\n*12*.'))
+        self.assertEqual(get_callbacks(inline_keyboard), ['coctocat/portfolio/issues/4', 'coctocat/portfolio/issues/5',
+                                                          'page:1:1', 'page:1:3', 'select:1:2'])
+
+    def test_pulls_page(self):
+        text, inline_keyboard = render_issues_page(self.items[:1], False, 1, False, 10)
+        self.assertIn('*1*. _Bug 4_', text)
+        self.assertEqual(get_callbacks(inline_keyboard), ['coctocat/portfolio/issues/4', 'moctocat/portfolio/issues/4',
+                                                          'select:0:1'])
+
+    def test_select_mode(self):
+        _, inline_keyboard = render_issues_page(self.items, False, 1, False, 10)
+        self.assertEqual(get_callbacks(inline_keyboard)[-1], 'select:0:1')
+        _, inline_keyboard = render_issues_page(self.items, False, 1, True, 10, {'octocat/portfolio/issues/5': None,
+                                                                                 'octocat/blog/issues/1': None})
+        buttons = [button for row in inline_keyboard.inline_keyboard for button in row]
+        self.assertEqual([button.text for button in buttons[:2]], ['\u2610 1', '\u2611 2'])
+        self.assertEqual(get_callbacks(inline_keyboard), ['toggle:0:1:0', 'toggle:0:1:1', 'page:0:2', 'batch:c:0',
+                                                          'batch:m:0', 'select:0:1'])
+        self.assertEqual(buttons[3].text, 'Close selected (2)')
+
+    def test_batch_summary(self):
+        results = [BatchResult('octocat/portfolio/issues/4', True), BatchResult('octocat/blog/issues/1', False),
+                   BatchResult('octocat/blog/issues/2', False, 'TimeoutError')]
+        summary = 'Merged 1 of 3 items.\n' \
+                  'octocat/portfolio#4 - merged\n' \
+                  'octocat/blog#1 - failed\n' \
+                  'octocat/blog#2 - failed: TimeoutError'
+        self.assertEqual(render_batch_summary(results, True), summary)
+
+    def test_empty_page(self):
+        text, inline_keyboard = render_issues_page([], True, 3, False, 10)
+        self.assertEqual(text, 'There are no items on this page.')
+        self.assertEqual(get_callbacks(inline_keyboard), ['page:1:2'])
+
+    def test_repos(self):
+        archived = dict(self.repo, name='old', archived=True)
+        private = dict(self.repo, name='secret', archived=False, private=True)
+        text, inline_keyboard = render_repos([dict(self.repo, archived=False), archived, private])
+        self.assertIn('*1. portfolio*, [link](https://github.com/octocat/portfolio).\nTotal issues and prs: _20_\n', text)
+        self.assertIn('*2. secret*', text)
+        self.assertIn('Type: _Private_', text)
+        self.assertNotIn('old', text)
+        self.assertEqual(get_callbacks(inline_keyboard), ['repo:portfolio', 'repo:secret'])
+
+    def test_repo(self):
+        items = [ItemRecord(4, 'Bug 4', 'https://github.com/octocat/portfolio/pull/4', True)]
+        text, inline_keyboard = render_repo(self.record, items, 2, True)
+        self.assertIn('Name: *portfolio*', text)
+        self.assertIn('Created at: _03/06/2021_', text)
+        buttons = [button for row in inline_keyboard.inline_keyboard for button in row]
+        self.assertEqual(buttons[2].text, 'Pull request #4 - Bug 4')
+        self.assertEqual(buttons[2].url, 'https://github.com/octocat/portfolio/pull/4')
+        self.assertEqual(get_callbacks(inline_keyboard)[-2:], ['rpage:portfolio:1', 'rpage:portfolio:3'])
+
+    def test_branches(self):
+        branches = ['develop', 'feature', 'main']
+        inline_keyboard = render_branches(branches, first='main', exclude='feature')
+        buttons = [button for row in inline_keyboard.inline_keyboard for button in row]
+        self.assertEqual([button.text for button in buttons], ['main', 'develop'])
+        self.assertEqual(get_callbacks(inline_keyboard), ['branch:2', 'branch:0'])
+        self.assertEqual(len(get_callbacks(render_branches([str(index) for index in range(30)], limit=10))), 10)
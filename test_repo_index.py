@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from api import RepoRecord
+from repo_index import RepoIndex
+
+
+def make_repo(name: str, owner: str = 'mezgoodle', archived: bool = False) -> dict:
+    return {'name': name, 'full_name': f'{owner}/{name}', 'owner': {'login': owner}, 'default_branch': 'main',
+            'private': False, 'archived': archived, 'html_url': f'https://github.com/{owner}/{name}',
+            'stargazers_count': 0, 'forks_count': 0, 'open_issues_count': 0, 'language': 'Python',
+            'created_at': '2021-06-03T10:00:00Z', 'updated_at': '2021-06-03T10:00:00Z'}
+
+
+class TestRepoIndex(TestCase):
+    def setUp(self) -> None:
+        self.index = RepoIndex('mezgoodle', [make_repo('github-helper'), make_repo('portfolio'),
+                                             make_repo('portfolio-old', archived=True), make_repo('bot', 'other')])
+
+    def test_get(self):
+        repo = self.index.get('GitHub-Helper ')
+        self.assertIsInstance(repo, RepoRecord)
+        self.assertEqual(repo.name, 'github-helper')
+        self.assertEqual(repo.full_name, 'mezgoodle/github-helper')
+        self.assertEqual(repo.default_branch, 'main')
+        self.assertTrue(self.index.get('portfolio-old').archived)
+        self.assertIsNone(self.index.get('bot'))
+        self.assertEqual(len(self.index), 3)
+
+    def test_suggest(self):
+        self.assertEqual(self.index.suggest('port'), ['portfolio', 'portfolio-old'])
+        self.assertEqual(self.index.suggest('githb-helper'), ['github-helper'])
+        self.assertEqual(self.index.suggest('weather'), [])
+        self.assertEqual(self.index.suggest(''), [])
+
+    def test_add_and_remove(self):
+        self.index.add(make_repo('weather'))
+        self.assertIsNotNone(self.index.get('weather'))
+        self.index.remove('Weather')
+        self.assertIsNone(self.index.get('weather'))
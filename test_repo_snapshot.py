@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from api import Api, AsyncApi
+from fake_github import FakeGitHub
+from repo_snapshot import RepoSnapshots
+
+
+class TestRepoSnapshots(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub().start()
+        self.github.add_repo('portfolio')
+        for index in range(20):
+            self.github.add_issue('portfolio', f'Bug {index}', pull_request=index % 5 == 0)
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.api = AsyncApi(Api('token', base_url=self.github.base_url), self.executor, timeout=5)
+        self.snapshots = RepoSnapshots(page_size=8)
+        # The bot knows the login from the repository index before the first detail view
+        self.api.api.get_login()
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+        self.github.stop()
+
+    def test_listed_repo(self):
+        async def open_repo():
+            repos = await self.api.get_all_repos()
+            self.snapshots.store(1, repos)
+            listed = self.github.count_requests()
+            pages = [await self.snapshots.get_page(1, self.api, 'Portfolio', page) for page in (1, 2, 3, 1, 2)]
+            return listed, pages
+
+        listed, pages = asyncio.run(open_repo())
+        self.assertEqual(listed, 2)
+        # One request per new page, the repository itself comes from the listing
+        self.assertEqual(self.github.count_requests(), listed + 3)
+        repo, items, has_next = pages[0]
+        self.assertEqual(repo.full_name, 'octocat/portfolio')
+        self.assertEqual(repo.open_issues_count, 20)
+        self.assertEqual((len(items), has_next), (8, True))
+        self.assertEqual([(len(page[1]), page[2]) for page in pages[1:3]], [(8, True), (4, False)])
+        self.assertEqual(pages[3], pages[0])
+
+    def test_listed_again(self):
+        async def open_repo():
+            repos = await self.api.get_all_repos()
+            self.snapshots.store(1, repos)
+            await self.snapshots.get_page(1, self.api, 'portfolio')
+            requests = self.github.count_requests()
+            self.snapshots.store(1, [dict(repos[0], stargazers_count=99, archived=True,
+                                          updated_at='2021-07-01T10:00:00Z')])
+            repo, items, _ = await self.snapshots.get_page(1, self.api, 'portfolio')
+            return repo, items, self.github.count_requests() - requests
+
+        repo, items, requests = asyncio.run(open_repo())
+        self.assertEqual((repo.stargazers_count, repo.archived, repo.updated_at.month), (99, True, 7))
+        # The count of items hasn't changed, so the page is still valid
+        self.assertEqual((len(items), requests), (8, 0))
+
+    def test_same_short_name(self):
+        async def open_repo():
+            repos = await self.api.get_all_repos()
+            # A repository of an organization that the user is a member of
+            repos.append(dict(repos[0], full_name='acme/portfolio', html_url='https://github.com/acme/portfolio',
+                              open_issues_count=99))
+            self.snapshots.store(1, repos)
+            first = await self.snapshots.get_page(1, self.api, 'portfolio')
+            self.snapshots.forget(1, 'acme/portfolio')
+            second = await self.snapshots.get_page(1, self.api, 'portfolio')
+            return first, second
+
+        first, second = asyncio.run(open_repo())
+        self.assertEqual(first[0].full_name, 'octocat/portfolio')
+        self.assertEqual(first[0].open_issues_count, 20)
+        self.assertEqual(second, first)
+
+    def test_not_listed_repo(self):
+        async def open_repo():
+            first = await self.snapshots.get_page(1, self.api, 'portfolio')
+            second = await self.snapshots.get_page(1, self.api, 'portfolio')
+            missing = await self.snapshots.get_page(1, self.api, 'portfolio1')
+            return first, second, missing
+
+        first, second, missing = asyncio.run(open_repo())
+        self.assertEqual(first, second)
+        self.assertIsNone(missing)
+        repo, items, has_next = first
+        self.assertEqual((len(items), has_next), (8, True))
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_forget(self):
+        async def open_repo():
+            await self.snapshots.get_page(1, self.api, 'portfolio')
+            await self.snapshots.get_page(2, self.api, 'portfolio')
+            self.snapshots.forget(1, 'octocat/Portfolio')
+            await self.snapshots.get_page(1, self.api, 'portfolio')
+            self.snapshots.forget_repo('octocat/Portfolio')
+            await self.snapshots.get_page(1, self.api, 'portfolio')
+            await self.snapshots.get_page(2, self.api, 'portfolio')
+
+        asyncio.run(open_repo())
+        self.assertEqual(self.github.count_requests(), 6)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import random
+from unittest import TestCase
+
+from aiohttp import ClientSession, web
+
+from router import UpdateRouter, get_shard_key
+
+
+async def start_app(app: web.Application) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner
+
+
+def get_url(runner: web.AppRunner) -> str:
+    host, port = runner.addresses[0][:2]
+    return f'http://{host}:{port}'
+
+
+class TestShardKey(TestCase):
+    def test_message(self):
+        update = {'update_id': 1, 'message': {'from': {'id': 42}, 'chat': {'id': 42}, 'text': '/repos'}}
+        self.assertEqual(get_shard_key(update), 42)
+
+    def test_callback_query(self):
+        update = {'update_id': 2, 'callback_query': {'from': {'id': 7}, 'message': {'chat': {'id': 8}}, 'data': 'c'}}
+        self.assertEqual(get_shard_key(update), 7)
+
+    def test_channel_post(self):
+        update = {'update_id': 3, 'channel_post': {'chat': {'id': -100}, 'text': 'news'}}
+        self.assertEqual(get_shard_key(update), -100)
+
+    def test_unknown_update(self):
+        self.assertEqual(get_shard_key({'update_id': 4, 'poll': {'id': 'poll'}}), 4)
+
+
+class TestUpdateRouter(TestCase):
+    def test_routing(self):
+        received = [[], []]
+
+        def make_worker(index: int) -> web.Application:
+            async def handle(request: web.Request) -> web.Response:
+                update = await request.json()
+                # Later updates would overtake earlier ones without ordering in the router
+                await asyncio.sleep(random.uniform(0, 0.02))
+                received[index].append((get_shard_key(update), update['update_id']))
+                return web.json_response({})
+
+            app = web.Application()
+            app.router.add_post('/webhook', handle)
+            return app
+
+        async def replay():
+            workers = [await start_app(make_worker(index)) for index in range(2)]
+            router = UpdateRouter([get_url(worker) for worker in workers])
+            front = await start_app(router.create_app('/webhook'))
+            updates = [{'update_id': index, 'message': {'from': {'id': index % 5}, 'text': str(index)}}
+                       for index in range(100)]
+            # Updates arrive in order, the worker answers them in random time
+            statuses = [status for status, _, _ in await asyncio.gather(
+                *(router.forward(get_shard_key(update), '/webhook', json.dumps(update).encode())
+                  for update in updates))]
+            async with ClientSession() as session:
+                update = {'update_id': 100, 'message': {'from': {'id': 0}, 'text': '100'}}
+                async with session.post(get_url(front) + '/webhook', data=json.dumps(update)) as response:
+                    statuses.append(response.status)
+            stats = router.stats()
+            await front.cleanup()
+            for worker in workers:
+                await worker.cleanup()
+            return statuses, stats
+
+        statuses, stats = asyncio.run(replay())
+        self.assertEqual(statuses, [200] * 101)
+        self.assertEqual(sorted({user for user, _ in received[0]}), [0, 2, 4])
+        self.assertEqual(sorted({user for user, _ in received[1]}), [1, 3])
+        for updates in received:
+            for user in range(5):
+                numbers = [number for key, number in updates if key == user]
+                self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(sum(stats['forwarded'].values()), 101)
+
+    def test_github_deliveries(self):
+        received = []
+
+        def make_worker(index: int) -> web.Application:
+            async def handle(request: web.Request) -> web.Response:
+                received.append((index, request.headers['X-GitHub-Event'], await request.read()))
+                return web.Response(status=202)
+
+            app = web.Application()
+            app.router.add_post('/github', handle)
+            return app
+
+        async def deliver():
+            workers = [await start_app(make_worker(index)) for index in range(2)]
+            router = UpdateRouter([get_url(worker) for worker in workers])
+            front = await start_app(router.create_app('/webhook', '/github'))
+            async with ClientSession() as session:
+                async with session.post(get_url(front) + '/github', data=b'{}',
+                                        headers={'X-GitHub-Event': 'issues'}) as response:
+                    status = response.status
+            await front.cleanup()
+            for worker in workers:
+                await worker.cleanup()
+            return status
+
+        self.assertEqual(asyncio.run(deliver()), 202)
+        self.assertEqual(sorted(received), [(0, 'issues', b'{}'), (1, 'issues', b'{}')])
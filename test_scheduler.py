@@ -0,0 +1,86 @@
+import threading
+import time
+from unittest import TestCase
+
+from github.GithubException import RateLimitExceededException
+
+from api import Api
+from fake_github import FakeGitHub
+from scheduler import BULK, INTERACTIVE, RateLimitScheduler
+
+
+class TestRateLimitScheduler(TestCase):
+    def setUp(self) -> None:
+        self.github = FakeGitHub().start()
+        self.github.add_repo('portfolio')
+        self.github.add_issue('portfolio', 'Bug')
+        self.scheduler = RateLimitScheduler(reserve=2, max_wait=5, backoff=0.05)
+        self.api = Api('token', base_url=self.github.base_url, scheduler=self.scheduler)
+
+    def tearDown(self) -> None:
+        self.github.stop()
+
+    def test_budget_from_headers(self):
+        self.github.set_rate_limit('core', 5000, 4000, time.time() + 3600)
+        self.api.get_user_info()
+        budget = self.scheduler.stats()['budgets']['core']
+        self.assertEqual(budget['limit'], 5000)
+        self.assertEqual(budget['remaining'], 3999)
+        self.assertEqual(self.scheduler.stats()['requests'], 1)
+
+    def test_secondary_rate_limit_retry(self):
+        self.github.secondary_limits = 2
+        self.github.retry_after = '0.1'
+        start = time.perf_counter()
+        self.assertTrue(self.api.close_issues_or_prs('octocat/portfolio/issues/1'))
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+        self.assertEqual(self.scheduler.stats()['retries'], 2)
+        self.assertEqual(self.github.count_requests(), 3)
+
+    def test_secondary_rate_limit_exhausted(self):
+        self.github.secondary_limits = 10
+        self.github.retry_after = ''
+        with self.assertRaises(RateLimitExceededException):
+            self.api.close_issues_or_prs('octocat/portfolio/issues/1')
+        self.assertEqual(self.github.count_requests(), 4)
+
+    def test_primary_rate_limit(self):
+        self.github.set_rate_limit('core', 60, 1, time.time() + 3600)
+        self.api.get_user_info()
+        with self.assertRaises(RateLimitExceededException):
+            self.api.close_issues_or_prs('octocat/portfolio/issues/1')
+        self.assertEqual(self.github.count_requests(), 1)
+
+    def test_reserve_for_interactive_calls(self):
+        self.github.set_rate_limit('core', 60, 3, time.time() + 3600)
+        self.api.get_user_info()
+        with self.assertRaises(RateLimitExceededException):
+            self.api.get_all_repos()
+        self.assertTrue(self.api.close_issues_or_prs('octocat/portfolio/issues/1'))
+        self.assertEqual(self.github.count_requests(), 2)
+
+    def test_bulk_waits_for_reset(self):
+        self.github.set_rate_limit('core', 60, 3, time.time() + 1.5)
+        self.api.get_user_info()
+        self.github.set_rate_limit('core', 60, 60, time.time() + 3600)
+        start = time.perf_counter()
+        self.api.get_all_repos()
+        self.assertGreater(time.perf_counter() - start, 0.1)
+        self.assertEqual(self.scheduler.stats()['throttled'], 1)
+
+    def test_interactive_goes_first(self):
+        order = []
+        self.scheduler.blocked_until = time.time() + 0.2
+
+        def call(priority: int) -> None:
+            self.scheduler.acquire(priority, 'core')
+            order.append(priority)
+
+        bulk = threading.Thread(target=call, args=(BULK,))
+        bulk.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+        interactive.start()
+        bulk.join()
+        interactive.join()
+        self.assertEqual(order, [INTERACTIVE, BULK])
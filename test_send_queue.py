@@ -0,0 +1,157 @@
+import asyncio
+import time
+from unittest import TestCase
+
+from aiogram import Bot, types
+from aiogram.bot.api import TelegramAPIServer
+from aiogram.utils.exceptions import RetryAfter
+from aiohttp import web
+
+from send_queue import QueuedBot, SendQueue, TokenBucket
+
+TOKEN = '123456:TEST'
+
+
+class StubTelegram:
+    """
+    Telegram Bot API stub that answers 429 like Telegram when flood limits are exceeded
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate, time.monotonic())
+        self.chat_buckets = {}
+        self.messages = []
+        self.rejected = 0
+        self.flood_waits = 0
+        self.runner = None
+
+    def is_allowed(self, chat_id: str) -> bool:
+        now = time.monotonic()
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        chat_bucket = self.chat_buckets[chat_id]
+        # Timers of the client and the stub differ a bit, so a tenth of a token is forgiven
+        if chat_bucket.get_delay(now) > 0.1 / self.chat_rate or self.global_bucket.get_delay(now) > 0.1 / self.global_rate:
+            return False
+        chat_bucket.take()
+        self.global_bucket.take()
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        chat_id = data['chat_id']
+        if self.flood_waits:
+            self.flood_waits -= 1
+            allowed = False
+        else:
+            allowed = self.is_allowed(chat_id)
+        if not allowed:
+            self.rejected += 1
+            return web.json_response({'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                                      'parameters': {'retry_after': 1}}, status=429)
+        self.messages.append((chat_id, data['text']))
+        return web.json_response({'ok': True, 'result': {'message_id': len(self.messages), 'date': 0, 'text': data['text'],
+                                                         'chat': {'id': int(chat_id), 'type': 'private'}}})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post(f'/bot{TOKEN}/{{method}}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f'http://{host}:{port}'
+
+    async def stop(self) -> None:
+        await self.runner.cleanup()
+
+
+class TestTokenBucket(TestCase):
+    def test_burst_and_rate(self):
+        bucket = TokenBucket(2, 3, 0)
+        for _ in range(3):
+            self.assertEqual(bucket.get_delay(0), 0)
+            bucket.take()
+        self.assertAlmostEqual(bucket.get_delay(0), 0.5)
+        self.assertEqual(bucket.get_delay(0.5), 0)
+        self.assertEqual(bucket.get_delay(100), 0)
+        self.assertEqual(bucket.tokens, 3)
+
+
+class TestSendQueue(TestCase):
+    def run_with_stub(self, stub: StubTelegram, make_bot, send) -> list:
+        async def run():
+            url = await stub.start()
+            bot = make_bot(TelegramAPIServer.from_base(url))
+            try:
+                return await send(bot)
+            finally:
+                await bot.session.close()
+                await stub.stop()
+
+        return asyncio.run(run())
+
+    def test_burst_without_queue(self):
+        stub = StubTelegram(global_rate=20, chat_rate=5, chat_burst=5)
+
+        async def send(bot: Bot) -> list:
+            return await asyncio.gather(*(bot.send_message(index % 2, f'Message {index}') for index in range(20)),
+                                        return_exceptions=True)
+
+        results = self.run_with_stub(stub, lambda server: Bot(TOKEN, server=server), send)
+        self.assertTrue(any(isinstance(result, RetryAfter) for result in results))
+
+    def test_burst_with_queue(self):
+        stub = StubTelegram(global_rate=20, chat_rate=5, chat_burst=5)
+        send_queue = SendQueue(global_rate=20, chat_rate=5, chat_burst=5)
+        keyboard = types.InlineKeyboardMarkup().add(types.InlineKeyboardButton('Close', callback_data='close'))
+
+        async def send(bot: Bot) -> list:
+            messages = [bot.send_message(index % 4, f'Message {index}') for index in range(60)]
+            # Messages with keyboards are never joined, the buttons belong to them
+            messages += [bot.send_message(0, 'Issue', reply_markup=keyboard) for _ in range(3)]
+            return await asyncio.gather(*messages)
+
+        results = self.run_with_stub(stub, lambda server: QueuedBot(TOKEN, send_queue, server=server), send)
+        self.assertEqual(stub.rejected, 0)
+        self.assertEqual(len(results), 63)
+        # Every text is delivered once, in order, some of them in joined messages
+        for chat_id in range(4):
+            texts = '\n\n'.join(text for chat, text in stub.messages if chat == str(chat_id) and text != 'Issue')
+            self.assertEqual(texts, '\n\n'.join(f'Message {index}' for index in range(chat_id, 60, 4)))
+        self.assertEqual(sum(text == 'Issue' for _, text in stub.messages), 3)
+        self.assertLess(len(stub.messages), 63)
+        self.assertEqual(send_queue.coalesced, 63 - len(stub.messages))
+        self.assertIn('Message 4', results[4].text)
+
+    def test_retry_after(self):
+        stub = StubTelegram(global_rate=30, chat_rate=1, chat_burst=3)
+        stub.flood_waits = 1
+        send_queue = SendQueue()
+
+        async def send(bot: Bot) -> list:
+            start = time.perf_counter()
+            message = await bot.send_message(1, 'Issue has been created')
+            return [message, time.perf_counter() - start]
+
+        message, elapsed = self.run_with_stub(stub, lambda server: QueuedBot(TOKEN, send_queue, server=server), send)
+        self.assertEqual(message.text, 'Issue has been created')
+        self.assertGreaterEqual(elapsed, 1)
+        self.assertEqual(send_queue.stats()['retries'], 1)
+        self.assertEqual(stub.messages, [('1', 'Issue has been created')])
+
+    def test_retry_after_limit(self):
+        stub = StubTelegram(global_rate=30, chat_rate=1, chat_burst=3)
+        stub.flood_waits = 2
+        send_queue = SendQueue(max_retries=1)
+
+        async def send(bot: Bot) -> list:
+            return await asyncio.gather(bot.send_message(1, 'Issue has been created'), return_exceptions=True)
+
+        results = self.run_with_stub(stub, lambda server: QueuedBot(TOKEN, send_queue, server=server), send)
+        self.assertIsInstance(results[0], RetryAfter)
+        self.assertEqual(stub.messages, [])
@@ -0,0 +1,56 @@
+import asyncio
+from unittest import TestCase, skipUnless
+
+from database import Client
+from storage import LocalStorage, MongoStorage
+from config import MONGO_URI
+
+
+class TestLocalStorage(TestCase):
+    def setUp(self) -> None:
+        self.storage = LocalStorage()
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_conversation(self):
+        self.run_async(self.storage.set_state(chat=1, user=1, state='PullRequest:RepoName'))
+        self.run_async(self.storage.update_data(chat=1, user=1, RepoName='portfolio',
+                                                FullName='mezgoodle/portfolio', DefaultBranch='main'))
+        self.run_async(self.storage.update_data(chat=1, user=1, data={'Title': 'Fix'}))
+        self.assertEqual(self.run_async(self.storage.get_state(chat=1, user=1)), 'PullRequest:RepoName')
+        self.assertEqual(self.run_async(self.storage.get_data(chat=1, user=1)),
+                         {'RepoName': 'portfolio', 'FullName': 'mezgoodle/portfolio', 'DefaultBranch': 'main',
+                          'Title': 'Fix'})
+        self.run_async(self.storage.finish(chat=1, user=1))
+        self.assertIsNone(self.run_async(self.storage.get_state(chat=1, user=1)))
+        self.assertEqual(self.run_async(self.storage.get_data(chat=1, user=1)), {})
+
+    def test_unserializable_data(self):
+        with self.assertRaises(TypeError):
+            self.run_async(self.storage.update_data(chat=1, user=1, Repository=object()))
+
+
+@skipUnless(MONGO_URI, 'needs a local mongod in MONGO_URI')
+class TestMongoStorage(TestCase):
+    def setUp(self) -> None:
+        self.states = Client('', 'githubhelper_test', 'states', MONGO_URI).collection
+        self.states.drop()
+        self.storage = MongoStorage(lambda: self.states, ttl=60)
+
+    def tearDown(self) -> None:
+        self.states.drop()
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_conversation(self):
+        self.run_async(self.storage.set_state(chat=0, user=0, state='Issue:Title'))
+        self.run_async(self.storage.update_data(chat=0, user=0, RepoName='portfolio', DefaultBranch='main'))
+        self.run_async(self.storage.update_data(chat=0, user=0, Title='Fix'))
+        self.assertEqual(self.run_async(self.storage.get_state(chat=0, user=0)), 'Issue:Title')
+        self.assertEqual(self.run_async(self.storage.get_data(chat=0, user=0)),
+                         {'RepoName': 'portfolio', 'DefaultBranch': 'main', 'Title': 'Fix'})
+        self.run_async(self.storage.finish(chat=0, user=0))
+        self.assertIsNone(self.run_async(self.storage.get_state(chat=0, user=0)))
+        self.assertEqual(self.run_async(self.storage.get_data(chat=0, user=0)), {})